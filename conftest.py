@@ -3,6 +3,7 @@ from django.test import Client
 from pytest_factoryboy import register
 from rest_framework.test import APIClient
 
+from core.fake_openai import FakeOpenAIConfig, FakeOpenAIServer
 from core.models import User
 from events.tests.factories import TimelineFactory
 from poc.models import Case, Litigant, LitigantRole
@@ -39,6 +40,17 @@ def api_client():
     return APIClient()
 
 
+@pytest.fixture()
+def fake_openai():
+    server = FakeOpenAIServer(
+        ("127.0.0.1", 0), FakeOpenAIConfig(latency_ms=0, token_latency_ms=0)
+    )
+    server.start_in_thread()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
 @pytest.fixture()
 def users(db) -> dict[str, User]:
     user1 = User.objects.create_user(
@@ -0,0 +1,79 @@
+"""Database helpers shared by the benchmark and load-test commands."""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.utils import CursorWrapper
+
+__all__ = [
+    "QueryCounter",
+    "count_queries",
+]
+
+
+class QueryCounter:
+    """Number of queries executed in a count_queries block, and their seconds. Safe to increment from several threads."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def incr(self, seconds: float = 0.0):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+
+
+_current_counter: ContextVar[QueryCounter | None] = ContextVar(
+    "current_query_counter", default=None
+)
+
+# CursorWrapper.execute is patched while any count_queries block is open
+_patch_lock = threading.Lock()
+_patch_users = 0
+_original_execute = CursorWrapper.execute
+
+
+def _counting_execute(cursor, sql, params=None):
+    counter = _current_counter.get()
+    if counter is None:
+        return _original_execute(cursor, sql, params)
+
+    started_at = time.perf_counter()
+    try:
+        return _original_execute(cursor, sql, params)
+    finally:
+        counter.incr(time.perf_counter() - started_at)
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts the queries executed in the block, including those of the threads that copy the block's context.
+    langchain loads the message history in its own thread pool, and the agent runs the tools in the tool pool.
+    CaptureQueriesContext sees neither.
+    Concurrent blocks, e.g. the turns of a load test, are counted separately.
+
+    Yields:
+        QueryCounter: The counter of the block.
+    """
+    global _patch_users
+
+    with _patch_lock:
+        if _patch_users == 0:
+            CursorWrapper.execute = _counting_execute
+        _patch_users += 1
+
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+        with _patch_lock:
+            _patch_users -= 1
+            if _patch_users == 0:
+                CursorWrapper.execute = _original_execute
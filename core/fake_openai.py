@@ -0,0 +1,548 @@
+"""
+A local stand-in for the OpenAI API. Serves the chat completions (including streaming and tool calls),
+responses, embeddings, files and batches endpoints used by the app, with a configurable latency.
+Used for load tests and benchmarks that should neither cost money nor depend on OpenAI's latency.
+"""
+
+import base64
+import email.parser
+import email.policy
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+__all__ = [
+    "FakeOpenAIConfig",
+    "FakeOpenAIServer",
+]
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSIONS = 1536
+
+# the chat agent's system prompt includes the thread ID. see poc.langchain.chat_agent.build_prompt
+THREAD_ID_RE = re.compile(r"Case thread ID: (\d+)")
+# the distinct dates of the structured responses are spread over this many days from FIRST_DATE
+FIRST_DATE = date(2020, 1, 1)
+DATE_SPREAD_DAYS = 4 * 365
+
+
+@dataclass
+class FakeOpenAIConfig:
+    latency_ms: int = 300  # before the response, or the first streamed chunk
+    token_latency_ms: int = 10  # between streamed chunks
+    answer_words: int = 60  # words of a chat answer
+    tool_calls: bool = (
+        True  # whether to call the case and semantic search tools before answering
+    )
+    items_per_array: int = (
+        3  # items of the arrays in a structured (json_schema) response
+    )
+    batch_latency_ms: int = 1000  # until a batch job is completed
+    # the schema of the responses requested without a json_schema format,
+    # for the prompts that ask for JSON in their instructions (e.g. the timeline reconstruction)
+    default_schema: dict | None = None
+    # whether the strings and dates of the structured responses vary by request, like the answers
+    # about different documents. otherwise, every request gets the same values.
+    distinct_outputs: bool = False
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        # content parts
+        return " ".join(
+            part.get("text", "") for part in content if isinstance(part, dict)
+        )
+
+    return content
+
+
+def _fake_answer(question: str, words: int) -> str:
+    filler = " ".join(["lorem"] * max(0, words - 3))
+    return f"Fake answer to: {question[:80]} {filler}".strip()
+
+
+def fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> list[float]:
+    """Returns a deterministic, unit length embedding of the text. Same text, same embedding."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1
+    return [value / norm for value in vector]
+
+
+def fake_from_schema(
+    schema: dict,
+    name: str = "",
+    index: int = 0,
+    items: int = 3,
+    seed: int | None = None,
+):
+    """
+    Returns a value that conforms to the JSON schema.
+    Properties named like dates get ISO dates, so that the values pass the app's validation.
+    With a seed, the strings and dates differ from those of the other seeds.
+    """
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+
+    if "enum" in schema:
+        return schema["enum"][index % len(schema["enum"])]
+
+    if schema_type == "object":
+        return {
+            prop: fake_from_schema(prop_schema, prop, index, items, seed)
+            for prop, prop_schema in schema.get("properties", {}).items()
+        }
+
+    if schema_type == "array":
+        return [
+            fake_from_schema(schema.get("items", {}), name, i, items, seed)
+            for i in range(items)
+        ]
+
+    if schema_type == "string":
+        if "date" in name:
+            if seed is None:
+                return f"2024-01-{index % 28 + 1:02d}"
+
+            days = (seed + index * 7) % DATE_SPREAD_DAYS
+            return (FIRST_DATE + timedelta(days=days)).isoformat()
+
+        text = f"Fake {name.replace('_', ' ')} {index + 1}".strip()
+        return text if seed is None else f"{text} ({seed:x})"
+
+    if schema_type == "number":
+        # IDs are positive integers, e.g. the sources of the timeline events
+        return index + 1 if name == "id" else 0.8
+
+    if schema_type == "integer":
+        return index + 1
+
+    if schema_type == "boolean":
+        return True
+
+    return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeOpenAIServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        content = self.rfile.read(length)
+        path = self.path.rstrip("/")
+
+        if path.endswith("/files"):
+            self.server.record_request("files")
+            return self._upload_file(content)
+
+        body = json.loads(content or b"{}")
+        routes = {
+            "/chat/completions": self._chat_completions,
+            "/responses": self._responses,
+            "/embeddings": self._embeddings,
+            "/batches": self._create_batch,
+        }
+        for suffix, route in routes.items():
+            if path.endswith(suffix):
+                endpoint = suffix.lstrip("/")
+                self.server.record_request(endpoint)
+                started_at = time.perf_counter()
+                time.sleep(self.server.config.latency_ms / 1000)
+                try:
+                    return route(body)
+                finally:
+                    self.server.record_seconds(
+                        endpoint, time.perf_counter() - started_at
+                    )
+
+        self._send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        file_match = re.search(r"/files/([\w-]+)/content$", path)
+        batch_match = re.search(r"/batches/([\w-]+)$", path)
+
+        if file_match and file_match.group(1) in self.server.files:
+            self.server.record_request("files")
+            data = self.server.files[file_match.group(1)]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            return self.wfile.write(data)
+
+        if batch_match and batch_match.group(1) in self.server.batches:
+            self.server.record_request("batches")
+            return self._send_json(self.server.get_batch(batch_match.group(1)))
+
+        self._send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+    def _upload_file(self, content: bytes):
+        """Stores the file of a multipart upload, e.g. the JSONL input of a batch."""
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + content
+        )
+        fields = {
+            part.get_param("name", header="content-disposition"): part
+            for part in message.iter_parts()
+        }
+        data = fields["file"].get_payload(decode=True)
+        file_id = self.server.add_file(data)
+        self._send_json(
+            {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(data),
+                "created_at": int(time.time()),
+                "filename": fields["file"].get_filename() or "file",
+                "purpose": fields["purpose"].get_content().strip(),
+                "status": "processed",
+            }
+        )
+
+    def _create_batch(self, body: dict):
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        self.server.batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint"),
+            "input_file_id": body.get("input_file_id"),
+            "completion_window": body.get("completion_window"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        self._send_json(self.server.batches[batch_id])
+
+    def _send_json(self, payload: dict, status: int = 200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chat_completions(self, body: dict):
+        messages = body.get("messages", [])
+        model = body.get("model", "gpt-4o")
+        prompt_tokens = sum(_estimate_tokens(_message_text(m)) for m in messages)
+
+        tool_calls = self._get_tool_calls(body)
+        content = None if tool_calls else self._get_answer(messages)
+        completion_tokens = _estimate_tokens(content or json.dumps(tool_calls))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        if body.get("stream"):
+            return self._stream_chat_completion(
+                body, model, content, tool_calls, finish_reason, usage
+            )
+
+        message = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+
+        self._send_json(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": message, "finish_reason": finish_reason}
+                ],
+                "usage": usage,
+            }
+        )
+
+    def _get_tool_calls(self, body: dict) -> list[dict]:
+        """Calls the case and semantic search tools once per user message, if the request offers them."""
+        if not self.server.config.tool_calls:
+            return []
+
+        messages = body.get("messages", [])
+        if messages and messages[-1].get("role") == "tool":
+            # the tools were called. answer.
+            return []
+
+        offered = {
+            tool.get("function", {}).get("name") for tool in body.get("tools", [])
+        }
+        question = next(
+            (_message_text(m) for m in reversed(messages) if m.get("role") == "user"),
+            "",
+        )
+        thread_ids = THREAD_ID_RE.findall(" ".join(_message_text(m) for m in messages))
+        canned = [
+            ("case_details", {"thread_id": int(thread_ids[0]) if thread_ids else 1}),
+            ("semantic_file_search", {"query": question}),
+            ("semantic_email_search", {"query": question}),
+        ]
+
+        return [
+            {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)},
+            }
+            for name, arguments in canned
+            if name in offered
+        ]
+
+    def _get_answer(self, messages: list[dict]) -> str:
+        question = next(
+            (_message_text(m) for m in reversed(messages) if m.get("role") == "user"),
+            "",
+        )
+        return _fake_answer(question, self.server.config.answer_words)
+
+    def _stream_chat_completion(
+        self,
+        body: dict,
+        model: str,
+        content: str | None,
+        tool_calls: list[dict],
+        finish_reason: str,
+        usage: dict,
+    ):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # no content length. the connection is closed after the stream.
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def _send_chunk(delta: dict | None, finish: str | None = None, **extra):
+            chunk = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": (
+                    []
+                    if delta is None
+                    else [{"index": 0, "delta": delta, "finish_reason": finish}]
+                ),
+                **extra,
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        _send_chunk({"role": "assistant", "content": ""})
+
+        if tool_calls:
+            for index, tool_call in enumerate(tool_calls):
+                _send_chunk({"tool_calls": [{"index": index, **tool_call}]})
+        else:
+            for word in content.split(" "):
+                time.sleep(self.server.config.token_latency_ms / 1000)
+                _send_chunk({"content": f"{word} "})
+
+        _send_chunk({}, finish_reason)
+        if body.get("stream_options", {}).get("include_usage"):
+            _send_chunk(None, usage=usage)
+
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _responses(self, body: dict):
+        self._send_json(self.server.get_response(body))
+
+    def _embeddings(self, body: dict):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS
+        data = []
+        for index, text in enumerate(inputs):
+            embedding = fake_embedding(str(text), dimensions)
+            if body.get("encoding_format") == "base64":
+                # the SDK requests base64 encoded float32 values by default
+                embedding = base64.b64encode(
+                    struct.pack(f"<{dimensions}f", *embedding)
+                ).decode("ascii")
+
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+        tokens = sum(_estimate_tokens(str(text)) for text in inputs)
+        self._send_json(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "text-embedding-3-small"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server of the fake OpenAI API.
+    Point the app to it with DJANGO_OPENAI_BASE_URL=http://<host>:<port>/v1
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: FakeOpenAIConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.request_counts = Counter()
+        # seconds spent answering the requests of each endpoint, including the latency
+        self.request_seconds = Counter()
+        # file ID -> content. batch ID -> batch.
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_request(self, endpoint: str):
+        with self._lock:
+            self.request_counts[endpoint] += 1
+
+    def record_seconds(self, endpoint: str, seconds: float):
+        with self._lock:
+            self.request_seconds[endpoint] += seconds
+
+    def add_file(self, data: bytes) -> str:
+        file_id = f"file-{uuid.uuid4().hex}"
+        self.files[file_id] = data
+        return file_id
+
+    def get_batch(self, batch_id: str) -> dict:
+        """Returns the batch. Its requests are answered once batch_latency_ms has passed."""
+        with self._lock:
+            batch = self.batches[batch_id]
+            elapsed_ms = (time.time() - batch["created_at"]) * 1000
+            if (
+                batch["status"] == "in_progress"
+                and elapsed_ms >= self.config.batch_latency_ms
+            ):
+                self._complete_batch(batch)
+
+            return batch
+
+    def _complete_batch(self, batch: dict):
+        lines = []
+        for line in self.files[batch["input_file_id"]].decode().splitlines():
+            if not line.strip():
+                continue
+
+            request = json.loads(line)
+            lines.append(
+                {
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "request_id": uuid.uuid4().hex,
+                        "body": self.get_response(request["body"]),
+                    },
+                    "error": None,
+                }
+            )
+
+        output = "".join(f"{json.dumps(line)}\n" for line in lines).encode()
+        batch.update(
+            status="completed",
+            output_file_id=self.add_file(output),
+            completed_at=int(time.time()),
+            request_counts={"total": len(lines), "completed": len(lines), "failed": 0},
+        )
+
+    def get_response(self, body: dict) -> dict:
+        """Returns the response object of a request to the responses endpoint."""
+        model = body.get("model", "gpt-5-mini")
+        text_format = (body.get("text") or {}).get("format") or {}
+        schema = (
+            text_format.get("schema", {})
+            if text_format.get("type") == "json_schema"
+            else self.config.default_schema
+        )
+
+        if schema is not None:
+            seed = None
+            if self.config.distinct_outputs:
+                digest = hashlib.sha256(json.dumps(body.get("input")).encode("utf-8"))
+                seed = int.from_bytes(digest.digest()[:4], "big")
+
+            output = fake_from_schema(
+                schema, items=self.config.items_per_array, seed=seed
+            )
+            text = json.dumps(output)
+        else:
+            text = _fake_answer(str(body.get("input")), self.config.answer_words)
+
+        input_tokens = _estimate_tokens(json.dumps(body.get("input", "")))
+        output_tokens = _estimate_tokens(text)
+        return {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": model,
+            "status": "completed",
+            "output": [
+                {
+                    "type": "message",
+                    "id": f"msg_{uuid.uuid4().hex}",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [
+                        {"type": "output_text", "text": text, "annotations": []}
+                    ],
+                }
+            ],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens,
+            },
+        }
+
+    def start_in_thread(self) -> threading.Thread:
+        """Serve in a daemon thread. Used by tests and in-process benchmarks."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
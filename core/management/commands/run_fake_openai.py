@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from core.fake_openai import FakeOpenAIConfig, FakeOpenAIServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local fake of the OpenAI API for load tests and benchmarks. "
+        "Point the app to it with DJANGO_OPENAI_BASE_URL=http://<host>:<port>/v1"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8400)
+        parser.add_argument(
+            "--latency-ms",
+            type=int,
+            default=300,
+            help="Delay before each response, or its first streamed chunk. Defaults to 300.",
+        )
+        parser.add_argument(
+            "--token-latency-ms",
+            type=int,
+            default=10,
+            help="Delay between streamed chunks. Defaults to 10.",
+        )
+        parser.add_argument(
+            "--answer-words",
+            type=int,
+            default=60,
+            help="Words of each chat answer. Defaults to 60.",
+        )
+        parser.add_argument(
+            "--batch-latency-ms",
+            type=int,
+            default=1000,
+            help="Delay until a batch job is completed. Defaults to 1000.",
+        )
+        parser.add_argument(
+            "--no-tool-calls",
+            action="store_true",
+            help="Answer chat requests directly, instead of calling the tools first.",
+        )
+
+    def handle(self, *args, **options):
+        config = FakeOpenAIConfig(
+            latency_ms=options["latency_ms"],
+            token_latency_ms=options["token_latency_ms"],
+            answer_words=options["answer_words"],
+            tool_calls=not options["no_tool_calls"],
+            batch_latency_ms=options["batch_latency_ms"],
+        )
+        server = FakeOpenAIServer((options["host"], options["port"]), config)
+        self.stdout.write(
+            self.style.SUCCESS(f"Fake OpenAI API listening at {server.base_url}")
+        )
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Requests served: {dict(server.request_counts)}")
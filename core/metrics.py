@@ -0,0 +1,94 @@
+"""Application-wide counters, stored in the default (redis) cache so that they are shared across processes."""
+
+import threading
+
+from django.core.cache import cache
+
+KEY_PREFIX = "metrics"
+
+# increments counted in-process, not yet added to the shared counters. see incr_local
+LOCAL_FLUSH_THRESHOLD = 100
+_local_counts: dict[str, int] = {}
+_local_lock = threading.Lock()
+
+
+def _get_key(name: str) -> str:
+    return f"{KEY_PREFIX}:{name}"
+
+
+def incr(name: str, delta: int = 1) -> None:
+    """Increments the counter by the given delta. Creates the counter if it does not exist.
+
+    Args:
+        name (str): Name of the counter.
+        delta (int): Value to add to the counter. Defaults to 1.
+    """
+    key = _get_key(name)
+    # a single round trip to redis once the counter exists. incr is atomic in redis.
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # the counter does not exist. add is a no-op if another process created it meanwhile.
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def incr_local(name: str, delta: int = 1) -> None:
+    """Increments the counter in-process, without a round trip to redis. For the counters of hot paths, e.g. in-process cache hits.
+    The increments are added to the shared counter in batches of LOCAL_FLUSH_THRESHOLD, or by flush_local.
+
+    Args:
+        name (str): Name of the counter.
+        delta (int): Value to add to the counter. Defaults to 1.
+    """
+    with _local_lock:
+        pending = _local_counts.pop(name, 0) + delta
+        if pending < LOCAL_FLUSH_THRESHOLD:
+            _local_counts[name] = pending
+            return
+
+    incr(name, pending)
+
+
+def flush_local() -> None:
+    """Adds the increments counted in-process to the shared counters. Called on paths that go to redis anyway."""
+    with _local_lock:
+        if not _local_counts:
+            return
+
+        pending = dict(_local_counts)
+        _local_counts.clear()
+
+    for name, delta in pending.items():
+        incr(name, delta)
+
+
+def get_counters(names: list[str]) -> dict[str, int]:
+    """Returns the current values of the given counters.
+
+    Args:
+        names (list[str]): Names of the counters.
+
+    Returns:
+        dict[str, int]: Counter values by name, including the increments pending in this process.
+            Missing counters are reported as 0.
+    """
+    values = cache.get_many([_get_key(name) for name in names])
+    with _local_lock:
+        return {
+            name: values.get(_get_key(name), 0) + _local_counts.get(name, 0)
+            for name in names
+        }
+
+
+def reset_counters(names: list[str]) -> None:
+    """Resets the given counters.
+
+    Args:
+        names (list[str]): Names of the counters.
+    """
+    with _local_lock:
+        for name in names:
+            _local_counts.pop(name, None)
+
+    cache.delete_many([_get_key(name) for name in names])
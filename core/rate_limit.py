@@ -0,0 +1,220 @@
+"""
+Cluster-wide rate limiting of the OpenAI API.
+
+Every process shares a pair of token buckets per model in redis: one for the requests per minute (RPM),
+and one for the tokens per minute (TPM). A request waits until both buckets can pay for it,
+instead of being sent and bouncing off OpenAI's 429 with the other workers.
+The limiter is an httpx request hook, so it covers every embeddings, responses and chat completions call
+of the clients created with get_http_client(), including the retries of the SDK.
+"""
+
+import json
+import logging
+import random
+import time
+from functools import cache
+
+import httpx
+import redis
+import tiktoken
+from django.conf import settings
+from openai import DefaultHttpxClient
+
+__all__ = [
+    "RateLimiter",
+    "estimate_tokens",
+    "get_http_client",
+]
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "openai_rate_limit"
+# the endpoints that count towards the limits
+LIMITED_PATHS = ("/chat/completions", "/responses", "/embeddings")
+# tokens added per message for its role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# refills both buckets by the time elapsed since their last update (redis time, shared by all the workers),
+# then either takes 1 request and the tokens, or returns the milliseconds to wait until both are available.
+# KEYS: requests bucket, tokens bucket. ARGV: requests per minute, tokens per minute, tokens of the request.
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local limits = {tonumber(ARGV[1]), tonumber(ARGV[2])}
+local costs = {1, math.min(tonumber(ARGV[3]), limits[2])}
+local levels = {}
+local wait = 0
+
+for index = 1, 2 do
+    local bucket = redis.call('HMGET', KEYS[index], 'level', 'updated')
+    local level = tonumber(bucket[1]) or limits[index]
+    local updated = tonumber(bucket[2]) or now
+    local rate = limits[index] / 60000
+    level = math.min(limits[index], level + math.max(0, now - updated) * rate)
+    levels[index] = level
+    if level < costs[index] then
+        wait = math.max(wait, math.ceil((costs[index] - level) / rate))
+    end
+end
+
+if wait == 0 then
+    for index = 1, 2 do
+        levels[index] = levels[index] - costs[index]
+    end
+end
+
+for index = 1, 2 do
+    redis.call('HSET', KEYS[index], 'level', tostring(levels[index]), 'updated', now)
+    redis.call('PEXPIRE', KEYS[index], 120000)
+end
+
+return wait
+"""
+
+
+@cache
+def _get_encoding() -> tiktoken.Encoding:
+    # an estimate. the encodings of the OpenAI models differ little in length.
+    return tiktoken.encoding_for_model("gpt-4o")
+
+
+def _count_tokens(text: str) -> int:
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
+
+def _collect_text(value) -> list[str]:
+    """Returns the strings within the (JSON) value."""
+    if isinstance(value, str):
+        return [value]
+
+    if isinstance(value, dict):
+        return [text for item in value.values() for text in _collect_text(item)]
+
+    if isinstance(value, list):
+        return [text for item in value for text in _collect_text(item)]
+
+    return []
+
+
+def estimate_tokens(path: str, body: dict) -> int:
+    """
+    Estimates the tokens that a request counts towards the TPM limit: the prompt, and the max. output tokens if set.
+
+    Args:
+        path (str): Path of the endpoint. Example: "/v1/chat/completions".
+        body (dict): The JSON body of the request.
+    Returns:
+        int: The estimated tokens.
+    """
+    if path.endswith("/embeddings"):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            return _count_tokens(inputs)
+
+        # a token array counts as its length
+        return sum(
+            _count_tokens(item) if isinstance(item, str) else len(item)
+            for item in inputs
+        )
+
+    messages = body.get("messages") or body.get("input") or []
+    if isinstance(messages, str):
+        messages = [messages]
+
+    tokens = sum(
+        _count_tokens("".join(_collect_text(message))) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+    for key in ("instructions", "tools", "text", "response_format"):
+        if key in body:
+            tokens += _count_tokens(json.dumps(body[key]))
+
+    max_output_tokens = (
+        body.get("max_completion_tokens")
+        or body.get("max_output_tokens")
+        or body.get("max_tokens")
+        or 0
+    )
+    return tokens + max_output_tokens
+
+
+class RateLimiter:
+    """
+    A pair of token buckets (RPM and TPM) per model, shared through redis.
+
+    Args:
+        redis_client (redis.Redis): The redis shared by the workers.
+        rpm (int): Requests per minute of each model.
+        tpm (int): Tokens per minute of each model.
+    """
+
+    def __init__(self, redis_client: redis.Redis, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._acquire = redis_client.register_script(ACQUIRE_SCRIPT)
+
+    def acquire(self, model: str, tokens: int) -> float:
+        """Waits until a request of the given tokens can be sent to the model, and takes its quota.
+
+        Args:
+            model (str): The model of the request. Each model has its own quota.
+            tokens (int): The estimated tokens of the request.
+        Returns:
+            float: Seconds waited.
+        """
+        keys = [f"{KEY_PREFIX}:{model}:requests", f"{KEY_PREFIX}:{model}:tokens"]
+        waited = 0.0
+        while True:
+            wait_ms = self._acquire(keys=keys, args=[self.rpm, self.tpm, tokens])
+            if wait_ms == 0:
+                if waited:
+                    logger.info(
+                        f"Waited {waited:.1f}s for the rate limit of {model} ({tokens} tokens)."
+                    )
+                return waited
+
+            # the jitter keeps the waiting workers from retrying in lockstep
+            delay = wait_ms / 1000 * random.uniform(1, 1.2)
+            time.sleep(delay)
+            waited += delay
+
+
+@cache
+def get_rate_limiter() -> RateLimiter | None:
+    """Returns the rate limiter of the process. None if no limit is set."""
+    if not settings.OPENAI_RPM_LIMIT or not settings.OPENAI_TPM_LIMIT:
+        return None
+
+    return RateLimiter(
+        redis.Redis.from_url(settings.OPENAI_RATE_LIMIT_REDIS_URL),
+        rpm=settings.OPENAI_RPM_LIMIT,
+        tpm=settings.OPENAI_TPM_LIMIT,
+    )
+
+
+def limit_request(request: httpx.Request) -> None:
+    """httpx request hook. Waits for the rate limit of the request's model, if the endpoint is limited."""
+    rate_limiter = get_rate_limiter()
+    if rate_limiter is None or not request.url.path.endswith(LIMITED_PATHS):
+        return
+
+    try:
+        body = json.loads(request.content or b"{}")
+    except ValueError:
+        return
+
+    tokens = estimate_tokens(request.url.path, body)
+    try:
+        rate_limiter.acquire(body.get("model", ""), tokens)
+    except redis.RedisError as error:
+        # fail open. OpenAI's 429 and the retries remain as the fallback.
+        logger.warning(f"OpenAI rate limiter is unavailable: {error}")
+
+
+def get_http_client() -> httpx.Client:
+    """Returns an HTTP client for the OpenAI SDK (and ChatOpenAI) that waits for the rate limit before each request.
+
+    Returns:
+        httpx.Client: Pass as http_client.
+    """
+    return DefaultHttpxClient(event_hooks={"request": [limit_request]})
@@ -1,4 +1,21 @@
-# Create your tests here.
+import json
+import threading
+import uuid
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI
+from openai import OpenAI
+
+from core import metrics
+from core.db import count_queries
+from core.rate_limit import RateLimiter, estimate_tokens, get_http_client
+from poc.models import Case
 
 
 def test_sample():
@@ -6,3 +23,226 @@ def test_sample():
     A sample test function that always passes.
     """
     assert True, "This is a sample test that should pass."
+
+
+@tool
+def case_details(thread_id: int) -> str:
+    """Returns the details of the case of the chat thread."""
+    return "Case details"
+
+
+def test_fake_openai_calls_the_offered_tools_then_answers(fake_openai):
+    llm = ChatOpenAI(model="gpt-4o", api_key="fake", base_url=fake_openai.base_url)
+    question = "Case thread ID: 7. Who are the parties?"
+
+    tool_call_message = llm.bind_tools([case_details]).invoke(question)
+    answer = llm.invoke(
+        [
+            ("user", question),
+            tool_call_message,
+            {
+                "role": "tool",
+                "content": "Case details",
+                "tool_call_id": tool_call_message.tool_calls[0]["id"],
+            },
+        ]
+    )
+
+    assert [call["name"] for call in tool_call_message.tool_calls] == ["case_details"]
+    assert tool_call_message.tool_calls[0]["args"] == {"thread_id": 7}
+    assert answer.content.startswith("Fake answer to: Case thread ID: 7.")
+
+
+def test_fake_openai_streams_the_answer(fake_openai):
+    fake_openai.config.answer_words = 10
+    llm = ChatOpenAI(
+        model="gpt-4o", api_key="fake", base_url=fake_openai.base_url, streaming=True
+    )
+
+    chunks = list(llm.stream("Who are the parties?"))
+
+    assert len(chunks) > 10
+    assert "".join(chunk.content for chunk in chunks).startswith(
+        "Fake answer to: Who are the parties?"
+    )
+
+
+def test_fake_openai_responses_conform_to_the_json_schema(fake_openai):
+    schema = {
+        "type": "object",
+        "properties": {
+            "events": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "event_date": {"type": "string"},
+                        "confidence": {"type": "number"},
+                        "kind": {"type": "string", "enum": ["filing", "hearing"]},
+                    },
+                },
+            }
+        },
+    }
+    client = OpenAI(api_key="fake", base_url=fake_openai.base_url)
+
+    response = client.responses.create(
+        model="gpt-5-mini",
+        input="Extract the events.",
+        text={"format": {"type": "json_schema", "name": "events", "schema": schema}},
+    )
+
+    events = json.loads(response.output_text)["events"]
+    assert len(events) == 3
+    assert events[0] == {
+        "event_date": "2024-01-01",
+        "confidence": 0.8,
+        "kind": "filing",
+    }
+
+
+def test_fake_openai_distinct_outputs_answer_the_prompted_schema(fake_openai):
+    fake_openai.config.default_schema = {
+        "type": "object",
+        "properties": {
+            "events": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"event_date": {"type": "string"}},
+                },
+            }
+        },
+    }
+    fake_openai.config.distinct_outputs = True
+    client = OpenAI(api_key="fake", base_url=fake_openai.base_url)
+
+    # no json_schema format. the prompt asks for JSON.
+    first, second = (
+        json.loads(client.responses.create(model="gpt-5-mini", input=text).output_text)[
+            "events"
+        ]
+        for text in ("Reconstruct the events.", "Reconstruct the other events.")
+    )
+
+    assert len(first) == 3
+    assert first != second
+    assert all(date.fromisoformat(event["event_date"]) for event in first + second)
+
+
+def test_fake_openai_embeddings_are_deterministic(fake_openai):
+    client = OpenAI(api_key="fake", base_url=fake_openai.base_url)
+
+    # the SDK requests base64 encoded embeddings by default
+    first = client.embeddings.create(model="text-embedding-3-small", input=["a", "b"])
+    second = client.embeddings.create(
+        model="text-embedding-3-small", input="a", encoding_format="float"
+    )
+
+    assert len(first.data[0].embedding) == 1536
+    assert first.data[0].embedding == pytest.approx(second.data[0].embedding)
+    assert first.data[0].embedding != first.data[1].embedding
+    assert sum(value * value for value in first.data[0].embedding) == pytest.approx(1)
+    assert fake_openai.request_counts["embeddings"] == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_count_queries_counts_concurrent_blocks_separately():
+    counts = {}
+    barrier = threading.Barrier(2)
+
+    def _run(name: str, queries: int):
+        with count_queries() as counter:
+            barrier.wait()
+            for _ in range(queries):
+                Case.objects.exists()
+            barrier.wait()
+
+        counts[name] = counter.count
+
+    threads = [
+        threading.Thread(target=_run, args=("one", 1)),
+        threading.Thread(target=_run, args=("three", 3)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counts == {"one": 1, "three": 3}
+
+
+def test_rate_limiter_waits_for_the_tokens_to_refill():
+    redis_client = redis.Redis.from_url(settings.OPENAI_RATE_LIMIT_REDIS_URL)
+    # 100 tokens per second
+    rate_limiter = RateLimiter(redis_client, rpm=1000, tpm=6000)
+    model = f"test-{uuid.uuid4()}"
+
+    try:
+        # the bucket starts full
+        assert rate_limiter.acquire(model, 6000) == 0
+        waited = rate_limiter.acquire(model, 50)
+    finally:
+        redis_client.delete(
+            f"openai_rate_limit:{model}:requests", f"openai_rate_limit:{model}:tokens"
+        )
+
+    assert 0.4 < waited < 1
+
+
+def test_token_estimates_include_the_prompt_and_the_max_output():
+    chat_tokens = estimate_tokens(
+        "/v1/chat/completions",
+        {
+            "model": "gpt-4o",
+            "messages": [{"role": "user", "content": "word " * 100}],
+            "max_tokens": 500,
+        },
+    )
+    embedding_tokens = estimate_tokens(
+        "/v1/embeddings",
+        {"model": "text-embedding-3-small", "input": [" ".join(["word"] * 10)]},
+    )
+
+    assert 600 <= chat_tokens < 620
+    assert embedding_tokens == 10
+
+
+def test_openai_requests_wait_for_the_rate_limit(fake_openai):
+    client = OpenAI(
+        api_key="fake", base_url=fake_openai.base_url, http_client=get_http_client()
+    )
+    rate_limiter = MagicMock()
+
+    with patch("core.rate_limit.get_rate_limiter", return_value=rate_limiter):
+        client.embeddings.create(
+            model="text-embedding-3-small", input=" ".join(["word"] * 10)
+        )
+        client.responses.create(model="gpt-5-mini", input="Extract the events.")
+
+    assert [call.args for call in rate_limiter.acquire.call_args_list] == [
+        ("text-embedding-3-small", 10),
+        (
+            "gpt-5-mini",
+            estimate_tokens("/v1/responses", {"input": "Extract the events."}),
+        ),
+    ]
+
+
+def test_local_increments_are_added_to_the_counter_in_batches():
+    name = f"test.{uuid.uuid4()}"
+
+    try:
+        for _ in range(metrics.LOCAL_FLUSH_THRESHOLD - 1):
+            metrics.incr_local(name)
+        assert metrics.get_counters([name]) == {name: metrics.LOCAL_FLUSH_THRESHOLD - 1}
+        assert cache.get(metrics._get_key(name)) is None
+
+        metrics.incr_local(name)
+        metrics.incr_local(name)
+        assert cache.get(metrics._get_key(name)) == metrics.LOCAL_FLUSH_THRESHOLD
+
+        metrics.flush_local()
+        assert cache.get(metrics._get_key(name)) == metrics.LOCAL_FLUSH_THRESHOLD + 1
+    finally:
+        metrics.reset_counters([name])
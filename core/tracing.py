@@ -0,0 +1,182 @@
+"""
+Per-request latency spans. A trace collects the spans of one unit of work, e.g. a chat turn.
+LLM and tool runs of langchain are recorded by a callback handler. Other code records spans with span().
+Both are no-ops outside a trace.
+"""
+
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+__all__ = [
+    "Span",
+    "Trace",
+    "span",
+    "trace",
+]
+
+
+@dataclass
+class Span:
+    kind: str  # example: "llm", "tool", "history"
+    name: str  # example: the model or tool name
+    start_ms: float  # since the start of the trace
+    duration_ms: float
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    rows: int | None = None  # results returned by a tool
+    error: bool = False
+
+
+@dataclass
+class Trace:
+    """The spans of one unit of work. Spans may be added from several threads."""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    spans: list[Span] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, kind: str, name: str, started_at: float, **kwargs) -> Span:
+        """Add a span that started at the given perf_counter value and ends now."""
+        finished_at = time.perf_counter()
+        new_span = Span(
+            kind=kind,
+            name=name,
+            start_ms=(started_at - self.started_at) * 1000,
+            duration_ms=(finished_at - started_at) * 1000,
+            **kwargs,
+        )
+        with self._lock:
+            self.spans.append(new_span)
+
+        return new_span
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+def _count_rows(output: Any) -> int | None:
+    if isinstance(output, (list, tuple)):
+        return len(output)
+
+    if isinstance(output, dict):
+        return 1
+
+    return None
+
+
+class SpanCallbackHandler(BaseCallbackHandler):
+    """Records the LLM and tool runs of langchain as spans of the trace."""
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        # run ID -> (name, started at)
+        self._runs: dict[UUID, tuple[str, float]] = {}
+
+    def _start(self, run_id: UUID, name: str):
+        self._runs[run_id] = (name, time.perf_counter())
+
+    def _end(self, run_id: UUID, kind: str, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+
+        name, started_at = run
+        self.trace.add(kind, name, started_at, **kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        self._start(run_id, params.get("model") or params.get("model_name") or "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        self._start(run_id, params.get("model") or params.get("model_name") or "llm")
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        usage = None
+        generations = response.generations[0] if response.generations else []
+        if generations and isinstance(generations[0], ChatGeneration):
+            message = generations[0].message
+            if isinstance(message, AIMessage):
+                # not reported by streaming calls, unless stream_usage is set
+                usage = message.usage_metadata
+
+        self._end(
+            run_id,
+            "llm",
+            input_tokens=usage["input_tokens"] if usage else None,
+            output_tokens=usage["output_tokens"] if usage else None,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "llm", error=True)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, (serialized or {}).get("name") or "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, "tool", rows=_count_rows(output))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "tool", error=True)
+
+
+# adds the handler of the current trace to every langchain run, like get_usage_metadata_callback
+_span_handler: ContextVar[SpanCallbackHandler | None] = ContextVar(
+    "span_callback_handler", default=None
+)
+register_configure_hook(_span_handler, inheritable=True)
+
+
+@contextmanager
+def trace() -> Generator[Trace, None, None]:
+    """
+    Collect the spans of the block, including those of the threads that copy the block's context.
+
+    Yields:
+        Trace: The trace of the block.
+    """
+    new_trace = Trace()
+    trace_token = _current_trace.set(new_trace)
+    handler_token = _span_handler.set(SpanCallbackHandler(new_trace))
+    try:
+        yield new_trace
+    finally:
+        _span_handler.reset(handler_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(kind: str, name: str) -> Generator[dict, None, None]:
+    """
+    Record the block as a span of the current trace, if any.
+
+    Args:
+        kind (str): Kind of the span. Example: "history".
+        name (str): Name of the span. Example: the model name.
+
+    Yields:
+        dict: Extra fields of the span (input_tokens, output_tokens, rows). Set by the block.
+    """
+    current_trace = _current_trace.get()
+    extra = {}
+    started_at = time.perf_counter()
+    try:
+        yield extra
+    except Exception:
+        if current_trace is not None:
+            current_trace.add(kind, name, started_at, error=True, **extra)
+        raise
+
+    if current_trace is not None:
+        current_trace.add(kind, name, started_at, **extra)
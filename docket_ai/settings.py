@@ -183,6 +183,67 @@ ADMINS = [
 SERVER_EMAIL = os.getenv("DJANGO_SERVER_EMAIL", "root@localhost")
 
 OPENAI_API_KEY = os.getenv("DJANGO_OPENAI_API_KEY")
+# base URL of an OpenAI compatible API. example: a local fake server for load tests (see core.fake_openai)
+OPENAI_BASE_URL = os.getenv("DJANGO_OPENAI_BASE_URL") or None
+
+# max. tokens of chat history replayed verbatim to the agent.
+# older messages are folded into a rolling summary of the thread.
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("DJANGO_CHAT_HISTORY_TOKEN_BUDGET", 3000))
+
+# the tool calls of an agent step run concurrently in a pool of threads shared by the process.
+# a tool call that runs longer than the timeout (in seconds) is reported to the agent as timed out.
+CHAT_TOOL_MAX_WORKERS = int(os.getenv("DJANGO_CHAT_TOOL_MAX_WORKERS", 8))
+CHAT_TOOL_TIMEOUT = float(os.getenv("DJANGO_CHAT_TOOL_TIMEOUT", 10))
+
+# how the chat turns are answered. "agent" (tool-calling loop) or "retrieve_first"
+# (fixed retrieval and a single LLM call, falling back to the agent). see poc.langchain.chat_agent.AnswerMode
+CHAT_ANSWER_MODE = os.getenv("DJANGO_CHAT_ANSWER_MODE", "agent")
+# max. tokens of retrieved context packed into the prompt in the retrieve_first mode
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("DJANGO_CHAT_CONTEXT_TOKEN_BUDGET", 6000))
+# max. tokens of the re-ranked snippets returned by a semantic search tool call
+CHAT_SNIPPET_TOKEN_BUDGET = int(os.getenv("DJANGO_CHAT_SNIPPET_TOKEN_BUDGET", 1500))
+
+# answers to the standalone questions about a case are reused for similar questions,
+# until the case's data changes. similarity is the cosine similarity of the question embeddings.
+CHAT_ANSWER_CACHE_ENABLED = os.getenv(
+    "DJANGO_CHAT_ANSWER_CACHE_ENABLED", "True"
+).lower() in ("true", "1", "yes")
+CHAT_ANSWER_CACHE_SIMILARITY = float(
+    os.getenv("DJANGO_CHAT_ANSWER_CACHE_SIMILARITY", 0.95)
+)
+
+# max. tokens of the content sent in a single LLM call of the timeline's candidate extraction (pass 1).
+# larger exhibits are split into windows on document and page boundaries, and extracted in parallel.
+TIMELINE_WINDOW_TOKENS = int(os.getenv("DJANGO_TIMELINE_WINDOW_TOKENS", 16000))
+TIMELINE_EXTRACTION_MAX_WORKERS = int(
+    os.getenv("DJANGO_TIMELINE_EXTRACTION_MAX_WORKERS", 4)
+)
+# max. tokens of the candidate events sent in a single LLM call of the timeline's event reconstruction (pass 2).
+# larger timelines are partitioned by date, reconstructed in parallel, and merged at the partition boundaries.
+TIMELINE_PARTITION_TOKENS = int(os.getenv("DJANGO_TIMELINE_PARTITION_TOKENS", 12000))
+TIMELINE_RECONSTRUCTION_MAX_WORKERS = int(
+    os.getenv("DJANGO_TIMELINE_RECONSTRUCTION_MAX_WORKERS", 4)
+)
+# near-duplicate candidate events (e.g. an email summarised from its body and its attachment) are clustered before pass 2,
+# which receives one representative per cluster. candidates are clustered when the cosine similarity of their embeddings
+# is at least TIMELINE_CLUSTER_SIMILARITY, and their dates are at most TIMELINE_CLUSTER_MAX_DAYS apart.
+TIMELINE_CLUSTERING_ENABLED = os.getenv(
+    "DJANGO_TIMELINE_CLUSTERING_ENABLED", "True"
+).lower() in ("true", "1", "yes")
+TIMELINE_CLUSTER_SIMILARITY = float(
+    os.getenv("DJANGO_TIMELINE_CLUSTER_SIMILARITY", 0.9)
+)
+TIMELINE_CLUSTER_MAX_DAYS = int(os.getenv("DJANGO_TIMELINE_CLUSTER_MAX_DAYS", 1))
+# seconds between the checks of a timeline's batch job, in the batch extraction mode (see events.models.Timeline.ExtractionMode)
+TIMELINE_BATCH_POLL_INTERVAL = int(os.getenv("DJANGO_TIMELINE_BATCH_POLL_INTERVAL", 60))
+# responses of the timeline's LLM calls, keyed by a hash of the request. see events.llm_cache.CacheMode.
+# "off", "read_through" (reuse, else call and cache), "record" (call and cache) or "replay" (cache only, offline).
+TIMELINE_LLM_CACHE_MODE = os.getenv("DJANGO_TIMELINE_LLM_CACHE_MODE", "off")
+# "db" (shared by the workers) or "file" (one JSON file per response, in TIMELINE_LLM_CACHE_DIR)
+TIMELINE_LLM_CACHE_STORE = os.getenv("DJANGO_TIMELINE_LLM_CACHE_STORE", "db")
+TIMELINE_LLM_CACHE_DIR = os.getenv(
+    "DJANGO_TIMELINE_LLM_CACHE_DIR", str(BASE_DIR / "llm_cache")
+)
 
 # django-rest-framework
 REST_FRAMEWORK = {
@@ -212,6 +273,28 @@ CACHES = {
     }
 }
 
+# cluster-wide rate limit of the OpenAI API, per model, shared by the web and celery workers through redis.
+# set both to the limits of the account's tier to pace the requests. 0 disables the limiter. see core.rate_limit
+OPENAI_RPM_LIMIT = int(os.getenv("DJANGO_OPENAI_RPM_LIMIT", 0))
+OPENAI_TPM_LIMIT = int(os.getenv("DJANGO_OPENAI_TPM_LIMIT", 0))
+OPENAI_RATE_LIMIT_REDIS_URL = (
+    f"redis://{REDIS_CACHE_HOST}:{REDIS_CACHE_PORT}/{REDIS_CACHE_DB}"
+)
+
+# the lock of a chat thread, held by the celery worker answering its pending messages. see poc.tasks
+CHAT_THREAD_LOCK_REDIS_URL = (
+    f"redis://{REDIS_CACHE_HOST}:{REDIS_CACHE_PORT}/{REDIS_CACHE_DB}"
+)
+
+# live progress of the timelines, published by the celery workers and streamed by the web workers through redis pub/sub.
+# a progress stream ends after TIMELINE_PROGRESS_STREAM_TIMEOUT seconds, and the client reconnects. see events.progress
+TIMELINE_PROGRESS_REDIS_URL = (
+    f"redis://{REDIS_CACHE_HOST}:{REDIS_CACHE_PORT}/{REDIS_CACHE_DB}"
+)
+TIMELINE_PROGRESS_STREAM_TIMEOUT = int(
+    os.getenv("DJANGO_TIMELINE_PROGRESS_STREAM_TIMEOUT", 300)
+)
+
 # redis as message broker (for celery)
 REDIS_BROKER_HOST = os.getenv("DJANGO_REDIS_BROKER_HOST", "docket_ai-redis")
 REDIS_BROKER_PORT = os.getenv("DJANGO_REDIS_BROKER_PORT", 6379)
@@ -223,6 +306,12 @@ REDIS_BROKER_DB = os.getenv(
 CELERY_BROKER_URL = f"redis://{REDIS_BROKER_HOST}:{REDIS_BROKER_PORT}/{REDIS_BROKER_DB}"
 CELERY_CACHE_BACKEND = "django-cache"
 CELERY_RESULT_BACKEND = "django-db"
+# chat turns run on a dedicated queue, so that a burst of chat messages
+# does not hold up file processing and timelines (and vice versa)
+CELERY_TASK_ROUTES = {
+    "poc.tasks.answer_chat_thread": {"queue": "chat"},
+    "poc.tasks.summarize_chat_thread": {"queue": "chat"},
+}
 
 # Logging
 LOGGING = {
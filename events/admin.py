@@ -1,6 +1,12 @@
 from django.contrib import admin
 
-from .models import Timeline, TimelineEvent, TimelineExhibit
+from .models import (
+    CandidateExtraction,
+    ExtractionBatch,
+    Timeline,
+    TimelineEvent,
+    TimelineExhibit,
+)
 
 
 class TimelineExhibitInline(admin.TabularInline):
@@ -29,3 +35,36 @@ class TimelineEventAdmin(admin.ModelAdmin):
     list_display = ("id", "title", "timeline", "event_date")
     list_display_links = ("title",)
     ordering = ("-created_at",)
+
+
+@admin.register(CandidateExtraction)
+class CandidateExtractionAdmin(admin.ModelAdmin):
+    # delete an extraction to extract the exhibit again
+    list_display = ("id", "exhibit", "model", "created_at")
+    list_display_links = ("exhibit",)
+    list_filter = ("model",)
+    readonly_fields = (
+        "exhibit",
+        "content_hash",
+        "prompt_version",
+        "model",
+        "case_context_hash",
+        "events",
+    )
+    ordering = ("-created_at",)
+
+
+@admin.register(ExtractionBatch)
+class ExtractionBatchAdmin(admin.ModelAdmin):
+    list_display = ("id", "timeline", "status", "openai_status", "created_at")
+    list_display_links = ("timeline",)
+    list_filter = ("status",)
+    readonly_fields = (
+        "timeline",
+        "openai_batch_id",
+        "input_file_id",
+        "status",
+        "openai_status",
+        "exhibits",
+    )
+    ordering = ("-created_at",)
@@ -1,7 +1,8 @@
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
 
-from events.models import Timeline, TimelineEvent, TimelineExhibit
+from events.models import CandidateEvent, Timeline, TimelineEvent, TimelineExhibit
 from poc.models import UploadedFile
 
 
@@ -21,6 +22,7 @@ class TimelineCreateSerializer(serializers.ModelSerializer):
             "name",
             "case",
             "exhibits",
+            "extraction_mode",
             "event_extraction_status",
             "is_active",
             "created_by",
@@ -106,6 +108,103 @@ class TimelineCreateSerializer(serializers.ModelSerializer):
         return timeline
 
 
+class TimelineRefreshSerializer(serializers.Serializer):
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list
+    )
+
+    def validate(self, attrs):
+        timeline = self.instance
+        add_ids = set(attrs["add"])
+        remove_ids = set(attrs["remove"])
+
+        if timeline.event_extraction_status == Timeline.Status.PROCESSING:
+            raise ValidationError("Timeline is being processed. Try again later.")
+
+        if (
+            timeline.event_extraction_status != Timeline.Status.COMPLETED
+            and timeline.pending_refresh is None
+        ):
+            # a failed refresh can be refreshed again. a failed timeline cannot.
+            raise ValidationError("Only a processed timeline can be refreshed.")
+
+        if not add_ids and not remove_ids:
+            raise ValidationError("Add or remove at least one exhibit.")
+
+        if add_ids & remove_ids:
+            raise ValidationError(
+                {"remove": "An exhibit cannot be added and removed at once."}
+            )
+
+        current_ids = set(timeline.exhibits.values_list("exhibit_id", flat=True))
+
+        if add_ids & current_ids:
+            raise ValidationError(
+                {"add": "One or more exhibits are already in the timeline."}
+            )
+
+        exhibits_queryset = UploadedFile.active_objects.filter(
+            case=timeline.case, id__in=add_ids
+        )
+        if exhibits_queryset.count() != len(add_ids):
+            raise ValidationError(
+                {"add": "One or more exhibits are invalid for the given case."}
+            )
+
+        if not remove_ids <= current_ids:
+            raise ValidationError(
+                {"remove": "One or more exhibits are not in the timeline."}
+            )
+
+        if not (current_ids - remove_ids) | add_ids:
+            raise ValidationError(
+                {"remove": "A timeline must have at least one exhibit."}
+            )
+
+        attrs["_resolved_exhibits"] = exhibits_queryset
+        return attrs
+
+    def update(self, instance, validated_data):
+        removed_exhibits = instance.exhibits.filter(
+            exhibit_id__in=validated_data["remove"]
+        )
+        # the events of these days are reconstructed without the removed exhibits
+        removed_dates = {
+            timezone.localdate(event_date).isoformat()
+            for event_date in CandidateEvent.objects.filter(
+                timeline_exhibit__in=removed_exhibits
+            ).values_list("event_date", flat=True)
+        }
+        removed_ids = set(removed_exhibits.values_list("id", flat=True))
+        removed_exhibits.delete()
+
+        added_exhibits = TimelineExhibit.objects.bulk_create(
+            [
+                TimelineExhibit(timeline=instance, exhibit=exhibit)
+                for exhibit in validated_data["_resolved_exhibits"]
+            ]
+        )
+
+        # a failed refresh is carried over
+        pending_refresh = instance.pending_refresh or {"dates": [], "exhibits": []}
+        instance.pending_refresh = {
+            "dates": sorted(set(pending_refresh["dates"]) | removed_dates),
+            "exhibits": [
+                exhibit_id
+                for exhibit_id in pending_refresh["exhibits"]
+                if exhibit_id not in removed_ids
+            ]
+            + [timeline_exhibit.id for timeline_exhibit in added_exhibits],
+        }
+        instance.event_extraction_status = Timeline.Status.PROCESSING
+        instance.save(update_fields=["pending_refresh", "event_extraction_status"])
+
+        return instance
+
+
 class TimelineSerializer(serializers.ModelSerializer):
     class Meta:
         model = Timeline
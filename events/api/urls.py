@@ -4,7 +4,9 @@ from events.api.views import (
     ListCreateTimelineAPI,
     ListTimelineEventsAPI,
     ListTimelineExhibitsAPI,
+    RefreshTimelineAPI,
     RetrieveTimelineAPI,
+    StreamTimelineProgressAPI,
 )
 
 app_name = "events"
@@ -25,4 +27,14 @@ urlpatterns = [
         ListTimelineExhibitsAPI.as_view(),
         name="timeline_exhibits",
     ),
+    path(
+        "timelines/<int:timeline_id>/refresh/",
+        RefreshTimelineAPI.as_view(),
+        name="timeline_refresh",
+    ),
+    path(
+        "timelines/<int:timeline_id>/progress/",
+        StreamTimelineProgressAPI.as_view(),
+        name="timeline_progress",
+    ),
 ]
@@ -1,20 +1,29 @@
 import uuid
 
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import status
-from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveAPIView
+from rest_framework.generics import (
+    GenericAPIView,
+    ListAPIView,
+    ListCreateAPIView,
+    RetrieveAPIView,
+)
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from events.api.serializers import (
     TimelineCreateSerializer,
     TimelineEventSerializer,
     TimelineExhibitSerializer,
+    TimelineRefreshSerializer,
     TimelineSerializer,
 )
 from events.models import Timeline
-from events.tasks import start_timeline_processing
+from events.progress import stream_timeline_progress
+from events.tasks import start_timeline_processing, start_timeline_refresh
 from poc.models import Case
 
 __all__ = [
@@ -22,6 +31,8 @@ __all__ = [
     "RetrieveTimelineAPI",
     "ListTimelineEventsAPI",
     "ListTimelineExhibitsAPI",
+    "RefreshTimelineAPI",
+    "StreamTimelineProgressAPI",
 ]
 
 
@@ -108,3 +119,56 @@ class ListTimelineExhibitsAPI(ListAPIView):
         timeline_id = self.kwargs.get("timeline_id")
         timeline = get_object_or_404(Timeline, id=timeline_id)
         return timeline.exhibits.filter(exhibit__is_deleted=False).order_by("id")
+
+
+class RefreshTimelineAPI(GenericAPIView):
+    """
+    Adds or removes exhibits of a processed timeline.
+    Only the added exhibits are extracted, and only the dates affected by the change are reconstructed.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = TimelineRefreshSerializer
+
+    def get_queryset(self):
+        return Timeline.objects.filter(created_by=self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        with transaction.atomic():
+            # concurrent refreshes of the timeline are serialized
+            timeline = get_object_or_404(
+                self.get_queryset().select_for_update(),
+                id=self.kwargs.get("timeline_id"),
+            )
+            serializer = self.get_serializer(timeline, data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            transaction.on_commit(lambda: start_timeline_refresh.delay(timeline.id))
+
+        return Response(
+            TimelineSerializer(timeline).data, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class StreamTimelineProgressAPI(APIView):
+    """
+    Streams the progress of a timeline as Server-Sent Events, until it has completed or failed.
+    Each event carries the status and the candidate events of each exhibit, and the ETA of the extraction.
+    Replaces polling RetrieveTimelineAPI and ListTimelineExhibitsAPI while the timeline is processed.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        timeline = get_object_or_404(
+            Timeline.objects.filter(created_by=request.user),
+            id=self.kwargs.get("timeline_id"),
+        )
+        response = StreamingHttpResponse(
+            stream_timeline_progress(timeline.id),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # disable response buffering in nginx
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,241 @@
+"""
+Record/replay cache of the LLM responses of the timeline pipeline.
+The responses are keyed by a hash of the request (model, prompt, input and response schema),
+so that identical requests are answered from the cache instead of the API.
+The embeddings of the candidate events (see TimelineEventReconstructor) are cached alike,
+so that a replayed run clusters the candidates as the recorded one did.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from openai import OpenAIError
+
+from .models import LLMResponse
+
+__all__ = [
+    "CacheMode",
+    "CachedEmbedding",
+    "CachedEmbeddings",
+    "CachedResponse",
+    "CachingEmbeddings",
+    "CachingResponses",
+    "DatabaseStore",
+    "FileStore",
+    "LLMCacheMiss",
+    "get_request_key",
+]
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMode:
+    # every request is sent to the API
+    OFF = "off"
+    # cached responses are reused. the others are sent to the API and cached.
+    READ_THROUGH = "read_through"
+    # every request is sent to the API, and its response cached (overwriting the earlier one)
+    RECORD = "record"
+    # only cached responses are used. a request that is not cached fails. no API calls.
+    REPLAY = "replay"
+
+    choices = [OFF, READ_THROUGH, RECORD, REPLAY]
+
+
+class LLMCacheMiss(OpenAIError):
+    """Raised in the replay mode for a request that was not recorded."""
+
+
+@dataclass
+class CachedResponse:
+    """The part of an OpenAI response used by the timeline pipeline."""
+
+    output_text: str
+
+
+@dataclass
+class CachedEmbedding:
+    embedding: list[float]
+
+
+@dataclass
+class CachedEmbeddings:
+    """The part of an OpenAI embeddings response used by the timeline pipeline."""
+
+    data: list[CachedEmbedding]
+
+
+def get_request_key(request: dict[str, Any]) -> str:
+    """Hashes the arguments of a responses.create call.
+
+    Args:
+        request (dict[str, Any]): The keyword arguments of the call. Must be JSON serializable.
+    Returns:
+        str: The SHA-256 of the request, independent of the order of its keys.
+    """
+    content = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class DatabaseStore:
+    """Stores the responses in the database (LLMResponse). Shared by all the workers."""
+
+    def get(self, key: str) -> str | None:
+        return (
+            LLMResponse.objects.filter(key=key)
+            .values_list("output_text", flat=True)
+            .first()
+        )
+
+    def set(self, key: str, model: str, output_text: str) -> None:
+        LLMResponse.objects.update_or_create(
+            key=key, defaults={"model": model, "output_text": output_text}
+        )
+
+
+class FileStore:
+    """
+    Stores the responses as JSON files in a directory, one per request.
+    The directory can be committed or copied along with a benchmark, to replay it offline.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    def _get_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        try:
+            with open(self._get_path(key), "r") as file:
+                return json.load(file)["output_text"]
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, model: str, output_text: str) -> None:
+        path = self._get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # written to a temporary file and renamed, so that concurrent readers never see a partial file
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, suffix=".tmp", delete=False
+        ) as file:
+            json.dump({"model": model, "output_text": output_text}, file)
+
+        os.replace(file.name, path)
+
+
+def get_store() -> DatabaseStore | FileStore:
+    if settings.TIMELINE_LLM_CACHE_STORE == "file":
+        return FileStore(settings.TIMELINE_LLM_CACHE_DIR)
+
+    return DatabaseStore()
+
+
+class _CachingResource:
+    """
+    Wraps a resource of an OpenAI client. Only create() is supported.
+
+    Args:
+        resource: The resource of the client, e.g. OpenAI().responses.
+        mode (str | None): One of CacheMode.choices. Defaults to settings.TIMELINE_LLM_CACHE_MODE.
+        store (DatabaseStore | FileStore | None): Defaults to the store of settings.TIMELINE_LLM_CACHE_STORE.
+    """
+
+    def __init__(self, resource, mode: str | None = None, store=None):
+        self.resource = resource
+        self.mode = mode or settings.TIMELINE_LLM_CACHE_MODE
+        if self.mode not in CacheMode.choices:
+            raise ValueError(
+                f"Invalid LLM cache mode '{self.mode}'. Expected one of {CacheMode.choices}."
+            )
+
+        self.store = store
+        if self.store is None and self.mode != CacheMode.OFF:
+            self.store = get_store()
+
+    def _get_key(self, request: dict[str, Any]) -> str:
+        return get_request_key(request)
+
+    def _dump(self, response) -> str:
+        raise NotImplementedError
+
+    def _load(self, text: str) -> Any:
+        raise NotImplementedError
+
+    def create(self, **kwargs) -> Any:
+        if self.mode == CacheMode.OFF:
+            return self.resource.create(**kwargs)
+
+        key = self._get_key(kwargs)
+        if self.mode in (CacheMode.READ_THROUGH, CacheMode.REPLAY):
+            text = self.store.get(key)
+            if text is not None:
+                logger.debug(f"LLM response {key} answered from the cache.")
+                return self._load(text)
+
+            if self.mode == CacheMode.REPLAY:
+                raise LLMCacheMiss(
+                    f"No recorded LLM response for request {key} (model: {kwargs.get('model')})."
+                )
+
+        response = self.resource.create(**kwargs)
+        self.store.set(key, kwargs.get("model", ""), self._dump(response))
+        return response
+
+
+class CachingResponses(_CachingResource):
+    """
+    Wraps the responses resource of an OpenAI client, e.g. OpenAI().responses. Only create() is supported.
+    """
+
+    @property
+    def responses(self):
+        return self.resource
+
+    def _dump(self, response) -> str:
+        return response.output_text
+
+    def _load(self, text: str) -> CachedResponse:
+        return CachedResponse(output_text=text)
+
+
+class CachingEmbeddings(_CachingResource):
+    """
+    Wraps the embeddings resource of an OpenAI client, e.g. OpenAI().embeddings. Only create() is supported.
+    The embeddings are stored as base64 encoded float32 values, as the API sends them.
+    """
+
+    def _get_key(self, request: dict[str, Any]) -> str:
+        # never the key of a responses request
+        return get_request_key({"endpoint": "embeddings", **request})
+
+    def _dump(self, response) -> str:
+        return json.dumps(
+            [
+                base64.b64encode(
+                    np.asarray(item.embedding, dtype="<f4").tobytes()
+                ).decode("ascii")
+                for item in response.data
+            ]
+        )
+
+    def _load(self, text: str) -> CachedEmbeddings:
+        return CachedEmbeddings(
+            data=[
+                CachedEmbedding(
+                    embedding=np.frombuffer(
+                        base64.b64decode(item), dtype="<f4"
+                    ).tolist()
+                )
+                for item in json.loads(text)
+            ]
+        )
@@ -0,0 +1,398 @@
+import json
+import random
+import resource
+import shutil
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from celery import current_app
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from core.db import count_queries
+from core.fake_openai import FakeOpenAIConfig, FakeOpenAIServer
+from events.models import CandidateEvent, Timeline, TimelineEvent, TimelineExhibit
+from events.progress import stream_timeline_progress
+from events.services import TimelineEventReconstructor
+from events.tasks import start_timeline_processing
+from poc.models import Case, UploadedFile
+
+ACTIONS = ["signed", "sent", "received", "paid", "terminated", "amended", "disputed"]
+PARTIES = ["the claimant", "the respondent", "the supplier", "the bank", "the court"]
+SUBJECTS = ["the agreement", "a notice", "the invoice", "the payment", "an email"]
+
+
+class TaskTimer:
+    """
+    Exclusive seconds and queries of each Celery task run in this process, i.e. in the eager mode.
+    A task started by another one (e.g. the reconstruction, by the last extraction) is excluded from its parent.
+    """
+
+    def __init__(self):
+        self.tasks: dict[str, dict] = {}
+        self.started_at: dict[str, float] = {}
+        # task ID -> (start, seconds of the nested tasks, count_queries block, counter)
+        self._running: dict[str, tuple] = {}
+        self._stack: list[str] = []
+
+    def _on_prerun(self, task_id=None, task=None, **kwargs):
+        self.started_at.setdefault(task.name, time.perf_counter())
+        block = count_queries()
+        self._running[task_id] = (time.perf_counter(), [0.0], block, block.__enter__())
+        self._stack.append(task_id)
+
+    def _on_postrun(self, task_id=None, task=None, **kwargs):
+        if task_id not in self._running:
+            return
+
+        started_at, nested, block, counter = self._running.pop(task_id)
+        block.__exit__(None, None, None)
+        self._stack.remove(task_id)
+        elapsed = time.perf_counter() - started_at
+        if self._stack:
+            self._running[self._stack[-1]][1][0] += elapsed
+
+        stats = self.tasks.setdefault(
+            task.name, {"calls": 0, "seconds": 0.0, "queries": 0, "db_seconds": 0.0}
+        )
+        stats["calls"] += 1
+        stats["seconds"] += elapsed - nested[0]
+        stats["queries"] += counter.count
+        stats["db_seconds"] += counter.seconds
+
+    def __enter__(self):
+        task_prerun.connect(self._on_prerun, weak=False)
+        task_postrun.connect(self._on_postrun, weak=False)
+        return self
+
+    def __exit__(self, *exc_info):
+        task_prerun.disconnect(self._on_prerun)
+        task_postrun.disconnect(self._on_postrun)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the timeline pipeline (PASS-1 extraction, fan-in, PASS-2 reconstruction) end to end. "
+        "Seeds a synthetic case with the given numbers of exhibits, and processes a timeline over each "
+        "against a fake OpenAI API with the given latency. "
+        "Prints one JSON object per run: the stage timings, the queries and DB time, the LLM requests and time, "
+        "and the peak memory. "
+        "In the worker mode, the tasks run on the Celery workers, and only the stage timings and the LLM "
+        "are measured. The queries and the memory are those of this process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--exhibits",
+            type=int,
+            nargs="+",
+            default=[10],
+            help="Numbers of exhibits to benchmark, one run each. Example: --exhibits 10 100 1000. Defaults to 10.",
+        )
+        parser.add_argument(
+            "--words",
+            type=int,
+            default=400,
+            help="Words of each exhibit. Defaults to 400.",
+        )
+        parser.add_argument(
+            "--latency-ms",
+            type=int,
+            default=300,
+            help="Delay of each response of the fake OpenAI API. Defaults to 300.",
+        )
+        parser.add_argument(
+            "--events-per-exhibit",
+            type=int,
+            default=3,
+            help="Events of each fake response, i.e. of each exhibit in PASS-1, and of each partition in PASS-2. Defaults to 3.",
+        )
+        parser.add_argument(
+            "--celery",
+            choices=["eager", "worker"],
+            default="eager",
+            help=(
+                "Run the tasks in this process (eager), or on the Celery workers (worker). "
+                "In the worker mode, the fake API listens at DJANGO_OPENAI_BASE_URL, which the workers must share. "
+                "Defaults to eager."
+            ),
+        )
+        parser.add_argument(
+            "--timeout",
+            type=int,
+            default=3600,
+            help="Max. seconds to wait for each timeline. Defaults to 3600.",
+        )
+        parser.add_argument(
+            "--trace-memory",
+            action="store_true",
+            help="Also report the peak of the Python allocations (tracemalloc). Slows the run down.",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Append the results to this file (JSON lines), instead of printing them.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the synthetic cases and their files.",
+        )
+
+    def handle(self, *args, **options):
+        if options["celery"] == "worker":
+            if not settings.OPENAI_BASE_URL:
+                raise CommandError(
+                    "DJANGO_OPENAI_BASE_URL is not set. In the worker mode, the workers and this command "
+                    "must share it. The fake OpenAI API listens at its host and port."
+                )
+            url = urlsplit(settings.OPENAI_BASE_URL)
+            address = (url.hostname, url.port or 80)
+        else:
+            address = ("127.0.0.1", 0)
+
+        config = FakeOpenAIConfig(
+            latency_ms=options["latency_ms"],
+            items_per_array=options["events_per_exhibit"],
+            distinct_outputs=True,
+        )
+        server = FakeOpenAIServer(address, config)
+        server.start_in_thread()
+
+        always_eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = options["celery"] == "eager"
+        try:
+            # responses are never answered from the LLM cache
+            with override_settings(
+                OPENAI_BASE_URL=server.base_url, TIMELINE_LLM_CACHE_MODE="off"
+            ):
+                for exhibits in options["exhibits"]:
+                    result = self._run(server, exhibits, options)
+                    self._write(result, options["output"])
+        finally:
+            current_app.conf.task_always_eager = always_eager
+            server.shutdown()
+            server.server_close()
+
+    def _seed(self, exhibits: int, words: int) -> Timeline:
+        """Creates a case with the given number of text exhibits, and a timeline over them.
+
+        Args:
+            exhibits (int): Number of exhibits.
+            words (int): Words of each exhibit.
+
+        Returns:
+            Timeline: The timeline, not processed yet.
+        """
+        run_id = uuid.uuid4().hex[:8]
+        case = Case.objects.create(
+            title=f"Timeline benchmark {run_id}",
+            description=f"Synthetic case of {exhibits} exhibits.",
+        )
+
+        rng = random.Random(run_id)
+        uploaded_files = []
+        for index in range(exhibits):
+            sentences = []
+            while sum(len(sentence.split()) for sentence in sentences) < words:
+                day = date(2020, 1, 1) + timedelta(days=rng.randrange(4 * 365))
+                sentences.append(
+                    f"On {day:%d %B %Y}, {rng.choice(PARTIES)} {rng.choice(ACTIONS)} "
+                    f"{rng.choice(SUBJECTS)} to {rng.choice(PARTIES)}."
+                )
+
+            filename = f"exhibit_{index + 1}.txt"
+            name = default_storage.save(
+                f"benchmark/timeline_{run_id}/{filename}",
+                ContentFile(" ".join(sentences)),
+            )
+            uploaded_files.append(
+                UploadedFile(
+                    case=case,
+                    filename=filename,
+                    file=name,
+                    exhibit_code=f"B{index + 1}",
+                )
+            )
+
+        # bulk created, so that the signals do not process (embed) the files
+        uploaded_files = UploadedFile.objects.bulk_create(uploaded_files)
+        timeline = Timeline.objects.create(case=case, name=f"Benchmark {run_id}")
+        TimelineExhibit.objects.bulk_create(
+            [
+                TimelineExhibit(timeline=timeline, exhibit=uploaded_file)
+                for uploaded_file in uploaded_files
+            ]
+        )
+        return timeline
+
+    def _run(self, server: FakeOpenAIServer, exhibits: int, options: dict) -> dict:
+        """Seeds a case, processes its timeline, and measures the run.
+
+        Args:
+            server (FakeOpenAIServer): The fake OpenAI API.
+            exhibits (int): Number of exhibits.
+            options (dict): The options of the command.
+
+        Returns:
+            dict: The measurements of the run.
+        """
+        started_at = time.perf_counter()
+        timeline = self._seed(exhibits, options["words"])
+        seeded_at = time.perf_counter()
+
+        # the reconstruction is answered in its (prompted, not enforced) JSON format
+        server.config.default_schema = TimelineEventReconstructor(
+            timeline=timeline
+        )._get_response_text_format()["format"]["schema"]
+        server.request_counts.clear()
+        server.request_seconds.clear()
+
+        if options["trace_memory"]:
+            tracemalloc.start()
+
+        marks = {}
+        subscribed = threading.Event()
+        listener = threading.Thread(
+            target=self._listen,
+            args=(timeline.id, options["timeout"], marks, subscribed),
+            daemon=True,
+        )
+        listener.start()
+        subscribed.wait(timeout=10)
+
+        with TaskTimer() as task_timer, count_queries() as counter:
+            processing_at = time.perf_counter()
+            start_timeline_processing.delay(timeline.id)
+            listener.join(timeout=options["timeout"])
+            finished_at = marks.get("finished", time.perf_counter())
+
+        peak_traced_mb = None
+        if options["trace_memory"]:
+            peak_traced_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            tracemalloc.stop()
+
+        timeline.refresh_from_db()
+        extracted_at = marks.get("extracted", finished_at)
+        reconstruction_started_at = task_timer.started_at.get(
+            "events.tasks.reconstruct_timeline_events"
+        )
+        tasks = {
+            name: {
+                **stats,
+                "seconds": round(stats["seconds"], 3),
+                "db_seconds": round(stats["db_seconds"], 3),
+            }
+            for name, stats in task_timer.tasks.items()
+        }
+        result = {
+            "exhibits": exhibits,
+            "words": options["words"],
+            "latency_ms": options["latency_ms"],
+            "celery": options["celery"],
+            "status": timeline.event_extraction_status,
+            "candidate_events": CandidateEvent.objects.filter(
+                timeline_exhibit__timeline=timeline
+            ).count(),
+            "timeline_events": TimelineEvent.objects.filter(timeline=timeline).count(),
+            "stages": {
+                "seed": round(seeded_at - started_at, 3),
+                # PASS-1, until the last exhibit is counted down
+                "extraction": round(extracted_at - processing_at, 3),
+                # until the reconstruction task starts. measured in the eager mode only.
+                "fan_in": (
+                    round(max(0.0, reconstruction_started_at - extracted_at), 3)
+                    if reconstruction_started_at is not None
+                    else None
+                ),
+                # the fan-in and PASS-2
+                "reconstruction": round(finished_at - extracted_at, 3),
+                "total": round(finished_at - processing_at, 3),
+            },
+            "tasks": tasks,
+            "queries": counter.count
+            + sum(stats["queries"] for stats in tasks.values()),
+            "db_seconds": round(
+                counter.seconds + sum(stats["db_seconds"] for stats in tasks.values()),
+                3,
+            ),
+            "llm": {
+                "requests": dict(server.request_counts),
+                "seconds": round(sum(server.request_seconds.values()), 3),
+            },
+            "memory": {
+                # high-water mark of the process, in KiB on Linux
+                "peak_rss_mb": round(
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+                ),
+                "peak_traced_mb": peak_traced_mb,
+            },
+        }
+
+        if not options["keep"]:
+            self._clean_up(timeline)
+
+        return result
+
+    def _listen(
+        self,
+        timeline_id: int,
+        timeout: int,
+        marks: dict,
+        subscribed: threading.Event,
+    ):
+        """
+        Follows the progress of the timeline, and marks when its extraction and its processing have finished.
+        Runs in its own thread, so that the progress is followed in the eager mode too.
+        """
+        try:
+            for event in stream_timeline_progress(timeline_id, timeout=timeout):
+                subscribed.set()
+                name, _, data = event.partition("\ndata: ")
+                if not data:
+                    # keep-alive
+                    continue
+
+                progress = json.loads(data)
+                if name == "event: done" or progress.get("stage") == "reconstruction":
+                    marks.setdefault("extracted", time.perf_counter())
+                if name == "event: done":
+                    marks["finished"] = time.perf_counter()
+        finally:
+            subscribed.set()
+            connection.close()
+
+    def _clean_up(self, timeline: Timeline):
+        case = timeline.case
+        directory = None
+        uploaded_file = case.uploaded_files.first()
+        if uploaded_file is not None:
+            directory = default_storage.path(uploaded_file.file.name).rsplit("/", 1)[0]
+
+        case.delete()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _write(self, result: dict, output: str | None):
+        line = json.dumps(result)
+        if output is None:
+            self.stdout.write(line)
+            return
+
+        with open(output, "a") as file:
+            file.write(f"{line}\n")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result['exhibits']} exhibits: {result['status']} in {result['stages']['total']}s"
+            )
+        )
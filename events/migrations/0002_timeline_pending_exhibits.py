@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeline',
+            name='pending_exhibits',
+            field=models.IntegerField(default=0, help_text='Number of exhibits whose candidate events are yet to be extracted'),
+        ),
+    ]
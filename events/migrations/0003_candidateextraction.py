@@ -0,0 +1,86 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0002_timeline_pending_exhibits"),
+        ("poc", "0029_chatturnspan"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CandidateExtraction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the content of the exhibit, as sent to the LLM",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "prompt_version",
+                    models.CharField(
+                        help_text="SHA-256 of the prompt instructions and the response format",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "model",
+                    models.CharField(
+                        help_text="The LLM used for the extraction", max_length=100
+                    ),
+                ),
+                (
+                    "case_context_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the case details and litigants sent along with the content",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "events",
+                    models.JSONField(
+                        default=list,
+                        help_text="The candidate events returned by the LLM, merged across the windows",
+                    ),
+                ),
+                (
+                    "exhibit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="candidate_extractions",
+                        to="poc.uploadedfile",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "xbt_candidate_extractions",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "content_hash",
+                            "prompt_version",
+                            "model",
+                            "case_context_hash",
+                        ),
+                        name="unique_candidate_extraction",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0003_candidateextraction"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timeline",
+            name="pending_refresh",
+            field=models.JSONField(
+                blank=True,
+                default=None,
+                help_text="Days of the removed exhibits and IDs of the added exhibits of an incremental refresh. Null for a full reconstruction.",
+                null=True,
+            ),
+        ),
+    ]
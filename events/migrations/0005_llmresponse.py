@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0004_timeline_pending_refresh"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMResponse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="SHA-256 of the request", max_length=64, unique=True
+                    ),
+                ),
+                (
+                    "model",
+                    models.CharField(
+                        help_text="The LLM of the request", max_length=100
+                    ),
+                ),
+                (
+                    "output_text",
+                    models.TextField(help_text="The output text of the response"),
+                ),
+            ],
+            options={
+                "db_table": "xbt_llm_responses",
+            },
+        ),
+    ]
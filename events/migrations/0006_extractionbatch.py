@@ -0,0 +1,81 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0005_llmresponse"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timeline",
+            name="extraction_mode",
+            field=models.CharField(
+                choices=[("sync", "Synchronous"), ("batch", "Batch")],
+                default="sync",
+                help_text="How the candidate events of the exhibits are extracted (PASS-1)",
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ExtractionBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("openai_batch_id", models.CharField(max_length=255, unique=True)),
+                ("input_file_id", models.CharField(max_length=255)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("submitted", "Submitted"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="submitted",
+                        help_text="Completed once the results are ingested",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "openai_status",
+                    models.CharField(
+                        blank=True,
+                        help_text="Status of the job, as reported by OpenAI",
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "exhibits",
+                    models.JSONField(
+                        default=dict,
+                        help_text="The number of windows and the extraction key of each timeline exhibit in the job, by its ID",
+                    ),
+                ),
+                (
+                    "timeline",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="extraction_batches",
+                        to="events.timeline",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "xbt_extraction_batches",
+                "ordering": ["-id"],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:27
+
+import pgvector.django.vector
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0006_extractionbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="candidateevent",
+            name="embedding",
+            field=pgvector.django.vector.VectorField(
+                blank=True,
+                dimensions=1536,
+                help_text="Embedding of the action phrase and description, for clustering the near-duplicate candidates before the reconstruction",
+                null=True,
+            ),
+        ),
+    ]
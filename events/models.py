@@ -1,5 +1,6 @@
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from pgvector.django import VectorField
 
 from core.models import TimestampedModel, User
 from poc.models import Case, UploadedFile
@@ -53,6 +54,11 @@ class Timeline(TimestampedModel, EventExtractable):
     Represents a timeline of events for a specific case.
     """
 
+    class ExtractionMode(models.TextChoices):
+        SYNC = "sync", "Synchronous"
+        # OpenAI's Batch API: about half the price, results within 24 hours
+        BATCH = "batch", "Batch"
+
     # validators
     name_validator = RegexValidator(
         regex=r"^[a-zA-Z][\w\s-]+$",
@@ -75,6 +81,28 @@ class Timeline(TimestampedModel, EventExtractable):
     is_active = models.BooleanField(
         default=True, help_text="Indicates whether this timeline is active"
     )
+    extraction_mode = models.CharField(
+        max_length=20,
+        choices=ExtractionMode.choices,
+        default=ExtractionMode.SYNC,
+        help_text="How the candidate events of the exhibits are extracted (PASS-1)",
+    )
+    # ? Why a counter?
+    # * The exhibits are extracted in parallel (fan-out). The last one to finish starts the reconstruction (fan-in).
+    # * Decremented under a row lock, once per exhibit. See events.tasks.
+    pending_exhibits = models.IntegerField(
+        default=0,
+        help_text="Number of exhibits whose candidate events are yet to be extracted",
+    )
+    # ? Why keep the change?
+    # * A refresh reconstructs only the dates affected by the added and removed exhibits.
+    # * Kept until the reconstruction succeeds, so that a failed refresh is carried over to the next one.
+    pending_refresh = models.JSONField(
+        blank=True,
+        null=True,
+        default=None,
+        help_text="Days of the removed exhibits and IDs of the added exhibits of an incremental refresh. Null for a full reconstruction.",
+    )
 
     class Meta:
         db_table = "xbt_timelines"
@@ -141,6 +169,12 @@ class CandidateEvent(TimestampedModel):
         help_text="The source from which the candidate event was extracted (e.g., document, email or attachment and its metadata)",
         default=dict,
     )
+    embedding = VectorField(
+        dimensions=1536,
+        null=True,
+        blank=True,
+        help_text="Embedding of the action phrase and description, for clustering the near-duplicate candidates before the reconstruction",
+    )
 
     class Meta:
         db_table = "xbt_candidate_events"
@@ -150,6 +184,88 @@ class CandidateEvent(TimestampedModel):
         return f"Candidate Event: '{self.raw_description}' (Timeline: {self.timeline.name})"
 
 
+class CandidateExtraction(TimestampedModel):
+    """
+    The candidate events extracted (PASS-1) from the content of an exhibit.
+    Reused by the other timelines over the same, unchanged exhibit, instead of extracting them again.
+    """
+
+    exhibit = models.ForeignKey(
+        UploadedFile, on_delete=models.CASCADE, related_name="candidate_extractions"
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the content of the exhibit, as sent to the LLM",
+    )
+    prompt_version = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the prompt instructions and the response format",
+    )
+    model = models.CharField(
+        max_length=100, help_text="The LLM used for the extraction"
+    )
+    case_context_hash = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the case details and litigants sent along with the content",
+    )
+    events = models.JSONField(
+        help_text="The candidate events returned by the LLM, merged across the windows",
+        default=list,
+    )
+
+    class Meta:
+        db_table = "xbt_candidate_extractions"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_hash", "prompt_version", "model", "case_context_hash"],
+                name="unique_candidate_extraction",
+            )
+        ]
+
+    def __str__(self):
+        return f"Candidate Extraction: {self.exhibit.filename} ({self.model})"
+
+
+class ExtractionBatch(TimestampedModel):
+    """
+    A job of OpenAI's Batch API, extracting the candidate events (PASS-1) of the exhibits of a timeline.
+    Polled until OpenAI finishes it, then its results are ingested. See events.tasks.poll_extraction_batch.
+    """
+
+    class Status(models.TextChoices):
+        SUBMITTED = "submitted", "Submitted"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    timeline = models.ForeignKey(
+        Timeline, on_delete=models.CASCADE, related_name="extraction_batches"
+    )
+    openai_batch_id = models.CharField(max_length=255, unique=True)
+    input_file_id = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.SUBMITTED,
+        help_text="Completed once the results are ingested",
+    )
+    openai_status = models.CharField(
+        max_length=50, blank=True, help_text="Status of the job, as reported by OpenAI"
+    )
+    exhibits = models.JSONField(
+        default=dict,
+        help_text="The number of windows and the extraction key of each timeline exhibit in the job, by its ID",
+    )
+
+    class Meta:
+        db_table = "xbt_extraction_batches"
+        ordering = ["-id"]
+
+    def __str__(self):
+        return (
+            f"Extraction Batch: {self.openai_batch_id} (Timeline: {self.timeline.name})"
+        )
+
+
 class TimelineEvent(TimestampedModel):
     """
     Represents a confirmed event that is part of a timeline.
@@ -195,3 +311,21 @@ class TimelineEvent(TimestampedModel):
 
     def __str__(self):
         return f"{self.title} (Timeline: {self.timeline.name})"
+
+
+class LLMResponse(TimestampedModel):
+    """
+    A recorded response of the LLM, keyed by a hash of its request. See events.llm_cache.
+    """
+
+    key = models.CharField(
+        max_length=64, unique=True, help_text="SHA-256 of the request"
+    )
+    model = models.CharField(max_length=100, help_text="The LLM of the request")
+    output_text = models.TextField(help_text="The output text of the response")
+
+    class Meta:
+        db_table = "xbt_llm_responses"
+
+    def __str__(self):
+        return f"LLM Response: {self.key} ({self.model})"
@@ -0,0 +1,217 @@
+"""
+Live progress of the timelines being processed.
+
+The tasks publish a snapshot of the timeline's progress to a redis pub/sub channel whenever it changes,
+e.g. as each exhibit is extracted. The snapshot carries the status and the candidate events of each exhibit,
+and an ETA of the extraction. StreamTimelineProgressAPI relays the snapshots to the client as Server-Sent Events,
+so that clients no longer poll the timeline and its exhibits while it is processed.
+"""
+
+import json
+import logging
+import time
+from collections.abc import Generator
+from functools import cache
+
+import redis
+from django.conf import settings
+from django.db.models import Count
+
+from poc.langchain.streaming import format_sse
+
+from .models import Timeline, TimelineExhibit
+
+__all__ = [
+    "get_timeline_progress",
+    "publish_timeline_progress",
+    "start_timeline_progress",
+    "stream_timeline_progress",
+]
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "timeline_progress"
+# a comment is sent when no progress is published for this many seconds, so that proxies keep the stream open
+HEARTBEAT_SECONDS = 15
+# the start of a run is forgotten after a day
+RUN_TTL_SECONDS = 24 * 60 * 60
+
+
+@cache
+def _get_redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.TIMELINE_PROGRESS_REDIS_URL)
+
+
+def _get_channel(timeline_id: int) -> str:
+    return f"{KEY_PREFIX}:{timeline_id}"
+
+
+def _get_run_key(timeline_id: int) -> str:
+    return f"{KEY_PREFIX}:{timeline_id}:run"
+
+
+def _is_finished(progress: dict) -> bool:
+    return progress["status"] in (Timeline.Status.COMPLETED, Timeline.Status.FAILED)
+
+
+def start_timeline_progress(timeline_id: int, exhibits: int) -> None:
+    """Records the start of a run of the timeline, for its ETA. Then publishes its progress.
+
+    Args:
+        timeline_id (int): ID of the timeline.
+        exhibits (int): No. of exhibits to extract in the run.
+    """
+    try:
+        _get_redis().set(
+            _get_run_key(timeline_id),
+            json.dumps({"started_at": time.time(), "exhibits": exhibits}),
+            ex=RUN_TTL_SECONDS,
+        )
+    except redis.RedisError as error:
+        logger.warning(f"Timeline progress is unavailable: {error}")
+
+    publish_timeline_progress(timeline_id)
+
+
+def _get_eta(timeline_id: int, pending_exhibits: int) -> int | None:
+    """Estimates the seconds left to extract the pending exhibits, from the pace of the run so far."""
+    run = _get_redis().get(_get_run_key(timeline_id))
+    if run is None or not pending_exhibits:
+        return None
+
+    run = json.loads(run)
+    finished = run["exhibits"] - pending_exhibits
+    if finished <= 0:
+        return None
+
+    elapsed = time.time() - run["started_at"]
+    return round(elapsed / finished * pending_exhibits)
+
+
+def get_timeline_progress(timeline_id: int) -> dict | None:
+    """
+    Returns a snapshot of the progress of the timeline.
+
+    Args:
+        timeline_id (int): ID of the timeline.
+    Returns:
+        dict | None: The status and the stage of the timeline, the ETA (seconds) of the extraction if known,
+            and the status and the candidate events of each exhibit. None if the timeline does not exist.
+    """
+    timeline = (
+        Timeline.objects.filter(id=timeline_id)
+        .values("event_extraction_status", "pending_exhibits")
+        .first()
+    )
+    if timeline is None:
+        return None
+
+    exhibits = (
+        TimelineExhibit.objects.filter(timeline_id=timeline_id)
+        .annotate(candidate_events_count=Count("candidate_events"))
+        .order_by("id")
+        .values(
+            "id",
+            "exhibit__filename",
+            "event_extraction_status",
+            "candidate_events_count",
+        )
+    )
+
+    status = timeline["event_extraction_status"]
+    pending_exhibits = timeline["pending_exhibits"]
+    stage = None
+    eta = None
+    if status == Timeline.Status.PROCESSING:
+        stage = "extraction" if pending_exhibits else "reconstruction"
+        eta = _get_eta(timeline_id, pending_exhibits)
+
+    return {
+        "id": timeline_id,
+        "status": status,
+        "stage": stage,
+        "pending_exhibits": pending_exhibits,
+        "eta_seconds": eta,
+        "exhibits": [
+            {
+                "id": exhibit["id"],
+                "filename": exhibit["exhibit__filename"],
+                "status": exhibit["event_extraction_status"],
+                "candidate_events": exhibit["candidate_events_count"],
+            }
+            for exhibit in exhibits
+        ],
+    }
+
+
+def publish_timeline_progress(timeline_id: int) -> None:
+    """
+    Publishes the progress of the timeline to its subscribers, if any. Call after the change is committed.
+    Never raises: the progress is best-effort, and must not fail the processing of the timeline.
+
+    Args:
+        timeline_id (int): ID of the timeline.
+    """
+    channel = _get_channel(timeline_id)
+    try:
+        # ? Why check the subscribers?
+        # The snapshot aggregates all the exhibits, and is published as each exhibit starts and finishes.
+        # Nobody follows most timelines. A new subscriber reads the snapshot itself. See stream_timeline_progress.
+        [(_, subscribers)] = _get_redis().pubsub_numsub(channel)
+        if not subscribers:
+            return
+
+        progress = get_timeline_progress(timeline_id)
+        if progress is not None:
+            _get_redis().publish(channel, json.dumps(progress, default=str))
+    except redis.RedisError as error:
+        logger.warning(f"Timeline progress is unavailable: {error}")
+
+
+def stream_timeline_progress(
+    timeline_id: int, timeout: float | None = None
+) -> Generator[str, None, None]:
+    """
+    Streams the progress of the timeline as Server-Sent Events: a "progress" event with the current snapshot,
+    then one for each published snapshot, until the timeline has completed or failed ("done" event).
+    The stream also ends after the timeout. Clients then reconnect.
+
+    Args:
+        timeline_id (int): ID of the timeline.
+        timeout (float | None): Max. seconds to stream. Defaults to settings.TIMELINE_PROGRESS_STREAM_TIMEOUT.
+    Yields:
+        str: The events, encoded as per the text/event-stream format.
+    """
+    deadline = time.monotonic() + (timeout or settings.TIMELINE_PROGRESS_STREAM_TIMEOUT)
+    pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+    try:
+        # subscribed before the snapshot is read, so that no progress is missed in between
+        pubsub.subscribe(_get_channel(timeline_id))
+        progress = get_timeline_progress(timeline_id)
+        yield format_sse("progress", progress)
+        sent_at = time.monotonic()
+
+        while not _is_finished(progress):
+            now = time.monotonic()
+            if now >= deadline:
+                return
+
+            if now - sent_at >= HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                sent_at = now
+
+            # None on a timeout, and for the confirmation of the subscription
+            message = pubsub.get_message(timeout=min(deadline - now, HEARTBEAT_SECONDS))
+            if message is None:
+                continue
+
+            progress = json.loads(message["data"])
+            yield format_sse("progress", progress)
+            sent_at = time.monotonic()
+
+        yield format_sse("done", {"id": timeline_id, "status": progress["status"]})
+    except redis.RedisError as error:
+        # the client reconnects, or falls back to RetrieveTimelineAPI
+        logger.warning(f"Timeline progress is unavailable: {error}")
+    finally:
+        pubsub.close()
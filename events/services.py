@@ -1,13 +1,23 @@
 """Cross-app business logic for event extraction and management."""
 
+import hashlib
+import itertools
 import json
 import logging
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 
+import numpy as np
 import tiktoken
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Model, Q
 from django.utils import timezone
 from openai import APIConnectionError, OpenAI, OpenAIError, RateLimitError
+from openai.types import Batch
 from tenacity import (
     before_sleep_log,
     retry,
@@ -16,89 +26,124 @@ from tenacity import (
     wait_exponential,
 )
 
+from core.rate_limit import get_http_client
+from poc.case_context import CaseContext, get_case_context
 from poc.models import (
-    Case,
-    CaseLitigant,
-    LitigantRole,
     ParsedEmail,
     ParsedEmailAttachment,
     UploadedFile,
 )
 from poc.utils import (
+    EMBEDDING_MODEL,
+    count_tokens,
     extract_text_from_csv,
     extract_text_from_docx,
     extract_text_from_pdf,
     extract_text_from_pptx,
     extract_text_from_txt,
     extract_text_from_xlsx,
+    get_encoding,
 )
 
-from .models import CandidateEvent, Timeline, TimelineEvent, TimelineExhibit
+from .llm_cache import CachingEmbeddings, CachingResponses
+from .models import (
+    CandidateEvent,
+    CandidateExtraction,
+    ExtractionBatch,
+    Timeline,
+    TimelineEvent,
+    TimelineExhibit,
+)
 
 logger = logging.getLogger(__name__)
 
+# a window is never smaller than this, however large the case details are
+MIN_WINDOW_TOKENS = 1000
+# marks a document that is split across windows
+CONTINUED_NOTE = "(continued from the previous part)\n"
+# reconstructed events within this many days of a partition boundary are merged across the boundary
+BOUNDARY_MARGIN_DAYS = 1
+# candidate events embedded in a single embeddings API call
+EMBEDDING_BATCH_SIZE = 500
+
 
-def get_case_details(case: Case, minimal: bool = False) -> str:
+def get_case_details(case_context: CaseContext, minimal: bool = False) -> str:
     """Retrieves the case details to be used for event extraction.
 
     Args:
-        case (Case): The case for which to retrieve details.
+        case_context (CaseContext): The snapshot of the case for which to retrieve details.
         minimal (bool): Whether to retrieve minimal case details.
 
     Returns:
         str: The case details to be used for event extraction.
     """
-    case_details = f"Case Title: {case.title}\n"
+    case_details = f"Case Title: {case_context.title}\n"
 
-    if case.case_number:
-        case_details += f"Case Number: {case.case_number}\n"
+    if case_context.case_number:
+        case_details += f"Case Number: {case_context.case_number}\n"
 
     if not minimal:
-        case_details += f"Case Description: {case.description}\n"
+        case_details += f"Case Description: {case_context.description}\n"
 
     return case_details
 
 
-def get_litigants_info(case: Case) -> str:
+def get_litigants_info(case_context: CaseContext) -> str:
     """Retrieves the litigants information for the case.
 
     Args:
-        case (Case): The case for which to retrieve litigants information.
+        case_context (CaseContext): The snapshot of the case for which to retrieve litigants information.
     Returns:
         str: The litigants information for the case.
     """
     litigant_info = ""
-    litigant_roles = LitigantRole.objects.all()
-    for role in litigant_roles:
-        case_litigants = CaseLitigant.objects.filter(case=case, role=role)
-        if case_litigants.exists():
-            litigant_info += f"{role.name.upper()}S:\n"
-            for case_litigant in case_litigants:
-                if case_litigant.is_our_client:
-                    litigant_info += "(Our Client)\n"
-
-                litigant_info += (
-                    f"Name: {case_litigant.litigant.name}\n"
-                    f"Email: {case_litigant.litigant.email}\n"
-                    f"Phone: {case_litigant.litigant.phone}\n"
-                    "---\n"
-                )
+    # the litigants are ordered by role
+    for _, role_litigants in itertools.groupby(
+        case_context.litigants, key=lambda litigant: litigant.role_id
+    ):
+        role_litigants = list(role_litigants)
+        litigant_info += f"{role_litigants[0].role.upper()}S:\n"
+        for litigant in role_litigants:
+            if litigant.is_our_client:
+                litigant_info += "(Our Client)\n"
+
+            litigant_info += (
+                f"Name: {litigant.name}\n"
+                f"Email: {litigant.email}\n"
+                f"Phone: {litigant.phone}\n"
+                "---\n"
+            )
 
     return litigant_info
 
 
-def get_uploaded_file_content(uploaded_file: UploadedFile) -> str:
-    """Retrieves the content from an uploaded file.
+@dataclass
+class ExhibitDocument:
+    """
+    A document of an exhibit: an uploaded file, an email or an email attachment.
+    The content is split on its pages when it does not fit in a single LLM call.
+    """
+
+    header: str
+    pages: list[str]
+    footer: str
+
+    def render(self) -> str:
+        return self.header + "".join(self.pages) + self.footer
+
+
+def get_uploaded_file_documents(uploaded_file: UploadedFile) -> list[ExhibitDocument]:
+    """Retrieves the documents of an uploaded file.
 
     Args:
         uploaded_file (UploadedFile): The uploaded file to retrieve content from.
     Returns:
-        str: The content of the uploaded file.
+        list[ExhibitDocument]: The uploaded file. For an email, the email and its attachments.
     """
     if uploaded_file.file_extension == "eml":
-        return get_parsed_email_content(uploaded_file.parsed_email)
+        return get_parsed_email_documents(uploaded_file.parsed_email)
 
-    content = (
+    header = (
         "[Document]\n"
         f"ID: {uploaded_file.id}\n"
         f"Filename: {uploaded_file.filename}\n"
@@ -135,54 +180,69 @@ def get_uploaded_file_content(uploaded_file: UploadedFile) -> str:
             f"Unsupported file type '{uploaded_file.file_extension}' for uploaded file ID {uploaded_file.id}. Skipping content extraction."
         )
 
-    if file_reader_func:
-        for chunk in file_reader_func(uploaded_file.file):
-            content += chunk
+    # the readers yield the text by page, sheet or slide
+    pages = list(file_reader_func(uploaded_file.file.path)) if file_reader_func else []
 
-    content += f"---[End of Document ID: {uploaded_file.id}]---\n"
-    return content
+    return [
+        ExhibitDocument(
+            header=header,
+            pages=pages,
+            footer=f"---[End of Document ID: {uploaded_file.id}]---\n",
+        )
+    ]
 
 
-def get_parsed_email_content(parsed_email: ParsedEmail) -> str:
-    """Retrieves the content from a parsed email, including its attachments.
+def get_parsed_email_documents(parsed_email: ParsedEmail) -> list[ExhibitDocument]:
+    """Retrieves the documents of a parsed email: the email and its attachments.
 
     Args:
         parsed_email (ParsedEmail): The parsed email to retrieve content from.
     Returns:
-        str: The aggregated content from a parsed email, including its attachments.
+        list[ExhibitDocument]: The email, followed by its attachments.
     """
-    content = ""
-    content += (
-        "[Email]\n"
-        f"ID: {parsed_email.id}\n"
-        f"Subject: {parsed_email.subject}\n"
-        f"From: {parsed_email.sender}\n"
-        f"To: {parsed_email.to_recipients}\n"
-        f"Cc: {parsed_email.cc_recipients}\n"
-        f"Sent On: {parsed_email.sent_on}\n"
-        "Content:\n"
-        f"{parsed_email.cleaned_body}\n"
+    email_document = ExhibitDocument(
+        header=(
+            "[Email]\n"
+            f"ID: {parsed_email.id}\n"
+            f"Subject: {parsed_email.subject}\n"
+            f"From: {parsed_email.sender}\n"
+            f"To: {parsed_email.to_recipients}\n"
+            f"Cc: {parsed_email.cc_recipients}\n"
+            f"Sent On: {parsed_email.sent_on}\n"
+            "Content:\n"
+        ),
+        pages=[f"{parsed_email.cleaned_body}\n"],
+        footer=f"---[End of Email ID: {parsed_email.id}]---\n",
     )
-    for attachment in parsed_email.parsed_attachments.all():
-        content += get_parsed_email_attachment_content(attachment)
 
-    content += f"---[End of Email ID: {parsed_email.id}]---\n"
-    return content
+    return [
+        email_document,
+        *(
+            get_parsed_email_attachment_document(attachment, parsed_email)
+            for attachment in parsed_email.parsed_attachments.all()
+        ),
+    ]
 
 
-def get_parsed_email_attachment_content(attachment: ParsedEmailAttachment) -> str:
-    """Retrieves the content from a parsed email attachment.
+def get_parsed_email_attachment_document(
+    attachment: ParsedEmailAttachment, parsed_email: ParsedEmail
+) -> ExhibitDocument:
+    """Retrieves the document of a parsed email attachment.
 
     Args:
         attachment (ParsedEmailAttachment): The parsed email attachment to retrieve content from.
+        parsed_email (ParsedEmail): The email of the attachment.
     Returns:
-        str: The content of the parsed email attachment.
+        ExhibitDocument: The attachment.
     """
-    content = (
+    header = (
         "[Email Attachment]\n"
         f"ID: {attachment.id}\n"
         f"Filename: {attachment.filename}\n"
         f"Content Type: {attachment.content_type}\n"
+        # the attachment may not be in the same LLM call as its email
+        f"Email ID: {parsed_email.id}\n"
+        f"Email Sent On: {parsed_email.sent_on}\n"
         f"Content:\n"
     )
 
@@ -214,18 +274,425 @@ def get_parsed_email_attachment_content(attachment: ParsedEmailAttachment) -> st
             f"Unsupported content type '{attachment.content_type}' for attachment ID {attachment.id}. Skipping content extraction."
         )
 
-    if file_reader_func:
-        for chunk in file_reader_func(attachment.file):
-            content += chunk
+    pages = list(file_reader_func(attachment.file.path)) if file_reader_func else []
+
+    return ExhibitDocument(
+        header=header,
+        pages=pages,
+        footer=f"---[End of Attachment ID: {attachment.id}]---\n",
+    )
+
+
+def _split_text(text: str, max_tokens: int) -> list[str]:
+    """Splits the text into parts of up to max_tokens tokens, on line boundaries where possible."""
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    encoding = get_encoding()
+    parts = []
+    current = ""
+    current_tokens = 0
+    for line in text.splitlines(keepends=True):
+        tokens = encoding.encode(line)
+        if current and current_tokens + len(tokens) > max_tokens:
+            parts.append(current)
+            current = ""
+            current_tokens = 0
+
+        # a line longer than max_tokens is split by tokens
+        while len(tokens) > max_tokens:
+            parts.append(encoding.decode(tokens[:max_tokens]))
+            tokens = tokens[max_tokens:]
+
+        current += encoding.decode(tokens)
+        current_tokens += len(tokens)
+
+    if current:
+        parts.append(current)
+
+    return parts
+
+
+def split_into_windows(
+    documents: list[ExhibitDocument], token_budget: int
+) -> list[str]:
+    """
+    Splits the documents into windows of up to token_budget tokens, on document and page boundaries.
+    Consecutive documents and pages are kept together while they fit.
+    A document split across windows repeats its header in each of them.
+    A page that does not fit in a window by itself is split on line boundaries.
+
+    Args:
+        documents (list[ExhibitDocument]): The documents of the exhibit.
+        token_budget (int): Max. tokens of a window.
+    Returns:
+        list[str]: The content of the windows, in the order of the documents.
+    """
+    # (document, index of the part within the document, text)
+    parts = []
+    overheads = {}
+    for document in documents:
+        overheads[id(document)] = count_tokens(
+            document.header + CONTINUED_NOTE + document.footer
+        )
+        max_tokens = max(token_budget - overheads[id(document)], MIN_WINDOW_TOKENS)
+        pages = document.pages or [""]
+        texts = [text for page in pages for text in _split_text(page, max_tokens)]
+        parts.extend((document, index, text) for index, text in enumerate(texts))
+
+    windows = []
+    current = []
+    current_tokens = 0
+    for document, index, text in parts:
+        tokens = count_tokens(text)
+        if not current or current[-1][0] is not document:
+            tokens += overheads[id(document)]
+
+        if current and current_tokens + tokens > token_budget:
+            windows.append(_render_window(current))
+            current = []
+            current_tokens = 0
+            if index > 0:
+                # the document continues in the new window
+                tokens += overheads[id(document)]
+
+        current.append((document, index, text))
+        current_tokens += tokens
+
+    if current:
+        windows.append(_render_window(current))
+
+    return windows
+
+
+def _render_window(parts: list[tuple[ExhibitDocument, int, str]]) -> str:
+    content = ""
+    for _, group in itertools.groupby(parts, key=lambda part: id(part[0])):
+        group = list(group)
+        document, first_index, _ = group[0]
+        content += document.header
+        if first_index > 0:
+            content += CONTINUED_NOTE
+
+        content += "".join(text for _, _, text in group)
+        content += document.footer
 
-    content += f"---[End of Attachment ID: {attachment.id}]---\n"
     return content
 
 
+def merge_candidate_events(results: list[list[dict]]) -> list[dict]:
+    """
+    Merges the candidate events extracted from the windows of an exhibit.
+    Candidates with the same identity (source, date and action) are deduplicated,
+    keeping the one with the highest confidence.
+
+    Args:
+        results (list[list[dict]]): The candidate events of each window.
+    Returns:
+        list[dict]: The merged candidate events, in the order they were first extracted.
+    """
+    merged = {}
+    for index, event_data in enumerate(itertools.chain.from_iterable(results)):
+        if not isinstance(event_data, dict):
+            # skipped with a warning when saving
+            merged[index] = event_data
+            continue
+
+        source = event_data.get("source") or {}
+        identity = (
+            source.get("type"),
+            source.get("id"),
+            str(event_data.get("event_date", ""))[:10],  # the day
+            " ".join(str(event_data.get("action_phrase", "")).lower().split()),
+        )
+        existing = merged.get(identity)
+        if existing is None or event_data.get("confidence", 0) > existing.get(
+            "confidence", 0
+        ):
+            # a replaced candidate keeps its position
+            merged[identity] = event_data
+
+    return list(merged.values())
+
+
+def partition_candidate_events(
+    candidate_events: list[dict], token_budget: int
+) -> list[list[dict]]:
+    """
+    Partitions the candidate events into consecutive date windows of up to token_budget tokens.
+    The candidates of a day are kept together, unless they do not fit in a partition by themselves.
+
+    Args:
+        candidate_events (list[dict]): The candidate events, in chronological order.
+        token_budget (int): Max. tokens of the candidates of a partition, as JSON.
+    Returns:
+        list[list[dict]]: The partitions, in chronological order.
+    """
+    partitions = []
+    current = []
+    current_tokens = 0
+    for _, day_events in itertools.groupby(
+        candidate_events, key=lambda event: event["event_date"][:10]
+    ):
+        day_events = list(day_events)
+        day_tokens = [count_tokens(json.dumps(event)) for event in day_events]
+
+        if current and current_tokens + sum(day_tokens) > token_budget:
+            partitions.append(current)
+            current = []
+            current_tokens = 0
+
+        for event, tokens in zip(day_events, day_tokens):
+            if current and current_tokens + tokens > token_budget:
+                # the day does not fit in a partition by itself
+                partitions.append(current)
+                current = []
+                current_tokens = 0
+
+            current.append(event)
+            current_tokens += tokens
+
+    if current:
+        partitions.append(current)
+
+    return partitions
+
+
+def cluster_candidate_events(
+    candidate_events: list[dict],
+    embeddings: list,
+    min_similarity: float,
+    max_days: int,
+) -> list[dict]:
+    """
+    Clusters the candidate events that describe the same occurrence, e.g. an email summarised from its body and its attachment.
+    A candidate joins the most similar cluster whose first candidate is at most max_days earlier,
+    if the cosine similarity of their embeddings is at least min_similarity.
+    Each cluster is represented by its most confident candidate, which points to the other members.
+
+    Args:
+        candidate_events (list[dict]): The candidate events, in chronological order.
+        embeddings (list): The embedding of each candidate event.
+        min_similarity (float): Min. cosine similarity of the candidates of a cluster.
+        max_days (int): Max. days between the candidates of a cluster.
+    Returns:
+        list[dict]: The representative of each cluster, in chronological order.
+            A cluster's representative lists the IDs and the sources of its other members in "member_ids" and "member_sources".
+    """
+    if not candidate_events:
+        return []
+
+    vectors = np.asarray(embeddings, dtype=float)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    event_dates = [_parse_event_date(event_data) for event_data in candidate_events]
+    max_distance = timedelta(days=max_days)
+
+    # the indices of the candidates of each cluster. the first one is compared with the later candidates.
+    clusters = []
+    # the clusters that later candidates can still join
+    open_clusters = []
+    for index, event_date in enumerate(event_dates):
+        open_clusters = [
+            cluster
+            for cluster in open_clusters
+            if event_date - event_dates[clusters[cluster][0]] <= max_distance
+        ]
+        best_cluster = None
+        if open_clusters:
+            similarities = (
+                vectors[[clusters[cluster][0] for cluster in open_clusters]]
+                @ vectors[index]
+            )
+            position = int(np.argmax(similarities))
+            if similarities[position] >= min_similarity:
+                best_cluster = open_clusters[position]
+
+        if best_cluster is None:
+            clusters.append([index])
+            open_clusters.append(len(clusters) - 1)
+        else:
+            clusters[best_cluster].append(index)
+
+    representatives = []
+    for members in clusters:
+        # the first of the most confident
+        representative_index = max(
+            members, key=lambda member: candidate_events[member].get("confidence", 0)
+        )
+        representative = dict(candidate_events[representative_index])
+        others = [
+            candidate_events[member]
+            for member in members
+            if member != representative_index
+        ]
+        if others:
+            representative["member_ids"] = [event_data["id"] for event_data in others]
+            representative["member_sources"] = []
+            for event_data in others:
+                source = event_data.get("source")
+                if (
+                    source != representative.get("source")
+                    and source not in representative["member_sources"]
+                ):
+                    representative["member_sources"].append(source)
+
+        representatives.append((event_dates[representative_index], representative))
+
+    # a representative may be later than the first candidate of the next cluster
+    representatives.sort(key=lambda item: item[0])
+    return [representative for _, representative in representatives]
+
+
+def get_date_ranges(days: Iterable[date], margin_days: int) -> list[tuple[date, date]]:
+    """
+    Groups the days into ranges, widened by margin_days on both sides.
+    Overlapping and adjacent ranges are merged.
+
+    Args:
+        days (Iterable[date]): The days, in any order. May repeat.
+        margin_days (int): Days added before and after each day.
+    Returns:
+        list[tuple[date, date]]: The first and last day of each range (inclusive), in chronological order.
+    """
+    margin = timedelta(days=margin_days)
+    date_ranges = []
+    for day in sorted(set(days)):
+        first_day, last_day = day - margin, day + margin
+        if date_ranges and first_day <= date_ranges[-1][1] + timedelta(days=1):
+            date_ranges[-1] = (date_ranges[-1][0], max(date_ranges[-1][1], last_day))
+        else:
+            date_ranges.append((first_day, last_day))
+
+    return date_ranges
+
+
+def _start_of_day(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _filter_date_ranges(date_ranges: list[tuple[date, date]]) -> Q:
+    """Matches the event dates within any of the ranges (inclusive)."""
+    date_filter = Q()
+    for first_day, last_day in date_ranges:
+        date_filter |= Q(
+            event_date__gte=_start_of_day(first_day),
+            event_date__lt=_start_of_day(last_day + timedelta(days=1)),
+        )
+
+    return date_filter
+
+
+def parse_event_dates(values: list) -> list[datetime | None]:
+    """
+    Parses the ISO dates of a batch of events. Each distinct value is parsed once.
+    Naive dates are made aware in the current timezone.
+
+    Args:
+        values (list): The event_date of each event, as returned by the LLM.
+    Returns:
+        list[datetime | None]: The date of each event. None if it is missing or invalid.
+    """
+    parsed = {}
+    for value in set(values):
+        if not value or not isinstance(value, str):
+            parsed[value] = None
+            continue
+
+        try:
+            event_date = datetime.fromisoformat(value)
+        except ValueError:
+            parsed[value] = None
+            continue
+
+        if event_date.tzinfo is None:
+            event_date = timezone.make_aware(event_date)
+
+        parsed[value] = event_date
+
+    return [parsed[value] for value in values]
+
+
+def validate_in_bulk(
+    instances: list[Model], exclude: list[str]
+) -> tuple[list[Model], list[tuple[int, dict]]]:
+    """
+    Validates the fields of a batch of unsaved model instances, without querying the database.
+    Unlike full_clean(), the excluded fields (e.g. a foreign key known to exist) are not validated.
+
+    Args:
+        instances (list[Model]): The instances to validate.
+        exclude (list[str]): The fields not to validate.
+    Returns:
+        tuple[list[Model], list[tuple[int, dict]]]: The valid instances,
+            and the index and errors (by field) of the invalid ones.
+    """
+    valid_instances = []
+    errors = []
+    for index, instance in enumerate(instances):
+        try:
+            instance.clean_fields(exclude=exclude)
+        except ValidationError as error:
+            errors.append((index, error.message_dict))
+            continue
+
+        valid_instances.append(instance)
+
+    return valid_instances, errors
+
+
+def get_responses_client() -> CachingResponses:
+    """Returns the responses resource of the OpenAI client, behind the LLM response cache.
+
+    Returns:
+        CachingResponses: Use create() as on OpenAI().responses.
+    """
+    return CachingResponses(
+        OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=get_http_client(),
+        ).responses
+    )
+
+
+def get_embeddings_client() -> CachingEmbeddings:
+    """Returns the embeddings resource of the OpenAI client, behind the LLM response cache.
+
+    Returns:
+        CachingEmbeddings: Use create() as on OpenAI().embeddings.
+    """
+    return CachingEmbeddings(
+        OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=get_http_client(),
+        ).embeddings
+    )
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _parse_event_date(event_data: dict) -> datetime | None:
+    try:
+        event_date = datetime.fromisoformat(str(event_data.get("event_date")))
+    except ValueError:
+        return None
+
+    if event_date.tzinfo is None:
+        event_date = timezone.make_aware(event_date)
+
+    return event_date
+
+
 class CandidateEventExtractor:
+    model = "gpt-5-mini"
+
     def __init__(self, timeline_exhibit: TimelineExhibit):
         self.timeline_exhibit = timeline_exhibit
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.responses_client = get_responses_client()
         prompt_filepath = settings.BASE_DIR.joinpath(
             "events", "docs", "prompts", "timeline_pass_1_candidate_extraction.md"
         )
@@ -302,14 +769,78 @@ class CandidateEventExtractor:
             }
         }
 
-    def _get_content(self) -> str:
-        content = ""
-        case = self.timeline_exhibit.timeline.case
-        content += get_case_details(case, minimal=True)
-        content += get_litigants_info(case)
-        content += get_uploaded_file_content(self.timeline_exhibit.exhibit)
+    def _get_case_context(self) -> str:
+        case_context = get_case_context(self.timeline_exhibit.timeline.case_id)
+        return get_case_details(case_context, minimal=True) + get_litigants_info(
+            case_context
+        )
+
+    def _get_extraction_key(
+        self, documents: list[ExhibitDocument], case_context: str
+    ) -> dict:
+        """Identifies the extraction of the exhibit, for reuse across timelines.
+
+        Args:
+            documents (list[ExhibitDocument]): The documents of the exhibit.
+            case_context (str): The case details sent along with the content.
+        Returns:
+            dict: The lookup of the CandidateExtraction.
+        """
+        prompt = self.prompt_instructions + json.dumps(
+            self._get_response_text_format(), sort_keys=True
+        )
+        return {
+            "content_hash": _sha256(
+                "".join(document.render() for document in documents)
+            ),
+            "prompt_version": _sha256(prompt),
+            "model": self.model,
+            "case_context_hash": _sha256(case_context),
+        }
+
+    def _get_windows(
+        self, documents: list[ExhibitDocument], case_context: str
+    ) -> list[str]:
+        """Splits the content of the exhibit into windows that are extracted separately.
+
+        Args:
+            documents (list[ExhibitDocument]): The documents of the exhibit.
+            case_context (str): The case details, prefixed to each window.
+        Returns:
+            list[str]: The content of each window, prefixed with the case details.
+        """
+        token_budget = max(
+            settings.TIMELINE_WINDOW_TOKENS - count_tokens(case_context),
+            MIN_WINDOW_TOKENS,
+        )
+
+        return [
+            case_context + window
+            for window in split_into_windows(documents, token_budget)
+        ]
 
-        return content
+    def _get_request(self, content: str) -> dict:
+        """Builds the arguments of the responses API call that extracts the candidate events of a window.
+
+        Args:
+            content (str): The content of the window.
+        Returns:
+            dict: The request body. Also sent as is in a batch job.
+        """
+        return {
+            "model": self.model,
+            "input": [
+                {
+                    "role": "system",
+                    "content": self.prompt_instructions,
+                },
+                {"role": "user", "content": content},
+            ],
+            "reasoning": {
+                "effort": "minimal",
+            },
+            "text": self._get_response_text_format(),
+        }
 
     @retry(
         # Exponential backoff: 2s, 4s, 8s, 16s... up to a max of 60s
@@ -329,20 +860,7 @@ class CandidateEventExtractor:
                 f"Extracting candidate events for timeline exhibit ID {self.timeline_exhibit.id}. Total tokens in content: {len(tokens)}"
             )
 
-            response = self.openai_client.responses.create(
-                model="gpt-5-mini",
-                input=[
-                    {
-                        "role": "system",
-                        "content": self.prompt_instructions,
-                    },
-                    {"role": "user", "content": content},
-                ],
-                reasoning={
-                    "effort": "minimal",
-                },
-                text=self._get_response_text_format(),
-            )
+            response = self.responses_client.create(**self._get_request(content))
 
             if response.output_text:
                 return json.loads(response.output_text).get("events", [])
@@ -359,6 +877,58 @@ class CandidateEventExtractor:
                 "Failed to parse candidate events from LLM response due to invalid JSON format."
             )
 
+    def _extract_windows(self, windows: list[str]) -> list[dict]:
+        """Extracts the candidate events of the windows in parallel, and merges them.
+
+        Args:
+            windows (list[str]): The content of each window.
+        Returns:
+            list[dict]: The candidate events of the exhibit.
+        """
+        if len(windows) == 1:
+            return self._extract_candidate_events(windows[0])
+
+        max_workers = min(settings.TIMELINE_EXTRACTION_MAX_WORKERS, len(windows))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # each window is retried on its own. the first error of a window is raised.
+            results = list(executor.map(self._extract_candidate_events, windows))
+
+        return merge_candidate_events(results)
+
+    def _extract_documents(
+        self, documents: list[ExhibitDocument], case_context: str
+    ) -> list[dict]:
+        """Extracts the candidate events of the documents with the LLM.
+
+        Args:
+            documents (list[ExhibitDocument]): The documents of the exhibit.
+            case_context (str): The case details sent along with the content.
+        Returns:
+            list[dict]: The candidate events of the exhibit.
+        """
+        windows = self._get_windows(documents, case_context)
+        logger.info(
+            f"Extracting candidate events for timeline exhibit ID {self.timeline_exhibit.id} in {len(windows)} window(s)."
+        )
+        for window in windows:
+            if len(window.strip()) > 255:
+                logger.debug(f"Content: {window[:255]}... [truncated]")
+            else:
+                logger.debug(f"Content: {window}")
+
+        return self._extract_windows(windows)
+
+    def _save_extraction(self, extraction_key: dict, events_data: list[dict]) -> None:
+        """Keeps the candidate events of the exhibit, for the other timelines over it."""
+        # an extraction of the same exhibit by a concurrent timeline is kept
+        CandidateExtraction.objects.get_or_create(
+            **extraction_key,
+            defaults={
+                "exhibit": self.timeline_exhibit.exhibit,
+                "events": events_data,
+            },
+        )
+
     def _save_candidate_events(
         self, candidate_events: list[dict], dry_run: bool = False
     ) -> list[CandidateEvent]:
@@ -370,7 +940,7 @@ class CandidateEventExtractor:
         Returns:
             list[CandidateEvent]: A list of CandidateEvent objects created from the input dictionaries. Not saved to the database yet.
         """
-        saved_events = []
+        events_data = []
         for event_data in candidate_events:
             if not isinstance(event_data, dict):
                 logger.warning(
@@ -378,22 +948,23 @@ class CandidateEventExtractor:
                 )
                 continue
 
-            event_date_str = event_data.get("event_date")
-            event_date = timezone.now()
-            if event_date_str:
-                try:
-                    event_date = timezone.datetime.fromisoformat(event_date_str)
-                    if event_date.tzinfo is None:
-                        event_date = timezone.make_aware(event_date)
-                except ValueError as error:
-                    logger.info(
-                        f"Failed to parse event_date '{event_date_str}' for candidate event '{event_data.get('raw_description')}'. Error: {error}. Defaulting to current datetime."
-                    )
+            events_data.append(event_data)
 
-            candidate_event = CandidateEvent(
+        now = timezone.now()
+        event_dates = parse_event_dates(
+            [event_data.get("event_date") for event_data in events_data]
+        )
+        undated = sum(event_date is None for event_date in event_dates)
+        if undated:
+            logger.info(
+                f"{undated} candidate event(s) have a missing or invalid event_date. Defaulting to current datetime."
+            )
+
+        candidate_events = [
+            CandidateEvent(
                 action_phrase=event_data.get("action_phrase", ""),
                 raw_description=event_data.get("raw_description", ""),
-                event_date=event_date,
+                event_date=event_date or now,
                 date_confidence=event_data.get("date_confidence", "unknown"),
                 actors=event_data.get("actors", []),
                 evidence_excerpt=event_data.get("evidence_excerpt", ""),
@@ -401,18 +972,22 @@ class CandidateEventExtractor:
                 source=event_data.get("source", {}),
                 timeline_exhibit=self.timeline_exhibit,
             )
+            for event_data, event_date in zip(events_data, event_dates)
+        ]
 
-            try:
-                candidate_event.full_clean()
-                if not dry_run:
-                    candidate_event.save()
+        # the timeline exhibit is not validated. it is the same for all the events.
+        saved_events, errors = validate_in_bulk(
+            candidate_events, exclude=["timeline_exhibit"]
+        )
+        if errors:
+            logger.error(
+                f"Skipping {len(errors)} of {len(candidate_events)} candidate events due to validation errors: "
+                + "; ".join(f"{events_data[index]}: {error}" for index, error in errors)
+            )
 
-                saved_events.append(candidate_event)
-            except ValidationError as e:
-                logger.error(
-                    f"Validation error for candidate event '{event_data}': {e}"
-                )
-                continue
+        if not dry_run:
+            with transaction.atomic():
+                CandidateEvent.objects.bulk_create(saved_events, batch_size=500)
 
         return saved_events
 
@@ -425,13 +1000,24 @@ class CandidateEventExtractor:
         Returns:
             list[CandidateEvent]: A list of CandidateEvent objects created from the input dictionaries. Not saved to the database if dry=True.
         """
-        content = self._get_content()
-        if len(content.strip()) > 255:
-            logger.debug(f"Content: {content[:255]}... [truncated]")
+        case_context = self._get_case_context()
+        documents = get_uploaded_file_documents(self.timeline_exhibit.exhibit)
+        extraction_key = self._get_extraction_key(documents, case_context)
+
+        # ? Why look up an earlier extraction?
+        # * Timelines over the same exhibits would otherwise pay for the same LLM calls again.
+        # * The key changes with the content, the prompt, the model or the case details.
+        extraction = CandidateExtraction.objects.filter(**extraction_key).first()
+        if extraction is not None:
+            logger.info(
+                f"Reusing the candidate events of extraction ID {extraction.id} for timeline exhibit ID {self.timeline_exhibit.id}."
+            )
+            events_data = extraction.events
         else:
-            logger.debug(f"Content: {content}")
+            events_data = self._extract_documents(documents, case_context)
+            if not dry:
+                self._save_extraction(extraction_key, events_data)
 
-        events_data = self._extract_candidate_events(content)
         logger.debug(f"Extracted candidate events data: {events_data}")
         candidate_events = self._save_candidate_events(events_data, dry_run=dry)
         logger.debug(
@@ -440,6 +1026,247 @@ class CandidateEventExtractor:
         return candidate_events
 
 
+def _get_batch_custom_id(timeline_exhibit_id: int, window_index: int) -> str:
+    return f"timeline_exhibit-{timeline_exhibit_id}-window-{window_index}"
+
+
+def get_response_output_text(response: dict) -> str:
+    """Returns the output text of a responses API response, as the SDK's output_text property does.
+
+    Args:
+        response (dict): The response, as JSON. Example: the body of a batch job's output line.
+    Returns:
+        str: The text of the output messages.
+    """
+    return "".join(
+        content.get("text", "")
+        for output in response.get("output", [])
+        if output.get("type") == "message"
+        for content in output.get("content", [])
+        if content.get("type") == "output_text"
+    )
+
+
+class BatchCandidateEventExtractor:
+    """
+    Extracts the candidate events (PASS-1) of the exhibits of a timeline with OpenAI's Batch API.
+    The windows of all the exhibits are submitted as one JSONL job, which OpenAI runs within 24 hours,
+    at about half the price of the synchronous calls. The results are ingested once the job is done.
+    """
+
+    endpoint = "/v1/responses"
+    completion_window = "24h"
+    # the job has finished, successfully or not. see https://platform.openai.com/docs/guides/batch
+    finished_statuses = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, timeline: Timeline):
+        self.timeline = timeline
+        self.openai_client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=get_http_client(),
+        )
+
+    def submit(
+        self, timeline_exhibits: list[TimelineExhibit]
+    ) -> tuple[ExtractionBatch | None, list[TimelineExhibit]]:
+        """
+        Submits a batch job of the windows of the exhibits.
+        The exhibits extracted earlier by another timeline reuse that extraction, and are not submitted.
+
+        Args:
+            timeline_exhibits (list[TimelineExhibit]): The exhibits to extract.
+        Returns:
+            tuple[ExtractionBatch | None, list[TimelineExhibit]]: The job (None if every exhibit was reused),
+                and the exhibits whose candidate events were reused and saved.
+        """
+        lines = []
+        exhibits = {}
+        reused = []
+        for timeline_exhibit in timeline_exhibits:
+            extractor = CandidateEventExtractor(timeline_exhibit)
+            case_context = extractor._get_case_context()
+            documents = get_uploaded_file_documents(timeline_exhibit.exhibit)
+            extraction_key = extractor._get_extraction_key(documents, case_context)
+
+            extraction = CandidateExtraction.objects.filter(**extraction_key).first()
+            if extraction is not None:
+                extractor._save_candidate_events(extraction.events)
+                reused.append(timeline_exhibit)
+                continue
+
+            windows = extractor._get_windows(documents, case_context)
+            lines.extend(
+                {
+                    "custom_id": _get_batch_custom_id(timeline_exhibit.id, index),
+                    "method": "POST",
+                    "url": self.endpoint,
+                    "body": extractor._get_request(window),
+                }
+                for index, window in enumerate(windows)
+            )
+            exhibits[str(timeline_exhibit.id)] = {
+                "windows": len(windows),
+                "extraction_key": extraction_key,
+            }
+
+        if not lines:
+            return None, reused
+
+        content = "".join(f"{json.dumps(line)}\n" for line in lines)
+        input_file = self.openai_client.files.create(
+            file=(
+                f"timeline_{self.timeline.id}_candidate_events.jsonl",
+                content.encode(),
+            ),
+            purpose="batch",
+        )
+        batch = self.openai_client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=self.endpoint,
+            completion_window=self.completion_window,
+            metadata={"timeline_id": str(self.timeline.id)},
+        )
+        logger.info(
+            f"Submitted batch {batch.id} of {len(lines)} window(s) of {len(exhibits)} exhibit(s) for timeline ID {self.timeline.id}."
+        )
+
+        extraction_batch = ExtractionBatch.objects.create(
+            timeline=self.timeline,
+            openai_batch_id=batch.id,
+            input_file_id=input_file.id,
+            openai_status=batch.status,
+            exhibits=exhibits,
+        )
+        return extraction_batch, reused
+
+    def get_finished_batch(self, extraction_batch: ExtractionBatch) -> Batch | None:
+        """
+        Checks the job, and records its status at OpenAI.
+
+        Args:
+            extraction_batch (ExtractionBatch): The job, submitted by this timeline.
+        Returns:
+            Batch | None: The job, if it has finished. None otherwise.
+        """
+        batch = self.openai_client.batches.retrieve(extraction_batch.openai_batch_id)
+        extraction_batch.openai_status = batch.status
+        ExtractionBatch.objects.filter(id=extraction_batch.id).update(
+            openai_status=batch.status, updated_at=timezone.now()
+        )
+        return batch if batch.status in self.finished_statuses else None
+
+    def download_results(self, batch: Batch) -> dict[str, str]:
+        """
+        Returns the output text of the successful requests of the finished job, by their custom ID.
+        An expired or cancelled job has the results of the requests it completed.
+        A malformed line is skipped, so that the windows of its request fail.
+
+        Args:
+            batch (Batch): The finished job.
+        Returns:
+            dict[str, str]: The output texts, by custom ID.
+        """
+        if not batch.output_file_id:
+            return {}
+
+        results = {}
+        for line in self.openai_client.files.content(
+            batch.output_file_id
+        ).text.splitlines():
+            if not line.strip():
+                continue
+
+            try:
+                result = json.loads(line)
+                custom_id = result["custom_id"]
+                response = result.get("response") or {}
+            except (ValueError, TypeError, KeyError, AttributeError) as error:
+                logger.error(
+                    f"Skipping a malformed result of batch {batch.id}: {error}"
+                )
+                continue
+
+            if response.get("status_code") != 200:
+                logger.error(
+                    f"Batch request {custom_id} failed: {result.get('error') or response}"
+                )
+                continue
+
+            results[custom_id] = get_response_output_text(response.get("body") or {})
+
+        return results
+
+    def ingest(
+        self,
+        extraction_batch: ExtractionBatch,
+        batch: Batch,
+        results: dict[str, str],
+    ) -> dict[int, bool]:
+        """
+        Saves the candidate events of the finished job.
+        An exhibit is extracted if all its windows succeeded. It fails otherwise, e.g. if the job expired.
+
+        Args:
+            extraction_batch (ExtractionBatch): The job, submitted by this timeline.
+            batch (Batch): The finished job, as returned by get_finished_batch.
+            results (dict[str, str]): The output texts of the job, as returned by download_results.
+        Returns:
+            dict[int, bool]: Whether the extraction of each timeline exhibit failed, by its ID.
+        """
+        extraction_batch.openai_status = batch.status
+        timeline_exhibits = TimelineExhibit.objects.filter(
+            id__in=[
+                int(timeline_exhibit_id)
+                for timeline_exhibit_id in extraction_batch.exhibits
+            ]
+        ).select_related("timeline__case", "exhibit")
+
+        outcomes = {}
+        for timeline_exhibit in timeline_exhibits:
+            exhibit = extraction_batch.exhibits[str(timeline_exhibit.id)]
+            output_texts = [
+                results.get(_get_batch_custom_id(timeline_exhibit.id, index))
+                for index in range(exhibit["windows"])
+            ]
+            try:
+                if None in output_texts:
+                    raise ValueError("One or more windows have no result.")
+
+                window_events = [
+                    json.loads(output_text).get("events", []) if output_text else []
+                    for output_text in output_texts
+                ]
+            except (ValueError, AttributeError) as error:
+                logger.error(
+                    f"Failed to extract the candidate events of timeline exhibit ID {timeline_exhibit.id} in batch {batch.id}: {error}"
+                )
+                outcomes[timeline_exhibit.id] = True
+                continue
+
+            events_data = (
+                window_events[0]
+                if len(window_events) == 1
+                else merge_candidate_events(window_events)
+            )
+            extractor = CandidateEventExtractor(timeline_exhibit)
+            extractor._save_candidate_events(events_data)
+            extractor._save_extraction(exhibit["extraction_key"], events_data)
+            outcomes[timeline_exhibit.id] = False
+
+        extraction_batch.status = (
+            ExtractionBatch.Status.COMPLETED
+            if batch.status == "completed"
+            else ExtractionBatch.Status.FAILED
+        )
+        extraction_batch.save(update_fields=["status", "openai_status", "updated_at"])
+        logger.info(
+            f"Ingested batch {batch.id} ({batch.status}) for timeline ID {self.timeline.id}: "
+            f"{list(outcomes.values()).count(False)} of {len(outcomes)} exhibit(s) extracted."
+        )
+        return outcomes
+
+
 class TimelineEventReconstructor:
     def __init__(self, timeline: Timeline):
         self.timeline = timeline
@@ -449,6 +1276,12 @@ class TimelineEventReconstructor:
         with open(prompt_filepath, "r") as file:
             self.prompt_instructions = file.read()
 
+        merge_prompt_filepath = settings.BASE_DIR.joinpath(
+            "events", "docs", "prompts", "timeline_pass_2_boundary_merge.md"
+        )
+        with open(merge_prompt_filepath, "r") as file:
+            self.merge_prompt_instructions = file.read()
+
     def _get_response_text_format(self) -> dict:
         """Defines the expected response format for event reconstruction from the LLM.
 
@@ -512,15 +1345,122 @@ class TimelineEventReconstructor:
             }
         }
 
-    def _get_content(self) -> list[dict]:
+    @retry(
+        # Exponential backoff: 2s, 4s, 8s, 16s... up to a max of 60s
+        wait=wait_exponential(multiplier=1, min=2, max=60),
+        # Stop after 5 failed attempts
+        stop=stop_after_attempt(5),
+        # Only retry on specific network or rate-limit errors
+        retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
+        # Log the attempt details before sleeping
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+    )
+    def _embed(self, embeddings_client: CachingEmbeddings, texts: list[str]):
+        """Embeds a batch of texts. Recorded and replayed along with the LLM responses (see events.llm_cache)."""
+        return embeddings_client.create(model=EMBEDDING_MODEL, input=texts)
+
+    def _get_embeddings(self, candidate_events: list[dict]) -> list:
+        """
+        Returns the embeddings of the candidate events.
+        The candidates without one are embedded, in batches, and their embeddings saved for the later reconstructions.
+
+        Args:
+            candidate_events (list[dict]): The candidate events, as returned by _get_content.
+        Returns:
+            list: The embedding of each candidate event.
+        """
+        embeddings = dict(
+            CandidateEvent.objects.filter(
+                id__in=[event_data["id"] for event_data in candidate_events],
+                embedding__isnull=False,
+            ).values_list("id", "embedding")
+        )
+        missing = [
+            event_data
+            for event_data in candidate_events
+            if event_data["id"] not in embeddings
+        ]
+        if missing:
+            embeddings_client = get_embeddings_client()
+            for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+                batch = missing[start : start + EMBEDDING_BATCH_SIZE]
+                response = self._embed(
+                    embeddings_client,
+                    [
+                        f"{event_data['action_phrase']}: {event_data['raw_description']}"
+                        for event_data in batch
+                    ],
+                )
+                if len(response.data) != len(batch):
+                    raise ValueError(
+                        f"Expected {len(batch)} embeddings, received {len(response.data)}."
+                    )
+
+                for event_data, item in zip(batch, response.data):
+                    embeddings[event_data["id"]] = item.embedding
+
+            CandidateEvent.objects.bulk_update(
+                [
+                    CandidateEvent(
+                        id=event_data["id"], embedding=embeddings[event_data["id"]]
+                    )
+                    for event_data in missing
+                ],
+                ["embedding"],
+                batch_size=500,
+            )
+
+        return [embeddings[event_data["id"]] for event_data in candidate_events]
+
+    def _cluster_candidate_events(self, candidate_events: list[dict]) -> list[dict]:
+        """
+        Clusters the near-duplicate candidate events, so that the reconstruction receives one representative per cluster.
+        The candidates are returned as they are if the clustering is disabled, or the embeddings are unavailable.
+
+        Args:
+            candidate_events (list[dict]): The candidate events, in chronological order.
+        Returns:
+            list[dict]: The candidate events to reconstruct, in chronological order.
+        """
+        if not settings.TIMELINE_CLUSTERING_ENABLED or len(candidate_events) < 2:
+            return candidate_events
+
+        try:
+            embeddings = self._get_embeddings(candidate_events)
+        except (OpenAIError, ValueError) as e:
+            # the clustering only saves tokens. the reconstruction deduplicates the candidates anyway.
+            logger.warning(
+                f"Reconstructing the candidate events of timeline ID {self.timeline.id} without clustering: {e}"
+            )
+            return candidate_events
+
+        representatives = cluster_candidate_events(
+            candidate_events,
+            embeddings,
+            min_similarity=settings.TIMELINE_CLUSTER_SIMILARITY,
+            max_days=settings.TIMELINE_CLUSTER_MAX_DAYS,
+        )
+        logger.info(
+            f"Clustered {len(candidate_events)} candidate events of timeline ID {self.timeline.id} into {len(representatives)}."
+        )
+        return representatives
+
+    def _get_content(
+        self, date_ranges: list[tuple[date, date]] | None = None
+    ) -> list[dict]:
         """Aggregates the content from all candidate events associated with the timeline to be used for event reconstruction.
 
+        Args:
+            date_ranges (list[tuple[date, date]] | None): Only the candidate events within these ranges, if given.
         Returns:
             list[dict]: A list of dictionaries representing the candidate events and their details to be used for event reconstruction.
         """
+        # chronological, for partitioning by date
         candidate_events = CandidateEvent.objects.filter(
             timeline_exhibit__timeline=self.timeline
-        )
+        ).order_by("event_date", "id")
+        if date_ranges is not None:
+            candidate_events = candidate_events.filter(_filter_date_ranges(date_ranges))
 
         return [
             {
@@ -563,7 +1503,7 @@ class TimelineEventReconstructor:
                 f"Reconstructing events for timeline ID {self.timeline.id}. Total tokens in content: {len(tokens)}"
             )
 
-            response = OpenAI(api_key=settings.OPENAI_API_KEY).responses.create(
+            response = get_responses_client().create(
                 model="gpt-5-mini",
                 input=[
                     {
@@ -589,6 +1529,133 @@ class TimelineEventReconstructor:
                 "Failed to parse events from candidate events due to invalid JSON format in the LLM response."
             )
 
+    def _reconstruct_partitions(self, partitions: list[list[dict]]) -> list[dict]:
+        """
+        Reconstructs the events of the partitions in parallel.
+        The events close to the boundaries of the partitions are then merged, as they may describe the same occurrence.
+
+        Args:
+            partitions (list[list[dict]]): The candidate events, partitioned by date.
+        Returns:
+            list[dict]: A list of dictionaries representing the reconstructed events.
+        """
+        if len(partitions) <= 1:
+            return self._reconstruct_events(partitions[0] if partitions else [])
+
+        logger.info(
+            f"Reconstructing events for timeline ID {self.timeline.id} in {len(partitions)} partitions."
+        )
+        max_workers = min(settings.TIMELINE_RECONSTRUCTION_MAX_WORKERS, len(partitions))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(self._reconstruct_events, partitions))
+
+            zones = self._get_boundary_zones(partitions, results)
+            merged_zones = executor.map(
+                self._merge_boundary_events,
+                [
+                    [
+                        results[partition_index][event_index]
+                        for partition_index, event_index in zone
+                    ]
+                    for zone in zones
+                ],
+            )
+            merged_events = list(itertools.chain.from_iterable(merged_zones))
+
+        claimed = set(itertools.chain.from_iterable(zones))
+        return [
+            event_data
+            for partition_index, events_data in enumerate(results)
+            for event_index, event_data in enumerate(events_data)
+            if (partition_index, event_index) not in claimed
+        ] + merged_events
+
+    def _get_boundary_zones(
+        self, partitions: list[list[dict]], results: list[list[dict]]
+    ) -> list[list[tuple[int, int]]]:
+        """
+        Finds the reconstructed events close to each partition boundary.
+        An event belongs to one zone at most. Boundaries with events on one side only are skipped.
+
+        Args:
+            partitions (list[list[dict]]): The candidate events, partitioned by date.
+            results (list[list[dict]]): The reconstructed events of each partition.
+        Returns:
+            list[list[tuple[int, int]]]: The events of each zone, as (partition index, event index).
+        """
+        zones = []
+        claimed = set()
+        margin = timedelta(days=BOUNDARY_MARGIN_DAYS)
+        for index in range(len(partitions) - 1):
+            # the date of the first candidate of the later partition
+            boundary = _parse_event_date(partitions[index + 1][0])
+            zone = []
+            for partition_index in (index, index + 1):
+                for event_index, event_data in enumerate(results[partition_index]):
+                    if (partition_index, event_index) in claimed or not isinstance(
+                        event_data, dict
+                    ):
+                        continue
+
+                    event_date = _parse_event_date(event_data)
+                    if event_date is not None and abs(event_date - boundary) <= margin:
+                        zone.append((partition_index, event_index))
+
+            if len({partition_index for partition_index, _ in zone}) == 2:
+                zones.append(zone)
+                claimed.update(zone)
+
+        return zones
+
+    @retry(
+        # Exponential backoff: 2s, 4s, 8s, 16s... up to a max of 60s
+        wait=wait_exponential(multiplier=1, min=2, max=60),
+        # Stop after 5 failed attempts
+        stop=stop_after_attempt(5),
+        # Only retry on specific network or rate-limit errors
+        retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
+        # Log the attempt details before sleeping
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+    )
+    def _merge_boundary_events(self, events_data: list[dict]) -> list[dict]:
+        """Merges the reconstructed events near a partition boundary that describe the same occurrence.
+
+        Args:
+            events_data (list[dict]): The reconstructed events on both sides of the boundary.
+        Returns:
+            list[dict]: The merged events, along with the events that had no duplicate.
+        """
+        try:
+            response = get_responses_client().create(
+                model="gpt-5-mini",
+                input=[
+                    {
+                        "role": "system",
+                        "content": self.merge_prompt_instructions,
+                    },
+                    {"role": "user", "content": json.dumps(events_data)},
+                ],
+                reasoning={
+                    "effort": "minimal",
+                },
+                text=self._get_response_text_format(),
+            )
+
+            if response.output_text:
+                return json.loads(response.output_text).get("events", [])
+
+            return []
+        except OpenAIError as e:
+            logger.error(f"OpenAI API error: {e}")
+            raise
+        except json.JSONDecodeError as e:
+            logger.error(
+                f"JSON decoding error: {e}. Response text: {response.output_text}"
+            )
+            raise ValueError(
+                "Failed to merge the events at a partition boundary due to invalid JSON format in the LLM response."
+            )
+
     def _save_reconstructed_events(
         self, events_data: list[dict], dry_run: bool = False
     ) -> list[TimelineEvent]:
@@ -600,7 +1667,7 @@ class TimelineEventReconstructor:
         Returns:
             list[TimelineEvent]: A list of TimelineEvent objects created from the input dictionaries. Not saved to the database yet.
         """
-        saved_events = []
+        valid_events_data = []
         for event_data in events_data:
             if not isinstance(event_data, dict):
                 logger.warning(
@@ -608,50 +1675,53 @@ class TimelineEventReconstructor:
                 )
                 continue
 
-            event_date_str = event_data.get("event_date")
-            event_date = timezone.now()
-            if event_date_str:
-                try:
-                    event_date = timezone.datetime.fromisoformat(event_date_str)
-                    if event_date.tzinfo is None:
-                        event_date = timezone.make_aware(event_date)
-                except ValueError as error:
-                    logger.info(
-                        f"Failed to parse event_date '{event_date_str}' for event '{event_data.get('title')}'. Error: {error}. Defaulting to current datetime."
-                    )
+            valid_events_data.append(event_data)
 
-            source_entity_id = event_data.get("source", {}).get("id", 0)
-            source_entity_type = event_data.get("source", {}).get("type", "document")
-            source_entity = None
-            if source_entity_type == "document":
-                source_entity = TimelineEvent.SourceEntity.UPLOADED_FILE
-            elif source_entity_type == "email":
-                source_entity = TimelineEvent.SourceEntity.PARSED_EMAIL
-            elif source_entity_type == "attachment":
-                source_entity = TimelineEvent.SourceEntity.PARSED_EMAIL_ATTACHMENT
-
-            timeline_event = TimelineEvent(
-                title=event_data.get("title", ""),
-                description=event_data.get("description", ""),
-                event_date=event_date,
-                place=event_data.get("place", ""),
-                data=event_data,
-                timeline=self.timeline,
-                source_entity=source_entity,
-                source_entity_id=source_entity_id,
+        now = timezone.now()
+        event_dates = parse_event_dates(
+            [event_data.get("event_date") for event_data in valid_events_data]
+        )
+        undated = sum(event_date is None for event_date in event_dates)
+        if undated:
+            logger.info(
+                f"{undated} event(s) have a missing or invalid event_date. Defaulting to current datetime."
             )
 
-            try:
-                timeline_event.full_clean()
-                if not dry_run:
-                    timeline_event.save()
+        source_entities = {
+            "document": TimelineEvent.SourceEntity.UPLOADED_FILE,
+            "email": TimelineEvent.SourceEntity.PARSED_EMAIL,
+            "attachment": TimelineEvent.SourceEntity.PARSED_EMAIL_ATTACHMENT,
+        }
+        timeline_events = []
+        for event_data, event_date in zip(valid_events_data, event_dates):
+            source = event_data.get("source", {})
+            timeline_events.append(
+                TimelineEvent(
+                    title=event_data.get("title", ""),
+                    description=event_data.get("description", ""),
+                    event_date=event_date or now,
+                    place=event_data.get("place", ""),
+                    data=event_data,
+                    timeline=self.timeline,
+                    source_entity=source_entities.get(source.get("type", "document")),
+                    source_entity_id=source.get("id", 0),
+                )
+            )
 
-                saved_events.append(timeline_event)
-            except ValidationError as e:
-                logger.error(
-                    f"Validation error for event '{timeline_event.title}': {e}"
+        # the timeline is not validated. it is the same for all the events.
+        saved_events, errors = validate_in_bulk(timeline_events, exclude=["timeline"])
+        if errors:
+            logger.error(
+                f"Skipping {len(errors)} of {len(timeline_events)} events due to validation errors: "
+                + "; ".join(
+                    f"'{timeline_events[index].title}': {error}"
+                    for index, error in errors
                 )
-                continue
+            )
+
+        if not dry_run:
+            with transaction.atomic():
+                TimelineEvent.objects.bulk_create(saved_events, batch_size=500)
 
         return saved_events
 
@@ -663,10 +1733,123 @@ class TimelineEventReconstructor:
         Returns:
             list[TimelineEvent]: A list of TimelineEvent objects created from the reconstructed event data. Not saved to the database if dry=True.
         """
-        candidate_events = self._get_content()
-        events_data = self._reconstruct_events(candidate_events)
+        candidate_events = self._cluster_candidate_events(self._get_content())
+        partitions = partition_candidate_events(
+            candidate_events, settings.TIMELINE_PARTITION_TOKENS
+        )
+        events_data = self._reconstruct_partitions(partitions)
         timeline_events = self._save_reconstructed_events(events_data, dry_run=dry)
         logger.debug(
             f"No. of reconstructed events: {len(timeline_events)} from LLM, {len(timeline_events)} saved to the database (dry_run={dry})"
         )
         return timeline_events
+
+    def _reconstruct_date_range(
+        self, date_range: tuple[date, date], candidate_events: list[dict]
+    ) -> list[dict]:
+        partitions = partition_candidate_events(
+            candidate_events, settings.TIMELINE_PARTITION_TOKENS
+        )
+        events_data = self._reconstruct_partitions(partitions)
+
+        # ? Why drop the events outside the range?
+        # Only the events within the range are replaced by the next refresh. The others would pile up.
+        # Undated events would be dated now, outside the range. See _save_reconstructed_events.
+        first_day, last_day = date_range
+        event_dates = parse_event_dates(
+            [
+                event_data.get("event_date") if isinstance(event_data, dict) else None
+                for event_data in events_data
+            ]
+        )
+        in_range = [
+            event_data
+            for event_data, event_date in zip(events_data, event_dates)
+            if event_date is not None
+            and first_day <= timezone.localdate(event_date) <= last_day
+        ]
+        if len(in_range) < len(events_data):
+            logger.warning(
+                f"Dropping {len(events_data) - len(in_range)} reconstructed event(s) of timeline ID {self.timeline.id} "
+                f"that are undated or outside the date range {first_day} - {last_day}."
+            )
+
+        return in_range
+
+    def refresh(
+        self,
+        timeline_exhibit_ids: list[int],
+        removed_dates: list[date],
+        dry: bool = False,
+    ) -> list[TimelineEvent]:
+        """
+        Incrementally reconstructs the events of the dates affected by the added and removed exhibits.
+        The candidate events of each affected date range (of all the exhibits) replace the events of the range.
+        The events of the other dates are kept as they are.
+
+        Args:
+            timeline_exhibit_ids (list[int]): IDs of the added timeline exhibits. Their candidate events are extracted.
+            removed_dates (list[date]): Days of the candidate events of the removed exhibits.
+            dry (bool): If True, the events will not be replaced in the database.
+        Returns:
+            list[TimelineEvent]: The reconstructed events of the affected dates. Not saved to the database if dry=True.
+        """
+        added_dates = [
+            timezone.localdate(event_date)
+            for event_date in CandidateEvent.objects.filter(
+                timeline_exhibit_id__in=timeline_exhibit_ids
+            ).values_list("event_date", flat=True)
+        ]
+        # the margin lets the new candidates merge with the events of the neighbouring days
+        date_ranges = get_date_ranges(
+            [*added_dates, *removed_dates], BOUNDARY_MARGIN_DAYS
+        )
+        if not date_ranges:
+            return []
+
+        candidate_events = self._cluster_candidate_events(
+            self._get_content(date_ranges)
+        )
+        range_candidates = []
+        for first_day, last_day in date_ranges:
+            candidates = [
+                event_data
+                for event_data in candidate_events
+                if first_day
+                <= timezone.localdate(_parse_event_date(event_data))
+                <= last_day
+            ]
+            # a range whose exhibits were all removed has no events left
+            if candidates:
+                range_candidates.append(((first_day, last_day), candidates))
+
+        logger.info(
+            f"Refreshing timeline ID {self.timeline.id}: {len(candidate_events)} candidate events in {len(date_ranges)} date range(s)."
+        )
+        if len(range_candidates) <= 1:
+            results = [
+                self._reconstruct_date_range(date_range, candidates)
+                for date_range, candidates in range_candidates
+            ]
+        else:
+            max_workers = min(
+                settings.TIMELINE_RECONSTRUCTION_MAX_WORKERS, len(range_candidates)
+            )
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(
+                    executor.map(self._reconstruct_date_range, *zip(*range_candidates))
+                )
+
+        events_data = list(itertools.chain.from_iterable(results))
+        with transaction.atomic():
+            if not dry:
+                TimelineEvent.objects.filter(timeline=self.timeline).filter(
+                    _filter_date_ranges(date_ranges)
+                ).delete()
+
+            timeline_events = self._save_reconstructed_events(events_data, dry_run=dry)
+
+        logger.debug(
+            f"No. of refreshed events: {len(timeline_events)} in {len(date_ranges)} date range(s) (dry_run={dry})"
+        )
+        return timeline_events
@@ -1,10 +1,18 @@
 import logging
+from datetime import date
 
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
 from openai import OpenAIError
 
-from .models import Timeline, TimelineExhibit
-from .services import CandidateEventExtractor, TimelineEventReconstructor
+from .models import ExtractionBatch, Timeline, TimelineExhibit
+from .progress import publish_timeline_progress, start_timeline_progress
+from .services import (
+    BatchCandidateEventExtractor,
+    CandidateEventExtractor,
+    TimelineEventReconstructor,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,15 +29,114 @@ def start_timeline_processing(timeline_id: int) -> None:
         logger.error(f"Timeline with id {timeline_id} does not exist.")
         return
 
-    timeline.mark_as_processing()
+    exhibit_ids = list(
+        TimelineExhibit.objects.filter(timeline_id=timeline_id).values_list(
+            "id", flat=True
+        )
+    )
+    # counted down by the exhibits as they finish. see _finish_exhibit
+    timeline.event_extraction_status = Timeline.Status.PROCESSING
+    timeline.pending_exhibits = len(exhibit_ids)
+    timeline.save(update_fields=["event_extraction_status", "pending_exhibits"])
+    start_timeline_progress(timeline_id, exhibits=len(exhibit_ids))
+
+    _extract_exhibits(timeline, exhibit_ids)
 
-    exhibits = TimelineExhibit.objects.filter(timeline_id=timeline_id).values_list(
-        "id", flat=True
+
+@shared_task
+def start_timeline_refresh(timeline_id: int) -> None:
+    """
+    Start the incremental refresh of a timeline, after exhibits were added or removed (see RefreshTimelineAPI).
+    Only the added exhibits are extracted (PASS-1). The fan-in then reconstructs only the affected dates (PASS-2).
+    """
+    try:
+        timeline = Timeline.objects.get(id=timeline_id)
+    except Timeline.DoesNotExist:
+        logger.error(f"Timeline with id {timeline_id} does not exist.")
+        return
+
+    # the exhibits of a failed refresh are extracted again, unless they completed
+    exhibit_ids = list(
+        TimelineExhibit.objects.filter(
+            timeline_id=timeline_id, id__in=timeline.pending_refresh["exhibits"]
+        )
+        .exclude(event_extraction_status=TimelineExhibit.Status.COMPLETED)
+        .values_list("id", flat=True)
     )
-    for exhibit_id in exhibits:
+    # the failed exhibits are claimed again by their extraction. see extract_candidate_events
+    TimelineExhibit.objects.filter(
+        id__in=exhibit_ids, event_extraction_status=TimelineExhibit.Status.FAILED
+    ).update(event_extraction_status=TimelineExhibit.Status.PENDING)
+    timeline.pending_exhibits = len(exhibit_ids)
+    timeline.save(update_fields=["pending_exhibits"])
+    start_timeline_progress(timeline_id, exhibits=len(exhibit_ids))
+
+    if not exhibit_ids:
+        # only removed exhibits
+        reconstruct_timeline_events.delay(timeline_id)
+        return
+
+    _extract_exhibits(timeline, exhibit_ids)
+
+
+def _extract_exhibits(timeline: Timeline, exhibit_ids: list[int]) -> None:
+    """Starts the extraction (PASS-1) of the exhibits, one task each, or as one batch job in the batch mode."""
+    if timeline.extraction_mode == Timeline.ExtractionMode.BATCH:
+        submit_extraction_batch.delay(timeline.id, exhibit_ids)
+        return
+
+    for exhibit_id in exhibit_ids:
         extract_candidate_events.delay(exhibit_id)
 
 
+def _finish_exhibit(timeline_exhibit: TimelineExhibit, failed: bool) -> None:
+    """
+    Marks the exhibit as completed (or failed), and counts it down on its timeline (fan-in).
+    The reconstruction (PASS-2) is started by the last exhibit to finish, exactly once, if none failed.
+    A failed exhibit fails the timeline.
+
+    Args:
+        timeline_exhibit (TimelineExhibit): The exhibit whose extraction has finished.
+        failed (bool): Whether the extraction failed.
+    """
+    status = (
+        TimelineExhibit.Status.FAILED if failed else TimelineExhibit.Status.COMPLETED
+    )
+    timeline_id = timeline_exhibit.timeline_id
+
+    with transaction.atomic():
+        # ? Why a conditional update?
+        # A redelivered task must not count the exhibit down twice.
+        finished = TimelineExhibit.objects.filter(
+            id=timeline_exhibit.id,
+            event_extraction_status=TimelineExhibit.Status.PROCESSING,
+        ).update(event_extraction_status=status)
+        timeline_exhibit.event_extraction_status = status
+        if not finished:
+            return
+
+        # the row lock serializes the exhibits finishing at the same time
+        timeline = Timeline.objects.select_for_update().get(id=timeline_id)
+        timeline.pending_exhibits -= 1
+        if failed:
+            # do not proceed to PASS-2
+            timeline.event_extraction_status = Timeline.Status.FAILED
+
+        timeline.save(update_fields=["pending_exhibits", "event_extraction_status"])
+        transaction.on_commit(lambda: publish_timeline_progress(timeline_id))
+
+        if (
+            timeline.pending_exhibits == 0
+            and timeline.event_extraction_status == Timeline.Status.PROCESSING
+        ):
+            # fan-out fan-in architecture:
+            # only proceed to reconstruct timeline events (PASS-2) after
+            # all exhibits have been processed and completed successfully
+            transaction.on_commit(
+                lambda: reconstruct_timeline_events.delay(timeline_id)
+            )
+
+
 @shared_task
 def extract_candidate_events(timeline_exhibit_id: int) -> None:
     """
@@ -42,7 +149,20 @@ def extract_candidate_events(timeline_exhibit_id: int) -> None:
         logger.error(f"TimelineExhibit with id {timeline_exhibit_id} does not exist.")
         return
 
-    timeline_exhibit.mark_as_processing()
+    # ? Why a conditional update?
+    # A redelivered or duplicated task must not extract the exhibit, and count it down, a second time.
+    claimed = TimelineExhibit.objects.filter(
+        id=timeline_exhibit_id,
+        event_extraction_status=TimelineExhibit.Status.PENDING,
+    ).update(event_extraction_status=TimelineExhibit.Status.PROCESSING)
+    if not claimed:
+        logger.info(
+            f"TimelineExhibit with id {timeline_exhibit_id} is already {timeline_exhibit.event_extraction_status}. Skipping."
+        )
+        return
+
+    timeline_exhibit.event_extraction_status = TimelineExhibit.Status.PROCESSING
+    publish_timeline_progress(timeline_exhibit.timeline_id)
 
     try:
         extractor = CandidateEventExtractor(timeline_exhibit=timeline_exhibit)
@@ -51,16 +171,130 @@ def extract_candidate_events(timeline_exhibit_id: int) -> None:
         logger.error(
             f"Error extracting candidate events for TimelineExhibit id {timeline_exhibit_id}: {str(e)}"
         )
-        timeline_exhibit.mark_as_failed()
+        _finish_exhibit(timeline_exhibit, failed=True)
         return
 
-    timeline_exhibit.mark_as_completed()
+    _finish_exhibit(timeline_exhibit, failed=False)
 
     logger.info(
         f"Extracted and saved {len(candidate_events)} candidate events for TimelineExhibit id {timeline_exhibit_id}."
     )
 
 
+@shared_task
+def submit_extraction_batch(timeline_id: int, timeline_exhibit_ids: list[int]) -> None:
+    """
+    Submit the extraction of the timeline exhibits as a batch job of OpenAI's Batch API.
+    The job is polled by poll_extraction_batch until it has finished.
+    """
+    try:
+        timeline = Timeline.objects.get(id=timeline_id)
+    except Timeline.DoesNotExist:
+        logger.error(f"Timeline with id {timeline_id} does not exist.")
+        return
+
+    # only the pending exhibits are claimed, so that a redelivered task does not submit them again
+    with transaction.atomic():
+        pending_ids = list(
+            TimelineExhibit.objects.select_for_update()
+            .filter(
+                timeline=timeline,
+                id__in=timeline_exhibit_ids,
+                event_extraction_status=TimelineExhibit.Status.PENDING,
+            )
+            .values_list("id", flat=True)
+        )
+        TimelineExhibit.objects.filter(id__in=pending_ids).update(
+            event_extraction_status=TimelineExhibit.Status.PROCESSING
+        )
+
+    if not pending_ids:
+        logger.info(
+            f"The exhibits of Timeline id {timeline_id} are already submitted. Skipping."
+        )
+        return
+
+    timeline_exhibits = list(
+        TimelineExhibit.objects.filter(id__in=pending_ids).select_related(
+            "timeline__case", "exhibit"
+        )
+    )
+    publish_timeline_progress(timeline_id)
+
+    try:
+        extraction_batch, reused = BatchCandidateEventExtractor(timeline).submit(
+            timeline_exhibits
+        )
+    except (OpenAIError, ValueError) as e:
+        logger.error(
+            f"Error submitting the extraction batch for Timeline id {timeline_id}: {str(e)}"
+        )
+        for timeline_exhibit in timeline_exhibits:
+            _finish_exhibit(timeline_exhibit, failed=True)
+        return
+
+    for timeline_exhibit in reused:
+        _finish_exhibit(timeline_exhibit, failed=False)
+
+    if extraction_batch is not None:
+        poll_extraction_batch.apply_async(
+            (extraction_batch.id,), countdown=settings.TIMELINE_BATCH_POLL_INTERVAL
+        )
+
+
+@shared_task
+def poll_extraction_batch(extraction_batch_id: int) -> None:
+    """
+    Poll the batch job of a timeline. Once it has finished, ingest its results and finish its exhibits (fan-in).
+    Reschedules itself until then.
+    """
+    extraction_batch = (
+        ExtractionBatch.objects.select_related("timeline")
+        .filter(id=extraction_batch_id, status=ExtractionBatch.Status.SUBMITTED)
+        .first()
+    )
+    if extraction_batch is None:
+        logger.info(
+            f"ExtractionBatch with id {extraction_batch_id} does not exist or was ingested."
+        )
+        return
+
+    # the job is checked, and its results downloaded, without holding the row lock
+    extractor = BatchCandidateEventExtractor(extraction_batch.timeline)
+    try:
+        batch = extractor.get_finished_batch(extraction_batch)
+        results = extractor.download_results(batch) if batch is not None else None
+    except OpenAIError as e:
+        # e.g. a network error. the job keeps running at OpenAI.
+        logger.error(
+            f"Error polling ExtractionBatch id {extraction_batch_id}: {str(e)}"
+        )
+        batch = None
+
+    if batch is None:
+        poll_extraction_batch.apply_async(
+            (extraction_batch_id,), countdown=settings.TIMELINE_BATCH_POLL_INTERVAL
+        )
+        return
+
+    with transaction.atomic():
+        # a redelivered task must not ingest the results twice
+        extraction_batch = (
+            ExtractionBatch.objects.select_for_update()
+            .filter(id=extraction_batch_id, status=ExtractionBatch.Status.SUBMITTED)
+            .first()
+        )
+        if extraction_batch is None:
+            logger.info(
+                f"ExtractionBatch with id {extraction_batch_id} was ingested by another task."
+            )
+            return
+
+        outcomes = extractor.ingest(extraction_batch, batch, results)
+        for timeline_exhibit in TimelineExhibit.objects.filter(id__in=outcomes):
+            _finish_exhibit(timeline_exhibit, failed=outcomes[timeline_exhibit.id])
+
+
 @shared_task
 def reconstruct_timeline_events(timeline_id: int) -> None:
     """
@@ -75,15 +309,27 @@ def reconstruct_timeline_events(timeline_id: int) -> None:
 
     try:
         reconstructor = TimelineEventReconstructor(timeline=timeline)
-        timeline_events = reconstructor.run()
+        if timeline.pending_refresh is None:
+            timeline_events = reconstructor.run()
+        else:
+            timeline_events = reconstructor.refresh(
+                timeline_exhibit_ids=timeline.pending_refresh["exhibits"],
+                removed_dates=[
+                    date.fromisoformat(day) for day in timeline.pending_refresh["dates"]
+                ],
+            )
     except (OpenAIError, ValueError) as e:
         logger.error(
             f"Error reconstructing timeline events for Timeline id {timeline_id}: {str(e)}"
         )
         timeline.mark_as_failed()
+        publish_timeline_progress(timeline_id)
         return
 
-    timeline.mark_as_completed()
+    timeline.event_extraction_status = Timeline.Status.COMPLETED
+    timeline.pending_refresh = None
+    timeline.save(update_fields=["event_extraction_status", "pending_refresh"])
+    publish_timeline_progress(timeline_id)
 
     logger.info(
         f"Reconstructed and saved {len(timeline_events)} timeline events for Timeline id {timeline_id}."
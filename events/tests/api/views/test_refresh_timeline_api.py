@@ -0,0 +1,184 @@
+from datetime import datetime
+
+from django.urls import reverse
+from django.utils import timezone
+
+from events.models import CandidateEvent, Timeline, TimelineExhibit
+
+
+def _get_api_url(timeline_id):
+    return reverse("events_api:timeline_refresh", kwargs={"timeline_id": timeline_id})
+
+
+def _create_timeline(timeline_factory, uploaded_file_factory, user, **kwargs):
+    timeline = timeline_factory.create(
+        created_by=user,
+        event_extraction_status=Timeline.Status.COMPLETED,
+        **kwargs,
+    )
+    timeline_exhibit = TimelineExhibit.objects.create(
+        timeline=timeline,
+        exhibit=uploaded_file_factory.create(
+            filename="a.pdf", file="/tmp/a.pdf", case=timeline.case
+        ),
+        event_extraction_status=TimelineExhibit.Status.COMPLETED,
+    )
+    return timeline, timeline_exhibit
+
+
+def test_with_anonymous_user(api_client, timeline_factory, db):
+    timeline = timeline_factory.create()
+
+    response = api_client.post(_get_api_url(timeline.id), data={}, format="json")
+
+    assert response.status_code == 403
+
+
+def test_returns_404_for_timeline_of_another_user(
+    api_client, users, timeline_factory, uploaded_file_factory
+):
+    api_client.force_authenticate(user=users["user1"])
+    timeline, timeline_exhibit = _create_timeline(
+        timeline_factory, uploaded_file_factory, users["user2"]
+    )
+
+    response = api_client.post(
+        _get_api_url(timeline.id),
+        data={"remove": [timeline_exhibit.exhibit_id]},
+        format="json",
+    )
+
+    assert response.status_code == 404
+
+
+def test_with_timeline_being_processed(
+    api_client, users, timeline_factory, uploaded_file_factory
+):
+    api_client.force_authenticate(user=users["user1"])
+    timeline, _ = _create_timeline(
+        timeline_factory, uploaded_file_factory, users["user1"]
+    )
+    timeline.event_extraction_status = Timeline.Status.PROCESSING
+    timeline.save()
+    exhibit = uploaded_file_factory.create(
+        filename="b.pdf", file="/tmp/b.pdf", case=timeline.case
+    )
+
+    response = api_client.post(
+        _get_api_url(timeline.id), data={"add": [exhibit.id]}, format="json"
+    )
+
+    assert response.status_code == 400
+    assert "Timeline is being processed." in str(response.json())
+
+
+def test_with_no_change(api_client, users, timeline_factory, uploaded_file_factory):
+    api_client.force_authenticate(user=users["user1"])
+    timeline, _ = _create_timeline(
+        timeline_factory, uploaded_file_factory, users["user1"]
+    )
+
+    response = api_client.post(_get_api_url(timeline.id), data={}, format="json")
+
+    assert response.status_code == 400
+    assert "Add or remove at least one exhibit." in str(response.json())
+
+
+def test_with_exhibit_of_another_case(
+    api_client, users, case_factory, timeline_factory, uploaded_file_factory
+):
+    api_client.force_authenticate(user=users["user1"])
+    timeline, _ = _create_timeline(
+        timeline_factory, uploaded_file_factory, users["user1"]
+    )
+    exhibit = uploaded_file_factory.create(
+        filename="b.pdf", file="/tmp/b.pdf", case=case_factory.create(title="Case B")
+    )
+
+    response = api_client.post(
+        _get_api_url(timeline.id), data={"add": [exhibit.id]}, format="json"
+    )
+
+    assert response.status_code == 400
+    assert "One or more exhibits are invalid for the given case." in str(
+        response.json()
+    )
+
+
+def test_removing_the_last_exhibit(
+    api_client, users, timeline_factory, uploaded_file_factory
+):
+    api_client.force_authenticate(user=users["user1"])
+    timeline, timeline_exhibit = _create_timeline(
+        timeline_factory, uploaded_file_factory, users["user1"]
+    )
+
+    response = api_client.post(
+        _get_api_url(timeline.id),
+        data={"remove": [timeline_exhibit.exhibit_id]},
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert "A timeline must have at least one exhibit." in str(response.json())
+
+
+def test_happy_path_adds_and_removes_exhibits(
+    api_client,
+    users,
+    timeline_factory,
+    uploaded_file_factory,
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    api_client.force_authenticate(user=users["user1"])
+    timeline, removed = _create_timeline(
+        timeline_factory, uploaded_file_factory, users["user1"]
+    )
+    kept = TimelineExhibit.objects.create(
+        timeline=timeline,
+        exhibit=uploaded_file_factory.create(
+            filename="b.pdf", file="/tmp/b.pdf", case=timeline.case
+        ),
+        event_extraction_status=TimelineExhibit.Status.COMPLETED,
+    )
+    CandidateEvent.objects.create(
+        timeline_exhibit=removed,
+        action_phrase="signed the agreement",
+        raw_description="The agreement was signed.",
+        event_date=timezone.make_aware(datetime(2024, 1, 5, 10)),
+        date_confidence="explicit",
+        evidence_excerpt="signed",
+        confidence=0.9,
+    )
+    added = uploaded_file_factory.create(
+        filename="c.pdf", file="/tmp/c.pdf", case=timeline.case
+    )
+
+    timeline_refresh_calls = []
+    monkeypatch.setattr(
+        "events.api.views.start_timeline_refresh.delay", timeline_refresh_calls.append
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(
+            _get_api_url(timeline.id),
+            data={"add": [added.id], "remove": [removed.exhibit_id]},
+            format="json",
+        )
+
+    assert response.status_code == 202
+    assert timeline_refresh_calls == [timeline.id]
+    added_timeline_exhibit = TimelineExhibit.objects.get(
+        timeline=timeline, exhibit=added
+    )
+    assert set(timeline.exhibits.values_list("id", flat=True)) == {
+        kept.id,
+        added_timeline_exhibit.id,
+    }
+    timeline.refresh_from_db()
+    assert timeline.event_extraction_status == Timeline.Status.PROCESSING
+    assert timeline.pending_refresh == {
+        "dates": ["2024-01-05"],
+        "exhibits": [added_timeline_exhibit.id],
+    }
@@ -0,0 +1,52 @@
+from django.urls import reverse
+
+from events.models import Timeline, TimelineExhibit
+
+
+def _get_api_url(timeline_id):
+    return reverse("events_api:timeline_progress", kwargs={"timeline_id": timeline_id})
+
+
+def test_with_anonymous_user(api_client, timeline_factory, db):
+    timeline = timeline_factory.create()
+
+    response = api_client.get(_get_api_url(timeline.id))
+
+    assert response.status_code == 403
+
+
+def test_returns_404_for_timeline_of_another_user(api_client, users, timeline_factory):
+    api_client.force_authenticate(user=users["user1"])
+    timeline = timeline_factory.create(created_by=users["user2"])
+
+    response = api_client.get(_get_api_url(timeline.id))
+
+    assert response.status_code == 404
+
+
+def test_completed_timeline_ends_the_stream(
+    api_client, users, timeline_factory, uploaded_file_factory
+):
+    api_client.force_authenticate(user=users["user1"])
+    timeline = timeline_factory.create(
+        created_by=users["user1"], event_extraction_status=Timeline.Status.COMPLETED
+    )
+    TimelineExhibit.objects.create(
+        timeline=timeline,
+        exhibit=uploaded_file_factory.create(
+            filename="a.pdf", file="/tmp/a.pdf", case=timeline.case
+        ),
+        event_extraction_status=TimelineExhibit.Status.COMPLETED,
+    )
+
+    response = api_client.get(_get_api_url(timeline.id))
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "text/event-stream"
+    assert response["Cache-Control"] == "no-cache"
+    content = b"".join(response.streaming_content).decode()
+    assert '"filename": "a.pdf"' in content
+    assert content.endswith(
+        f'event: done\ndata: {{"id": {timeline.id}, "status": "completed"}}\n\n'
+    )
@@ -0,0 +1,42 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from poc.models import Case
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_runs_the_pipeline_end_to_end(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    stdout = StringIO()
+
+    call_command(
+        "benchmark_timeline",
+        "--exhibits",
+        "1",
+        "3",
+        "--latency-ms",
+        "0",
+        "--timeout",
+        "30",
+        stdout=stdout,
+    )
+
+    results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [result["exhibits"] for result in results] == [1, 3]
+    for result in results:
+        assert result["status"] == "completed"
+        assert result["candidate_events"] == 3 * result["exhibits"]
+        assert result["timeline_events"] > 0
+        assert result["llm"]["requests"]["responses"] == result["exhibits"] + 1
+        assert (
+            result["tasks"]["events.tasks.extract_candidate_events"]["calls"]
+            == result["exhibits"]
+        )
+        assert result["stages"]["fan_in"] is not None
+        assert result["queries"] > 0
+    # the synthetic cases and their files are removed
+    assert not Case.objects.exists()
+    assert not any((tmp_path / "benchmark").iterdir())
@@ -0,0 +1,101 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from events.llm_cache import (
+    CacheMode,
+    CachingEmbeddings,
+    CachingResponses,
+    DatabaseStore,
+    FileStore,
+    LLMCacheMiss,
+    get_request_key,
+)
+
+REQUEST = {
+    "model": "gpt-5-mini",
+    "input": [
+        {"role": "system", "content": "Extract the events."},
+        {"role": "user", "content": "The agreement was signed on 5 January 2024."},
+    ],
+    "text": {"format": {"type": "json_schema", "name": "events", "schema": {}}},
+}
+
+
+def _responses(output_text: str = '{"events": []}') -> MagicMock:
+    responses = MagicMock()
+    responses.create.return_value = MagicMock(output_text=output_text)
+    return responses
+
+
+def test_request_key_does_not_depend_on_the_order_of_the_arguments():
+    reordered = dict(reversed(list(REQUEST.items())))
+
+    assert get_request_key(reordered) == get_request_key(REQUEST)
+    assert get_request_key({**REQUEST, "model": "gpt-5"}) != get_request_key(REQUEST)
+
+
+def test_read_through_calls_the_api_once(tmp_path):
+    responses = _responses()
+    client = CachingResponses(
+        responses, mode=CacheMode.READ_THROUGH, store=FileStore(tmp_path)
+    )
+
+    first = client.create(**REQUEST)
+    second = client.create(**REQUEST)
+
+    assert responses.create.call_count == 1
+    assert second.output_text == first.output_text == '{"events": []}'
+
+
+def test_record_then_replay_offline(db):
+    recording = CachingResponses(
+        _responses('{"events": [1]}'), mode=CacheMode.RECORD, store=DatabaseStore()
+    )
+    recording.create(**REQUEST)
+    # recorded again, the latest response is kept
+    recording.responses.create.return_value = MagicMock(output_text='{"events": [2]}')
+    recording.create(**REQUEST)
+
+    offline = _responses()
+    offline.create.side_effect = AssertionError("The API must not be called.")
+    replaying = CachingResponses(offline, mode=CacheMode.REPLAY, store=DatabaseStore())
+
+    assert replaying.create(**REQUEST).output_text == '{"events": [2]}'
+    with pytest.raises(LLMCacheMiss):
+        replaying.create(**{**REQUEST, "model": "gpt-5"})
+
+
+def test_off_mode_does_not_cache(settings, tmp_path):
+    settings.TIMELINE_LLM_CACHE_STORE = "file"
+    settings.TIMELINE_LLM_CACHE_DIR = str(tmp_path)
+    responses = _responses()
+    client = CachingResponses(responses, mode=CacheMode.OFF)
+
+    client.create(**REQUEST)
+    client.create(**REQUEST)
+
+    assert responses.create.call_count == 2
+    assert not any(tmp_path.iterdir())
+
+
+def test_embeddings_are_recorded_then_replayed_offline(tmp_path):
+    request = {"model": "text-embedding-3-small", "input": ["signed: The agreement."]}
+    embeddings = MagicMock()
+    embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.5, -0.25])])
+    CachingEmbeddings(
+        embeddings, mode=CacheMode.RECORD, store=FileStore(tmp_path)
+    ).create(**request)
+
+    offline = MagicMock()
+    offline.create.side_effect = AssertionError("The API must not be called.")
+    replaying = CachingEmbeddings(
+        offline, mode=CacheMode.REPLAY, store=FileStore(tmp_path)
+    )
+
+    assert replaying.create(**request).data[0].embedding == [0.5, -0.25]
+    # not answered with the response of a responses request of the same arguments
+    with pytest.raises(LLMCacheMiss):
+        CachingResponses(
+            offline, mode=CacheMode.REPLAY, store=FileStore(tmp_path)
+        ).create(**request)
@@ -0,0 +1,83 @@
+import json
+from unittest.mock import patch
+
+from events.models import CandidateEvent, Timeline, TimelineExhibit
+from events.progress import (
+    publish_timeline_progress,
+    start_timeline_progress,
+    stream_timeline_progress,
+)
+from events.tasks import _finish_exhibit
+
+
+def _parse_event(event: str) -> tuple[str, dict]:
+    name, data = event.strip().split("\n")
+    return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def test_progress_is_streamed_until_the_timeline_completes(
+    timeline_factory, uploaded_file_factory, django_capture_on_commit_callbacks, db
+):
+    timeline = timeline_factory.create(
+        event_extraction_status=Timeline.Status.PROCESSING, pending_exhibits=2
+    )
+    first, second = [
+        TimelineExhibit.objects.create(
+            timeline=timeline,
+            exhibit=uploaded_file_factory.create(
+                file=f"poc/uploaded_files/exhibit_{number}.pdf", case=timeline.case
+            ),
+            event_extraction_status=TimelineExhibit.Status.PROCESSING,
+        )
+        for number in range(2)
+    ]
+    start_timeline_progress(timeline.id, exhibits=2)
+    stream = stream_timeline_progress(timeline.id, timeout=5)
+
+    name, progress = _parse_event(next(stream))
+    assert name == "progress"
+    assert progress["stage"] == "extraction"
+    assert progress["eta_seconds"] is None
+
+    CandidateEvent.objects.create(
+        timeline_exhibit=first,
+        action_phrase="signed the agreement",
+        raw_description="The agreement was signed.",
+        event_date="2024-01-05T10:00:00Z",
+        date_confidence="explicit",
+        evidence_excerpt="signed",
+        confidence=0.9,
+    )
+    with (
+        patch("events.tasks.reconstruct_timeline_events.delay"),
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        _finish_exhibit(first, failed=False)
+
+    name, progress = _parse_event(next(stream))
+    assert progress["pending_exhibits"] == 1
+    assert progress["eta_seconds"] is not None
+    assert [
+        (exhibit["status"], exhibit["candidate_events"])
+        for exhibit in progress["exhibits"]
+    ] == [("completed", 1), ("processing", 0)]
+
+    timeline.event_extraction_status = Timeline.Status.COMPLETED
+    timeline.save()
+    publish_timeline_progress(timeline.id)
+
+    assert _parse_event(next(stream))[1]["status"] == "completed"
+    assert _parse_event(next(stream)) == (
+        "done",
+        {"id": timeline.id, "status": "completed"},
+    )
+    assert next(stream, None) is None
+
+
+def test_progress_is_not_built_without_subscribers(timeline_factory, db):
+    timeline = timeline_factory.create()
+
+    with patch("events.progress.get_timeline_progress") as get_timeline_progress:
+        publish_timeline_progress(timeline.id)
+
+    get_timeline_progress.assert_not_called()
@@ -0,0 +1,598 @@
+import json
+import threading
+import time
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+import docx
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from events.models import (
+    CandidateEvent,
+    CandidateExtraction,
+    TimelineEvent,
+    TimelineExhibit,
+)
+from events.services import (
+    CONTINUED_NOTE,
+    CandidateEventExtractor,
+    ExhibitDocument,
+    TimelineEventReconstructor,
+    cluster_candidate_events,
+    get_date_ranges,
+    get_parsed_email_attachment_document,
+    get_uploaded_file_documents,
+    merge_candidate_events,
+    parse_event_dates,
+    partition_candidate_events,
+    split_into_windows,
+)
+from poc.utils import count_tokens
+
+
+def _document(document_id: int, pages: list[str]) -> ExhibitDocument:
+    return ExhibitDocument(
+        header=f"[Document]\nID: {document_id}\nContent:\n",
+        pages=pages,
+        footer=f"---[End of Document ID: {document_id}]---\n",
+    )
+
+
+def _candidate(action_phrase: str, confidence: float = 0.5, source_id: int = 1):
+    return {
+        "candidate_id": action_phrase,
+        "action_phrase": action_phrase,
+        "raw_description": f"The {action_phrase}.",
+        "event_date": "2024-01-05T10:00:00",
+        "date_confidence": "explicit",
+        "actors": ["Mahadevan"],
+        "evidence_excerpt": action_phrase,
+        "confidence": confidence,
+        "source": {"type": "document", "id": source_id},
+    }
+
+
+def test_small_documents_fit_in_a_single_window():
+    documents = [_document(1, ["page one\n"]), _document(2, ["page two\n"])]
+
+    windows = split_into_windows(documents, token_budget=1000)
+
+    assert windows == ["".join(document.render() for document in documents)]
+
+
+def test_large_document_is_split_on_page_boundaries():
+    pages = [f"page {number} " + "word " * 600 + "\n" for number in range(1, 6)]
+    document = _document(1, pages)
+
+    windows = split_into_windows([document], token_budget=1000)
+
+    assert len(windows) == 5
+    assert all(count_tokens(window) <= 1000 for window in windows)
+    # every window names the document
+    assert all(window.startswith(document.header) for window in windows)
+    assert all(window.endswith(document.footer) for window in windows)
+    assert CONTINUED_NOTE not in windows[0]
+    assert all(CONTINUED_NOTE in window for window in windows[1:])
+    assert windows[2].count("page 3 ") == 1
+
+
+def test_page_larger_than_a_window_is_split_on_line_boundaries():
+    page = "".join(f"line {number} of the page\n" for number in range(600))
+
+    windows = split_into_windows([_document(1, [page])], token_budget=1500)
+
+    assert len(windows) > 1
+    assert all(count_tokens(window) <= 1500 for window in windows)
+    assert "line 599 of the page\n" in windows[-1]
+
+
+def test_text_and_office_exhibits_are_read_from_their_files(
+    uploaded_file_factory, case_factory, settings, tmp_path, db
+):
+    settings.MEDIA_ROOT = tmp_path
+    (tmp_path / "notes.txt").write_text("The agreement was signed on 5 January 2024.")
+    document = docx.Document()
+    document.add_paragraph("The notice was sent on 9 February 2024.")
+    document.save(tmp_path / "notice.docx")
+    case = case_factory.create()
+
+    text_file, office_file = (
+        uploaded_file_factory.create(file=filename, filename=filename, case=case)
+        for filename in ("notes.txt", "notice.docx")
+    )
+    attachment = MagicMock(
+        id=1,
+        filename="notice.docx",
+        content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        file=MagicMock(path=str(tmp_path / "notice.docx")),
+    )
+
+    assert (
+        "signed on 5 January 2024" in get_uploaded_file_documents(text_file)[0].render()
+    )
+    assert (
+        "sent on 9 February 2024"
+        in get_uploaded_file_documents(office_file)[0].render()
+    )
+    assert (
+        "sent on 9 February 2024"
+        in get_parsed_email_attachment_document(attachment, MagicMock(id=1)).render()
+    )
+
+
+def test_merged_candidates_are_deduplicated_by_identity():
+    results = [
+        [_candidate("signed the agreement"), _candidate("paid the advance")],
+        [
+            _candidate("Signed  the agreement", confidence=0.9),
+            _candidate("signed the agreement", source_id=2),
+        ],
+    ]
+
+    merged = merge_candidate_events(results)
+
+    assert [(event["action_phrase"], event["confidence"]) for event in merged] == [
+        ("Signed  the agreement", 0.9),
+        ("paid the advance", 0.5),
+        # same action in another source
+        ("signed the agreement", 0.5),
+    ]
+
+
+def test_windows_are_extracted_in_parallel(
+    cases, timeline_factory, uploaded_file_factory, settings
+):
+    settings.TIMELINE_WINDOW_TOKENS = 1000
+    case = cases["mahadevan_vs_gopalan"]
+    timeline_exhibit = TimelineExhibit.objects.create(
+        timeline=timeline_factory.create(case=case),
+        exhibit=uploaded_file_factory.create(
+            file="poc/uploaded_files/agreement.pdf", case=case
+        ),
+    )
+    pages = [f"page {number} " + "word " * 600 + "\n" for number in range(1, 5)]
+
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def _create(**kwargs):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+
+        time.sleep(0.1)
+        page = next(
+            line
+            for line in kwargs["input"][1]["content"].splitlines()
+            if "page " in line
+        ).split()[1]
+        with lock:
+            in_flight -= 1
+
+        # every window also reports the signing of the agreement
+        events = [
+            _candidate(f"reviewed page {page}"),
+            _candidate("signed the agreement"),
+        ]
+        return MagicMock(output_text=json.dumps({"events": events}))
+
+    with (
+        patch(
+            "events.services.get_uploaded_file_documents",
+            return_value=[_document(timeline_exhibit.exhibit.id, pages)],
+        ),
+        patch("events.services.OpenAI") as openai_class,
+    ):
+        openai_class.return_value.responses.create.side_effect = _create
+        candidate_events = CandidateEventExtractor(timeline_exhibit).run()
+
+    assert max_in_flight > 1
+    assert sorted(event.action_phrase for event in candidate_events) == [
+        "reviewed page 1",
+        "reviewed page 2",
+        "reviewed page 3",
+        "reviewed page 4",
+        "signed the agreement",
+    ]
+    assert CandidateEvent.objects.filter(timeline_exhibit=timeline_exhibit).count() == 5
+
+
+def test_extraction_is_reused_across_timelines_until_the_case_changes(
+    cases, timeline_factory, uploaded_file_factory, django_capture_on_commit_callbacks
+):
+    case = cases["mahadevan_vs_gopalan"]
+    exhibit = uploaded_file_factory.create(
+        file="poc/uploaded_files/agreement.pdf", case=case
+    )
+
+    def _run() -> list[CandidateEvent]:
+        timeline_exhibit = TimelineExhibit.objects.create(
+            timeline=timeline_factory.create(case=case), exhibit=exhibit
+        )
+        with patch(
+            "events.services.get_uploaded_file_documents",
+            return_value=[_document(exhibit.id, ["The agreement was signed.\n"])],
+        ):
+            return CandidateEventExtractor(timeline_exhibit).run()
+
+    with patch("events.services.OpenAI") as openai_class:
+        openai_class.return_value.responses.create.return_value = MagicMock(
+            output_text=json.dumps({"events": [_candidate("signed the agreement")]})
+        )
+        first = _run()
+        second = _run()
+        assert openai_class.return_value.responses.create.call_count == 1
+
+        # the case details are part of the prompt. their snapshot is invalidated on commit.
+        with django_capture_on_commit_callbacks(execute=True):
+            case.title = f"{case.title} (renamed)"
+            case.save()
+        _run()
+        assert openai_class.return_value.responses.create.call_count == 2
+
+    assert CandidateExtraction.objects.filter(exhibit=exhibit).count() == 2
+    # each timeline has its own candidate events
+    assert [event.action_phrase for event in second] == ["signed the agreement"]
+    assert first[0].timeline_exhibit_id != second[0].timeline_exhibit_id
+
+
+def _candidate_on(day: int, action_phrase: str) -> dict:
+    return {**_candidate(action_phrase), "event_date": f"2024-01-{day:02d}T10:00:00"}
+
+
+def test_candidates_are_partitioned_by_day():
+    candidates = [
+        _candidate_on(day, f"action {day}.{number}")
+        for day in (1, 2, 3)
+        for number in range(3)
+    ]
+    tokens_per_day = sum(count_tokens(json.dumps(event)) for event in candidates[:3])
+
+    partitions = partition_candidate_events(candidates, tokens_per_day * 2 - 1)
+
+    # two days do not fit in a partition. the days are not split.
+    assert [
+        [event["event_date"][:10] for event in partition] for partition in partitions
+    ] == [
+        ["2024-01-01"] * 3,
+        ["2024-01-02"] * 3,
+        ["2024-01-03"] * 3,
+    ]
+
+
+def test_day_larger_than_a_partition_is_split():
+    candidates = [_candidate_on(1, f"action {number}") for number in range(4)]
+    tokens = count_tokens(json.dumps(candidates[0]))
+
+    partitions = partition_candidate_events(candidates, tokens * 2)
+
+    assert [len(partition) for partition in partitions] == [2, 2]
+
+
+def test_partitions_are_reconstructed_in_parallel_and_merged_at_the_boundaries(
+    timeline_factory, settings, db
+):
+    timeline = timeline_factory.create()
+    # one partition per day
+    settings.TIMELINE_PARTITION_TOKENS = 1
+    settings.TIMELINE_CLUSTERING_ENABLED = False
+    candidates = [
+        _candidate_on(1, "signed the agreement"),
+        _candidate_on(10, "paid the advance"),
+        _candidate_on(11, "acknowledged the payment"),
+    ]
+
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+    merged_inputs = []
+
+    def _event(title: str, day: int) -> dict:
+        return {
+            "title": title,
+            "description": f"{title}.",
+            "event_date": f"2024-01-{day:02d}T10:00:00",
+            "place": "",
+            "action_phrase": title,
+            "actors": ["Mahadevan"],
+            "source": {"type": "document", "id": 1},
+        }
+
+    def _create(**kwargs):
+        nonlocal in_flight, max_in_flight
+        events_data = json.loads(kwargs["input"][1]["content"])
+        if "text" in kwargs:
+            # boundary merge. the payment and its acknowledgement are the same occurrence.
+            merged_inputs.append([event["title"] for event in events_data])
+            events = [_event("Advance paid", 10)]
+        else:
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+
+            time.sleep(0.1)
+            with lock:
+                in_flight -= 1
+
+            events = [
+                _event(
+                    event["action_phrase"].capitalize(), int(event["event_date"][8:10])
+                )
+                for event in events_data
+            ]
+
+        return MagicMock(output_text=json.dumps({"events": events}))
+
+    with (
+        patch.object(
+            TimelineEventReconstructor, "_get_content", return_value=candidates
+        ),
+        patch("events.services.OpenAI") as openai_class,
+    ):
+        openai_class.return_value.responses.create.side_effect = _create
+        timeline_events = TimelineEventReconstructor(timeline).run()
+
+    assert max_in_flight > 1
+    # only the events close to the boundary between the 10th and the 11th are merged
+    assert merged_inputs == [["Paid the advance", "Acknowledged the payment"]]
+    assert sorted(event.title for event in timeline_events) == [
+        "Advance paid",
+        "Signed the agreement",
+    ]
+
+
+def test_date_ranges_are_widened_and_merged():
+    days = [date(2024, 1, 10), date(2024, 1, 1), date(2024, 1, 4), date(2024, 1, 1)]
+
+    date_ranges = get_date_ranges(days, margin_days=1)
+
+    # the ranges of the 1st and the 4th are adjacent
+    assert date_ranges == [
+        (date(2023, 12, 31), date(2024, 1, 5)),
+        (date(2024, 1, 9), date(2024, 1, 11)),
+    ]
+
+
+def test_refresh_reconstructs_only_the_affected_dates(
+    timeline_factory, uploaded_file_factory, settings, db
+):
+    settings.TIMELINE_CLUSTERING_ENABLED = False
+    timeline = timeline_factory.create()
+
+    def _timeline_exhibit() -> TimelineExhibit:
+        return TimelineExhibit.objects.create(
+            timeline=timeline,
+            exhibit=uploaded_file_factory.create(
+                file="poc/uploaded_files/exhibit.pdf", case=timeline.case
+            ),
+        )
+
+    def _at(day: int) -> datetime:
+        return timezone.make_aware(datetime(2024, 1, day, 10))
+
+    kept, added = _timeline_exhibit(), _timeline_exhibit()
+    for timeline_exhibit, day, action_phrase in [
+        (kept, 1, "signed the agreement"),
+        (kept, 5, "paid the advance"),
+        (added, 5, "acknowledged the payment"),
+    ]:
+        CandidateEvent.objects.create(
+            timeline_exhibit=timeline_exhibit,
+            action_phrase=action_phrase,
+            raw_description=f"The {action_phrase}.",
+            event_date=_at(day),
+            date_confidence="explicit",
+            evidence_excerpt=action_phrase,
+            confidence=0.9,
+        )
+
+    for day, title in [
+        (1, "Agreement signed"),
+        (5, "Advance paid"),
+        # of the removed exhibit
+        (20, "Notice sent"),
+    ]:
+        TimelineEvent.objects.create(
+            timeline=timeline,
+            title=title,
+            description=f"{title}.",
+            event_date=_at(day),
+            data={},
+            source_entity=TimelineEvent.SourceEntity.UPLOADED_FILE,
+            source_entity_id=kept.exhibit_id,
+        )
+
+    def _create(**kwargs):
+        events_data = json.loads(kwargs["input"][1]["content"])
+        assert [event["action_phrase"] for event in events_data] == [
+            "paid the advance",
+            "acknowledged the payment",
+        ]
+        events = [
+            {
+                "title": "Advance paid and acknowledged",
+                "description": "The advance was paid and acknowledged.",
+                "event_date": "2024-01-05T10:00:00",
+                "place": "",
+                "action_phrase": "paid the advance",
+                "actors": ["Mahadevan"],
+                "source": {"type": "document", "id": kept.exhibit_id},
+            }
+        ]
+        return MagicMock(output_text=json.dumps({"events": events}))
+
+    with patch("events.services.OpenAI") as openai_class:
+        openai_class.return_value.responses.create.side_effect = _create
+        timeline_events = TimelineEventReconstructor(timeline).refresh(
+            timeline_exhibit_ids=[added.id], removed_dates=[date(2024, 1, 20)]
+        )
+
+    # the range of the removed exhibit has no candidates left
+    assert openai_class.return_value.responses.create.call_count == 1
+    assert [event.title for event in timeline_events] == [
+        "Advance paid and acknowledged"
+    ]
+    assert sorted(timeline.events.values_list("title", flat=True)) == [
+        "Advance paid and acknowledged",
+        "Agreement signed",
+    ]
+
+
+def test_refresh_drops_the_events_outside_the_date_ranges(
+    timeline_factory, uploaded_file_factory, settings, db
+):
+    settings.TIMELINE_CLUSTERING_ENABLED = False
+    timeline = timeline_factory.create()
+    timeline_exhibit = TimelineExhibit.objects.create(
+        timeline=timeline,
+        exhibit=uploaded_file_factory.create(
+            file="poc/uploaded_files/exhibit.pdf", case=timeline.case
+        ),
+    )
+    CandidateEvent.objects.create(
+        timeline_exhibit=timeline_exhibit,
+        action_phrase="paid the advance",
+        raw_description="The advance was paid.",
+        event_date=timezone.make_aware(datetime(2024, 1, 5, 10)),
+        date_confidence="explicit",
+        evidence_excerpt="paid the advance",
+        confidence=0.9,
+    )
+
+    def _event(title: str, event_date: str | None) -> dict:
+        return {
+            "title": title,
+            "description": f"{title}.",
+            "event_date": event_date,
+            "place": "",
+            "action_phrase": title.lower(),
+            "actors": ["Mahadevan"],
+            "source": {"type": "document", "id": timeline_exhibit.exhibit_id},
+        }
+
+    events = [
+        _event("Advance paid", "2024-01-05T10:00:00"),
+        _event("Notice sent", "2024-03-01T10:00:00"),
+        _event("Rent unpaid", None),
+    ]
+    with patch("events.services.OpenAI") as openai_class:
+        openai_class.return_value.responses.create.return_value = MagicMock(
+            output_text=json.dumps({"events": events})
+        )
+        # refreshed twice. the second refresh replaces the events of the first.
+        for _ in range(2):
+            timeline_events = TimelineEventReconstructor(timeline).refresh(
+                timeline_exhibit_ids=[timeline_exhibit.id], removed_dates=[]
+            )
+
+    assert [event.title for event in timeline_events] == ["Advance paid"]
+    assert list(timeline.events.values_list("title", flat=True)) == ["Advance paid"]
+
+
+def test_event_dates_are_parsed_in_bulk():
+    values = ["2024-01-05T10:00:00", "2024-01-05T10:00:00", "5th January", None]
+
+    event_dates = parse_event_dates(values)
+
+    assert event_dates[0] == timezone.make_aware(datetime(2024, 1, 5, 10))
+    assert event_dates[0] is event_dates[1]
+    assert event_dates[2:] == [None, None]
+
+
+def test_candidate_events_are_validated_and_inserted_in_bulk(
+    timeline_factory, uploaded_file_factory, db
+):
+    timeline = timeline_factory.create()
+    timeline_exhibit = TimelineExhibit.objects.create(
+        timeline=timeline,
+        exhibit=uploaded_file_factory.create(
+            file="poc/uploaded_files/exhibit.pdf", case=timeline.case
+        ),
+    )
+    events_data = [_candidate(f"action {number}") for number in range(50)]
+    # invalid: blank evidence, too long an action phrase, not a dictionary
+    events_data[3]["evidence_excerpt"] = ""
+    events_data[7]["action_phrase"] = "x" * 300
+    events_data.append("not an event")
+
+    with CaptureQueriesContext(connection) as queries:
+        candidate_events = CandidateEventExtractor(
+            timeline_exhibit
+        )._save_candidate_events(events_data)
+
+    inserts = [query for query in queries if query["sql"].startswith("INSERT")]
+    assert len(inserts) == 1
+    assert len(candidate_events) == 48
+    assert all(candidate_event.id for candidate_event in candidate_events)
+    assert (
+        CandidateEvent.objects.filter(timeline_exhibit=timeline_exhibit).count() == 48
+    )
+
+
+def test_near_duplicate_candidates_are_clustered_by_similarity_and_date():
+    candidates = [
+        {**_candidate_on(1, "signed the agreement"), "id": 1},
+        # the same occurrence, from the attachment
+        {
+            **_candidate_on(1, "executed the agreement"),
+            "id": 2,
+            "confidence": 0.9,
+            "source": {"type": "attachment", "id": 7},
+        },
+        {**_candidate_on(1, "paid the advance"), "id": 3},
+        # similar, but too late
+        {**_candidate_on(5, "signed the agreement"), "id": 4},
+    ]
+    embeddings = [[1.0, 0.0], [0.99, 0.1], [0.0, 1.0], [1.0, 0.0]]
+
+    representatives = cluster_candidate_events(
+        candidates, embeddings, min_similarity=0.9, max_days=1
+    )
+
+    assert [event["id"] for event in representatives] == [2, 3, 4]
+    assert representatives[0]["member_ids"] == [1]
+    assert representatives[0]["member_sources"] == [{"type": "document", "id": 1}]
+    assert "member_ids" not in representatives[1]
+
+
+def test_reconstruction_receives_one_representative_per_cluster(
+    timeline_factory, uploaded_file_factory, fake_openai, settings, db
+):
+    settings.OPENAI_BASE_URL = fake_openai.base_url
+    timeline = timeline_factory.create()
+    # the same email, summarised from its body and from its attachment
+    for action_phrase in ["sent the notice", "sent the notice", "paid the advance"]:
+        CandidateEvent.objects.create(
+            timeline_exhibit=TimelineExhibit.objects.create(
+                timeline=timeline,
+                exhibit=uploaded_file_factory.create(
+                    file="poc/uploaded_files/exhibit.pdf", case=timeline.case
+                ),
+            ),
+            action_phrase=action_phrase,
+            raw_description=f"The {action_phrase}.",
+            event_date=timezone.make_aware(datetime(2024, 1, 5, 10)),
+            date_confidence="explicit",
+            evidence_excerpt=action_phrase,
+            confidence=0.9,
+        )
+
+    with patch.object(
+        TimelineEventReconstructor, "_reconstruct_partitions", return_value=[]
+    ) as reconstruct_partitions:
+        TimelineEventReconstructor(timeline).run()
+        TimelineEventReconstructor(timeline).run()
+
+    (partition,) = reconstruct_partitions.call_args.args[0]
+    assert sorted(event["action_phrase"] for event in partition) == [
+        "paid the advance",
+        "sent the notice",
+    ]
+    assert [len(event.get("member_ids", [])) for event in partition].count(1) == 1
+    # the embeddings are reused by the later reconstructions
+    assert fake_openai.request_counts["embeddings"] == 1
+    assert not CandidateEvent.objects.filter(embedding__isnull=True).exists()
@@ -0,0 +1,266 @@
+import threading
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+
+from events.models import ExtractionBatch, Timeline, TimelineExhibit
+from events.services import ExhibitDocument
+from events.tasks import (
+    _finish_exhibit,
+    extract_candidate_events,
+    poll_extraction_batch,
+    reconstruct_timeline_events,
+    start_timeline_refresh,
+    submit_extraction_batch,
+)
+
+
+def _create_processing_timeline(
+    timeline_factory,
+    uploaded_file_factory,
+    exhibits: int,
+    status: str = TimelineExhibit.Status.PROCESSING,
+):
+    timeline = timeline_factory.create(
+        event_extraction_status=Timeline.Status.PROCESSING, pending_exhibits=exhibits
+    )
+    timeline_exhibits = [
+        TimelineExhibit.objects.create(
+            timeline=timeline,
+            exhibit=uploaded_file_factory.create(
+                file=f"poc/uploaded_files/exhibit_{number}.pdf", case=timeline.case
+            ),
+            event_extraction_status=status,
+        )
+        for number in range(exhibits)
+    ]
+    return timeline, timeline_exhibits
+
+
+@pytest.mark.django_db(transaction=True)
+def test_exhibits_finishing_together_start_the_reconstruction_once(
+    timeline_factory, uploaded_file_factory
+):
+    timeline, timeline_exhibits = _create_processing_timeline(
+        timeline_factory, uploaded_file_factory, exhibits=8
+    )
+    barrier = threading.Barrier(len(timeline_exhibits))
+
+    def _finish(timeline_exhibit):
+        try:
+            barrier.wait()
+            _finish_exhibit(timeline_exhibit, failed=False)
+        finally:
+            connection.close()
+
+    with patch("events.tasks.reconstruct_timeline_events.delay") as delay:
+        threads = [
+            threading.Thread(target=_finish, args=(timeline_exhibit,))
+            for timeline_exhibit in timeline_exhibits
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    delay.assert_called_once_with(timeline.id)
+    timeline.refresh_from_db()
+    assert timeline.pending_exhibits == 0
+    assert timeline.event_extraction_status == Timeline.Status.PROCESSING
+
+
+def test_redelivered_exhibit_is_counted_once(
+    timeline_factory, uploaded_file_factory, django_capture_on_commit_callbacks, db
+):
+    timeline, (first, second) = _create_processing_timeline(
+        timeline_factory,
+        uploaded_file_factory,
+        exhibits=2,
+        status=TimelineExhibit.Status.PENDING,
+    )
+
+    with (
+        patch("events.tasks.CandidateEventExtractor") as extractor,
+        patch("events.tasks.reconstruct_timeline_events.delay") as delay,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        extractor.return_value.run.return_value = []
+        extract_candidate_events(first.id)
+        # redelivered after it completed
+        extract_candidate_events(first.id)
+
+    extractor.return_value.run.assert_called_once()
+    delay.assert_not_called()
+    timeline.refresh_from_db()
+    assert timeline.pending_exhibits == 1
+    first.refresh_from_db()
+    assert first.event_extraction_status == TimelineExhibit.Status.COMPLETED
+
+
+def test_failed_exhibit_fails_the_timeline(
+    timeline_factory, uploaded_file_factory, django_capture_on_commit_callbacks, db
+):
+    timeline, (first, second) = _create_processing_timeline(
+        timeline_factory, uploaded_file_factory, exhibits=2
+    )
+
+    with (
+        patch("events.tasks.reconstruct_timeline_events.delay") as delay,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        _finish_exhibit(first, failed=True)
+        _finish_exhibit(second, failed=False)
+
+    delay.assert_not_called()
+    timeline.refresh_from_db()
+    assert timeline.event_extraction_status == Timeline.Status.FAILED
+    first.refresh_from_db()
+    assert first.event_extraction_status == TimelineExhibit.Status.FAILED
+
+
+def test_refresh_extracts_only_the_added_exhibits(
+    timeline_factory, uploaded_file_factory, db
+):
+    timeline, (kept, added) = _create_processing_timeline(
+        timeline_factory, uploaded_file_factory, exhibits=2
+    )
+    kept.mark_as_completed()
+    timeline.pending_refresh = {"dates": [], "exhibits": [added.id]}
+    timeline.save()
+
+    with patch("events.tasks.extract_candidate_events.delay") as delay:
+        start_timeline_refresh(timeline.id)
+
+    delay.assert_called_once_with(added.id)
+    timeline.refresh_from_db()
+    assert timeline.pending_exhibits == 1
+
+
+def test_refresh_reconstructs_the_affected_dates(timeline_factory, db):
+    timeline = timeline_factory.create(
+        event_extraction_status=Timeline.Status.PROCESSING,
+        pending_refresh={"dates": ["2024-01-05"], "exhibits": [7]},
+    )
+
+    with (
+        patch("events.tasks.TimelineEventReconstructor.refresh") as refresh,
+        patch("events.tasks.TimelineEventReconstructor.run") as run,
+    ):
+        refresh.return_value = []
+        reconstruct_timeline_events(timeline.id)
+
+    run.assert_not_called()
+    refresh.assert_called_once_with(
+        timeline_exhibit_ids=[7], removed_dates=[date(2024, 1, 5)]
+    )
+    timeline.refresh_from_db()
+    assert timeline.event_extraction_status == Timeline.Status.COMPLETED
+    assert timeline.pending_refresh is None
+
+
+def _submit_batch(timeline_factory, uploaded_file_factory, fake_openai, settings):
+    settings.OPENAI_BASE_URL = fake_openai.base_url
+    fake_openai.config.batch_latency_ms = 0
+    timeline, timeline_exhibits = _create_processing_timeline(
+        timeline_factory,
+        uploaded_file_factory,
+        exhibits=2,
+        status=TimelineExhibit.Status.PENDING,
+    )
+    timeline.extraction_mode = Timeline.ExtractionMode.BATCH
+    timeline.save()
+    documents = [
+        ExhibitDocument(
+            header="[Document]\nContent:\n",
+            pages=["The agreement was signed on 5 January 2024."],
+            footer="\n[/Document]\n",
+        )
+    ]
+
+    with (
+        patch("events.services.get_uploaded_file_documents", return_value=documents),
+        patch("events.tasks.poll_extraction_batch.apply_async") as apply_async,
+    ):
+        for _ in range(2):
+            # a redelivered task does not submit the exhibits again
+            submit_extraction_batch(
+                timeline.id,
+                [timeline_exhibit.id for timeline_exhibit in timeline_exhibits],
+            )
+
+    apply_async.assert_called_once()
+    assert fake_openai.request_counts["responses"] == 0
+    return (
+        timeline,
+        timeline_exhibits,
+        ExtractionBatch.objects.get(timeline=timeline),
+    )
+
+
+def test_batch_extraction_ingests_the_results_of_the_job(
+    timeline_factory,
+    uploaded_file_factory,
+    fake_openai,
+    settings,
+    django_capture_on_commit_callbacks,
+    db,
+):
+    timeline, timeline_exhibits, extraction_batch = _submit_batch(
+        timeline_factory, uploaded_file_factory, fake_openai, settings
+    )
+
+    with (
+        patch("events.tasks.reconstruct_timeline_events.delay") as delay,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        poll_extraction_batch(extraction_batch.id)
+        # a redelivered poll does not ingest the results again
+        poll_extraction_batch(extraction_batch.id)
+
+    delay.assert_called_once_with(timeline.id)
+    extraction_batch.refresh_from_db()
+    assert extraction_batch.status == ExtractionBatch.Status.COMPLETED
+    for timeline_exhibit in timeline_exhibits:
+        timeline_exhibit.refresh_from_db()
+        assert (
+            timeline_exhibit.event_extraction_status == TimelineExhibit.Status.COMPLETED
+        )
+        assert timeline_exhibit.candidate_events.exists()
+
+
+def test_malformed_batch_result_fails_only_its_exhibit(
+    timeline_factory,
+    uploaded_file_factory,
+    fake_openai,
+    settings,
+    django_capture_on_commit_callbacks,
+    db,
+):
+    timeline, timeline_exhibits, extraction_batch = _submit_batch(
+        timeline_factory, uploaded_file_factory, fake_openai, settings
+    )
+    batch = fake_openai.get_batch(extraction_batch.openai_batch_id)
+    lines = fake_openai.files[batch["output_file_id"]].splitlines(keepends=True)
+    fake_openai.files[batch["output_file_id"]] = b"".join(
+        [b'{"custom_id": "truncat\n', *lines[1:]]
+    )
+
+    with (
+        patch("events.tasks.poll_extraction_batch.apply_async") as apply_async,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        poll_extraction_batch(extraction_batch.id)
+
+    apply_async.assert_not_called()
+    extraction_batch.refresh_from_db()
+    assert extraction_batch.status == ExtractionBatch.Status.COMPLETED
+    assert sorted(
+        TimelineExhibit.objects.filter(timeline=timeline).values_list(
+            "event_extraction_status", flat=True
+        )
+    ) == [TimelineExhibit.Status.COMPLETED, TimelineExhibit.Status.FAILED]
+    timeline.refresh_from_db()
+    assert timeline.event_extraction_status == Timeline.Status.FAILED
+    assert timeline.pending_exhibits == 0
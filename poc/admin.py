@@ -1,9 +1,12 @@
 from django.contrib import admin
+from django.db.models import Avg, Count, Max, Q, Sum
 
 from .models import (
+    CachedAnswer,
     Case,
     CaseLitigant,
     ChatThread,
+    ChatTurnSpan,
     Litigant,
     LitigantRole,
     ParsedEmail,
@@ -105,3 +108,61 @@ class ParsedEmailAttachmentAdmin(admin.ModelAdmin):
     list_display_links = ("filename",)
     list_filter = ("embedding_status",)
     ordering = ("-id",)
+
+
+@admin.register(CachedAnswer)
+class CachedAnswerAdmin(admin.ModelAdmin):
+    list_display = ("id", "question", "case", "hits", "created_at")
+    list_display_links = ("question",)
+    search_fields = ("question", "case__case_number")
+    readonly_fields = ("embedding", "data_version")
+    ordering = ("-id",)
+
+
+@admin.register(ChatTurnSpan)
+class ChatTurnSpanAdmin(admin.ModelAdmin):
+    """
+    The latency breakdown of the chat turns.
+    The change list starts with the spans aggregated by kind and name, within the applied filters.
+    """
+
+    list_display = (
+        "id",
+        "ai_message",
+        "kind",
+        "name",
+        "start_ms",
+        "duration_ms",
+        "input_tokens",
+        "output_tokens",
+        "rows",
+        "error",
+    )
+    list_display_links = ("id",)
+    list_filter = ("kind", "name", "error", "created_at")
+    search_fields = ("name", "ai_message__id")
+    raw_id_fields = ("ai_message",)
+    ordering = ("-id",)
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context=extra_context)
+        if not hasattr(response, "context_data") or "cl" not in response.context_data:
+            # redirects and errors, e.g. invalid filters
+            return response
+
+        queryset = response.context_data["cl"].queryset.order_by()
+        response.context_data["summary"] = (
+            queryset.values("kind", "name")
+            .annotate(
+                count=Count("id"),
+                avg_ms=Avg("duration_ms"),
+                max_ms=Max("duration_ms"),
+                total_ms=Sum("duration_ms"),
+                input_tokens=Sum("input_tokens"),
+                output_tokens=Sum("output_tokens"),
+                avg_rows=Avg("rows"),
+                errors=Count("id", filter=Q(error=True)),
+            )
+            .order_by("-total_ms")
+        )
+        return response
@@ -228,6 +228,8 @@ class ChatThreadSerializer(ModelSerializer):
         fields = "__all__"
         read_only_fields = (
             "uuid",
+            "summary",
+            "summarized_until",
             "created_at",
             "updated_at",
         )
@@ -240,6 +242,9 @@ class ChatMessageSerializer(ModelSerializer):
         read_only_fields = (
             "thread",
             "role",
+            "status",
+            "error_message",
+            "reply_to",
             "created_at",
             "updated_at",
         )
@@ -9,6 +9,7 @@ from poc.api.views import (
     RetrieveLitigantAPI,
     RetrieveUpdateCaseAPI,
     RetrieveUpdateDestroyUploadedFileAPI,
+    StreamMessageAPI,
 )
 
 app_name = "poc"
@@ -37,6 +38,11 @@ urlpatterns = [
         ListCreateMessageAPI.as_view(),
         name="chat_messages",
     ),
+    path(
+        "cases/<uuid:case_uuid>/chat-threads/<uuid:thread_uuid>/messages/stream/",
+        StreamMessageAPI.as_view(),
+        name="chat_messages_stream",
+    ),
     path(
         "litigants/",
         ListCreateLitigantAPI.as_view(),
@@ -1,4 +1,6 @@
+from django.db import transaction
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.generics import (
     ListCreateAPIView,
@@ -19,8 +21,9 @@ from poc.api.serializers import (
     LitigantSerializer,
     UploadedFileSerializer,
 )
-from poc.langchain.chat_agent import send_message
+from poc.langchain.chat_agent import send_message, stream_message
 from poc.models import Case, ChatMessage, ChatThread, Litigant, UploadedFile
+from poc.tasks import answer_chat_thread
 
 __all__ = [
     "ListCreateCaseAPI",
@@ -29,6 +32,7 @@ __all__ = [
     "RetrieveUpdateDestroyUploadedFileAPI",
     "ListCreateThreadAPI",
     "ListCreateMessageAPI",
+    "StreamMessageAPI",
     "ListCreateLitigantAPI",
     "RetrieveLitigantAPI",
 ]
@@ -216,14 +220,66 @@ class ListCreateMessageAPI(APIView):
             data=request.data,
         )
         ip_serializer.is_valid(raise_exception=True)
+
+        # check for query param 'async'
+        if self.request.query_params.get("async") == "true":
+            # persist the user message and let the chat worker answer it.
+            # the AI message can be polled from the list of messages.
+            with transaction.atomic():
+                message = ChatMessage.objects.create(
+                    thread=thread,
+                    role=ChatMessage.Role.USER,
+                    content=ip_serializer.validated_data.get("content"),
+                    status=ChatMessage.Status.PENDING,
+                )
+                transaction.on_commit(lambda: answer_chat_thread.delay(thread.id))
+
+            op_serializer = ChatMessageSerializer(message)
+            return Response(op_serializer.data, status=202)
+
         # call the chat agent
+        # check for query param 'cache'. answers to similar questions are reused unless opted out.
         messages = send_message(
-            thread_id=thread.id, user_input=ip_serializer.validated_data.get("content")
+            thread_id=thread.id,
+            user_input=ip_serializer.validated_data.get("content"),
+            use_cache=self.request.query_params.get("cache") != "false",
         )
         op_serializer = ChatMessageSerializer(messages, many=True)
         return Response(op_serializer.data, status=201)
 
 
+class StreamMessageAPI(APIView):
+    """
+    Streams the AI response as Server-Sent Events while the agent runs.
+    Same input as ListCreateMessageAPI.post, which remains available for blocking clients.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        # validate case and thread
+        case_uuid = self.kwargs.get("case_uuid")
+        thread_uuid = self.kwargs.get("thread_uuid")
+        thread = get_object_or_404(ChatThread, uuid=thread_uuid, case__uuid=case_uuid)
+        # validate message content
+        ip_serializer = ChatMessageSerializer(
+            data=request.data,
+        )
+        ip_serializer.is_valid(raise_exception=True)
+        # stream the chat agent's events
+        response = StreamingHttpResponse(
+            stream_message(
+                thread_id=thread.id,
+                user_input=ip_serializer.validated_data.get("content"),
+            ),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # disable response buffering in nginx
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
 class ListCreateLitigantAPI(ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = LitigantSerializer
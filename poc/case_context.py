@@ -0,0 +1,103 @@
+"""
+Snapshot of a case's details and litigants, shared by the prompts (e.g. the timeline extraction)
+and the chat tools that describe the case.
+
+The snapshot is built with one prefetching query, and cached in redis under the case's data version.
+The version is bumped by the signals on Case, CaseLitigant and Litigant (see poc.signals),
+so a snapshot is never read after the case or its litigants change.
+"""
+
+from dataclasses import dataclass
+
+from django.core.cache import cache as django_cache
+from django.db.models import Prefetch
+
+from .models import Case, CaseLitigant
+from .utils import get_case_data_version
+
+__all__ = [
+    "CaseContext",
+    "CaseContextLitigant",
+    "get_case_context",
+]
+
+# a day. the entries of the older versions expire unread.
+CASE_CONTEXT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+@dataclass(frozen=True)
+class CaseContextLitigant:
+    role_id: int
+    role: str
+    name: str
+    bio: str
+    email: str
+    phone: str
+    is_our_client: bool
+
+
+@dataclass(frozen=True)
+class CaseContext:
+    id: int
+    title: str
+    case_number: str | None
+    description: str
+    # ordered by role, then by when they were added to the case
+    litigants: tuple[CaseContextLitigant, ...]
+
+
+def _build_case_context(case_id: int) -> CaseContext | None:
+    case = (
+        Case.objects.filter(id=case_id)
+        .prefetch_related(
+            Prefetch(
+                "case_litigants",
+                queryset=CaseLitigant.objects.select_related(
+                    "litigant", "role"
+                ).order_by("role_id", "id"),
+            )
+        )
+        .first()
+    )
+    if case is None:
+        return None
+
+    return CaseContext(
+        id=case.id,
+        title=case.title,
+        case_number=case.case_number,
+        description=case.description,
+        litigants=tuple(
+            CaseContextLitigant(
+                role_id=case_litigant.role_id,
+                role=case_litigant.role.name,
+                name=case_litigant.litigant.name,
+                bio=case_litigant.litigant.bio,
+                email=case_litigant.litigant.email,
+                phone=case_litigant.litigant.phone,
+                is_our_client=case_litigant.is_our_client,
+            )
+            for case_litigant in case.case_litigants.all()
+        ),
+    )
+
+
+def get_case_context(case_id: int) -> CaseContext | None:
+    """
+    Returns the snapshot of the case, from the cache if its data has not changed since.
+
+    Args:
+        case_id (int): The ID of the case.
+
+    Returns:
+        CaseContext | None: The snapshot. None if the case does not exist.
+    """
+    # the version is read before the case, so that a snapshot of older data is never cached under a newer version
+    key = f"case_context:{case_id}:{get_case_data_version(case_id)}"
+    case_context = django_cache.get(key)
+    if case_context is None:
+        case_context = _build_case_context(case_id)
+        if case_context is not None:
+            django_cache.set(key, case_context, timeout=CASE_CONTEXT_CACHE_TIMEOUT)
+
+    return case_context
@@ -0,0 +1,85 @@
+import logging
+
+from django.conf import settings
+from django.db.models import F
+from pgvector.django.functions import CosineDistance
+
+from core import metrics
+from poc.models import CachedAnswer
+from poc.utils import create_query_embedding
+
+__all__ = [
+    "get_cached_answer",
+    "set_cached_answer",
+]
+
+logger = logging.getLogger(__name__)
+
+# counters reported by the show_chat_stats command
+COUNTERS = [
+    "answer_cache.hits",
+    "answer_cache.misses",
+]
+
+
+def get_cached_answer(case_id: int, data_version: int, question: str) -> str | None:
+    """
+    Returns the cached answer to the most similar question asked about the case, if it is similar enough.
+
+    Args:
+        case_id (int): The ID of the case.
+        data_version (int): The current data version of the case. Answers of older versions are not reused.
+        question (str): The user's question.
+
+    Returns:
+        str | None: The cached answer, including its citations. None if there is no similar question.
+    """
+    max_distance = 1 - settings.CHAT_ANSWER_CACHE_SIMILARITY
+    cached_answer = (
+        CachedAnswer.objects.filter(case_id=case_id, data_version=data_version)
+        .annotate(
+            distance=CosineDistance("embedding", create_query_embedding(question))
+        )
+        .filter(distance__lte=max_distance)
+        .order_by("distance")
+        .first()
+    )
+
+    if cached_answer is None:
+        metrics.incr("answer_cache.misses")
+        return None
+
+    metrics.incr("answer_cache.hits")
+    CachedAnswer.objects.filter(id=cached_answer.id).update(hits=F("hits") + 1)
+    logger.info(
+        f"Answered from the cache for case {case_id}: {question!r} ~ {cached_answer.question!r}"
+    )
+    return cached_answer.answer
+
+
+def set_cached_answer(
+    case_id: int, data_version: int, question: str, answer: str
+) -> CachedAnswer:
+    """
+    Caches the answer to a question asked about the case.
+
+    Args:
+        case_id (int): The ID of the case.
+        data_version (int): The data version of the case the answer was generated from.
+            Read before generating the answer, so that an answer generated while the data changed is never reused.
+        question (str): The user's question.
+        answer (str): The AI answer.
+
+    Returns:
+        CachedAnswer: The cached answer.
+    """
+    # the answers of the older data versions are never read again
+    CachedAnswer.objects.filter(case_id=case_id, data_version__lt=data_version).delete()
+
+    return CachedAnswer.objects.create(
+        case_id=case_id,
+        question=question,
+        embedding=create_query_embedding(question),
+        answer=answer,
+        data_version=data_version,
+    )
@@ -1,24 +1,79 @@
+import logging
+import queue
+import threading
+from collections.abc import Generator
+from datetime import timedelta
+from enum import Enum
+from functools import cache
+
 from django.conf import settings
-from langchain.agents import AgentExecutor
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
 from langchain.agents.format_scratchpad.openai_tools import (
     format_to_openai_tool_messages,
 )
 from langchain.agents.output_parsers.openai_tools import OpenAIToolsAgentOutputParser
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema import HumanMessage, SystemMessage
+from langchain.schema import HumanMessage
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.runnables import ConfigurableFieldSpec
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_openai import ChatOpenAI
 
-from poc.models import ChatMessage
+from core.rate_limit import get_http_client
+from core.tracing import Trace, span, trace
+from poc.models import ChatMessage, ChatTurnSpan
+from poc.utils import get_case_data_version
 
+from .answer_cache import get_cached_answer, set_cached_answer
 from .chat_history import DjangoChatMessageHistory
+from .executor import ConcurrentAgentExecutor
+from .retrieve_first import answer_with_retrieval
+from .streaming import QueueCallbackHandler, format_sse
 from .tools import cases, emails, files
+from .tools.base import use_case
+
+logger = logging.getLogger(__name__)
+
+llm = ChatOpenAI(
+    model="gpt-4o",
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    http_client=get_http_client(),
+)
+# emits tokens through the callback handlers as they are generated
+streaming_llm = ChatOpenAI(
+    model="gpt-4o",
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    http_client=get_http_client(),
+    streaming=True,
+    # the token usage is only reported in the last chunk of the stream, if requested
+    stream_usage=True,
+)
+
+# seconds to wait for an agent event before sending an SSE keep-alive comment
+STREAM_KEEPALIVE_INTERVAL = 15
 
-llm = ChatOpenAI(model="gpt-4o", api_key=settings.OPENAI_API_KEY)
+# seconds. the semantic searches call the embeddings API on a cache miss.
+# the other tools time out after settings.CHAT_TOOL_TIMEOUT.
+TOOL_TIMEOUTS = {
+    "semantic_file_search": 30,
+    "semantic_email_search": 30,
+}
 
 
-def build_prompt(thread_id: str):
-    base_prompt = f"""You are an intelligent legal assistant helping lawyers
+class AnswerMode(str, Enum):
+    # tool-calling loop
+    agent = "agent"
+    # fixed retrieval up front and a single LLM call. falls back to the agent.
+    retrieve_first = "retrieve_first"
+
+
+def build_prompt():
+    # the thread ID is an input variable, so that the prompt can be reused across threads
+    base_prompt = """You are an intelligent legal assistant helping lawyers
 recognize patterns and uncover insights from legal documents.
 
 Case thread ID: {thread_id}
@@ -45,14 +100,16 @@ Instructions:
     return ChatPromptTemplate.from_messages(
         [
             MessagesPlaceholder("chat_history"),
-            SystemMessage(content=base_prompt),
+            ("system", base_prompt),
             HumanMessage(content="{input}"),
             MessagesPlaceholder("agent_scratchpad"),  # tool call reasoning
         ]
     )
 
 
+@cache
 def get_tools():
+    # tools are stateless. instantiated once per process.
     return [
         cases.CaseDetails(),
         files.SemanticFileSearch(),
@@ -70,10 +127,16 @@ def get_history(session_id: str):
     return DjangoChatMessageHistory(thread_id=int(session_id))
 
 
+def _use_history(history: BaseChatMessageHistory) -> BaseChatMessageHistory:
+    # the history object is created once per turn by the caller and passed via config
+    return history
+
+
 def build_agent(llm, tools, prompt):
     return (
         {
             "input": lambda x: x["input"],
+            "thread_id": lambda x: x["thread_id"],
             "chat_history": lambda x: x.get("chat_history", []),
             "agent_scratchpad": lambda x: format_to_openai_tool_messages(
                 x["intermediate_steps"]
@@ -85,49 +148,202 @@ def build_agent(llm, tools, prompt):
     )
 
 
-def get_agent_with_history(thread_id: int):
-    prompt = build_prompt(thread_id)
+@cache
+def get_agent_with_history(streaming: bool = False):
+    """
+    Returns the agent executor wrapped with message history.
+    Nothing in the pipeline is specific to a chat thread, so it is compiled once per process and reused.
+    The thread ID and the history object are passed when invoking. See invoke_agent.
+    """
+    prompt = build_prompt()
     tools = get_tools()
 
-    agent = build_agent(llm, tools, prompt)
+    agent = build_agent(streaming_llm if streaming else llm, tools, prompt)
 
-    executor = AgentExecutor(
+    # runs the tool calls of a step concurrently
+    executor = ConcurrentAgentExecutor(
         agent=agent,
         tools=tools,
+        tool_timeouts=TOOL_TIMEOUTS,
         verbose=False,
     )
 
     agent_with_history = RunnableWithMessageHistory(
         executor,
-        get_history,
+        _use_history,
         input_messages_key="input",
         history_messages_key="chat_history",
+        history_factory_config=[
+            ConfigurableFieldSpec(
+                id="history",
+                annotation=BaseChatMessageHistory,
+                name="History",
+                description="Message history of the chat thread.",
+                default=None,
+                is_shared=True,
+            ),
+        ],
     )
 
     return agent_with_history
 
 
-def send_message(thread_id: int, user_input: str) -> list[ChatMessage]:
+def invoke_agent(
+    history: DjangoChatMessageHistory,
+    user_input: str,
+    streaming: bool = False,
+    callbacks: list | None = None,
+) -> dict:
+    """
+    Run the agent for a single turn of the chat thread.
+
+    Args:
+        history (DjangoChatMessageHistory): The history of the chat thread. Reused for the whole turn.
+        user_input (str): The user message.
+        streaming (bool): Whether to stream the tokens through the callbacks.
+        callbacks (list | None): Callback handlers for this turn.
+
+    Returns:
+        dict: The agent's result. The response is in the "output" key.
+    """
+    config = {"configurable": {"history": history}}
+    if callbacks:
+        config["callbacks"] = callbacks
+
+    # the tools search, and cache their results, within the thread's case
+    with use_case(history.thread.case_id):
+        return get_agent_with_history(streaming=streaming).invoke(
+            {"input": user_input, "thread_id": history.thread.id},
+            config=config,
+        )
+
+
+def _is_standalone_question(history: DjangoChatMessageHistory) -> bool:
+    # the first question of a thread does not depend on earlier answers
+    return not history.thread.messages.filter(role=ChatMessage.Role.AI).exists()
+
+
+def answer_turn(
+    history: DjangoChatMessageHistory,
+    user_input: str,
+    mode: AnswerMode | None = None,
+    use_cache: bool = True,
+    callbacks: list | None = None,
+) -> str:
+    """
+    Answer a single turn of the chat thread.
+
+    Args:
+        history (DjangoChatMessageHistory): The history of the chat thread. Must include the user message.
+        user_input (str): The user message.
+        mode (AnswerMode | None): How to answer the turn. Defaults to settings.CHAT_ANSWER_MODE.
+        use_cache (bool): Whether to reuse the answer to a similar question asked about the case.
+            Also requires settings.CHAT_ANSWER_CACHE_ENABLED.
+        callbacks (list | None): Callback handlers for this turn. If given, the agent streams its tokens through them.
+
+    Returns:
+        str: The AI response.
+    """
+    case_id = history.thread.case_id
+    use_cache = (
+        use_cache
+        and settings.CHAT_ANSWER_CACHE_ENABLED
+        and case_id is not None
+        and _is_standalone_question(history)
+    )
+
+    if not use_cache:
+        return _generate_answer(history, user_input, mode, callbacks)
+
+    # read before generating the answer. see set_cached_answer
+    data_version = get_case_data_version(case_id)
+    with span("cache", "answer_cache"):
+        output = get_cached_answer(case_id, data_version, user_input)
+    if output is not None:
+        return output
+
+    output = _generate_answer(history, user_input, mode, callbacks)
+    set_cached_answer(case_id, data_version, user_input, output)
+    return output
+
+
+def _generate_answer(
+    history: DjangoChatMessageHistory,
+    user_input: str,
+    mode: AnswerMode | None,
+    callbacks: list | None = None,
+) -> str:
+    mode = AnswerMode(mode or settings.CHAT_ANSWER_MODE)
+
+    if mode == AnswerMode.retrieve_first:
+        output = answer_with_retrieval(history, user_input)
+        if output is not None:
+            return output
+
+        logger.info(
+            f"Retrieved context was not enough for chat thread {history.thread.id}. Falling back to the agent."
+        )
+
+    return invoke_agent(
+        history, user_input, streaming=callbacks is not None, callbacks=callbacks
+    )["output"]
+
+
+def _answer_traced_turn(
+    history: DjangoChatMessageHistory, user_input: str, **kwargs
+) -> tuple[str, Trace]:
+    # the turn itself is the last span of the trace
+    with trace() as turn_trace, span("turn", "answer_turn"):
+        output = answer_turn(history, user_input, **kwargs)
+
+    return output, turn_trace
+
+
+def _save_spans(turn_trace: Trace, ai_message: ChatMessage):
+    """Persist the latency breakdown of the turn along with its AI message."""
+    ChatTurnSpan.objects.bulk_create(
+        ChatTurnSpan(
+            ai_message=ai_message,
+            kind=turn_span.kind,
+            name=turn_span.name[:100],
+            start_ms=round(turn_span.start_ms),
+            duration_ms=round(turn_span.duration_ms),
+            input_tokens=turn_span.input_tokens,
+            output_tokens=turn_span.output_tokens,
+            rows=turn_span.rows,
+            error=turn_span.error,
+        )
+        for turn_span in turn_trace.spans
+    )
+
+
+def send_message(
+    thread_id: int,
+    user_input: str,
+    mode: AnswerMode | None = None,
+    use_cache: bool = True,
+) -> list[ChatMessage]:
     """
     Send a message to a specific chat thread and return the AI response.
 
     Args:
         thread_id (int): The ID of the chat thread.
         user_input (str): The user message to send.
+        mode (AnswerMode | None): How to answer the message. Defaults to settings.CHAT_ANSWER_MODE.
+        use_cache (bool): Whether to reuse the answer to a similar question asked about the case.
 
     Returns:
         list[ChatMessage]: The saved Human message and its AI response.
     """
 
-    config = {"configurable": {"session_id": str(thread_id)}}
-
     # ? Why are we saving the messages manually?
     # Generally, we don't need to manually call the add_user_message and add_ai_message methods,
     # as the RunnableWithMessageHistory object will handle this automatically.
     # However, to reliably return the newly created human and ai messages,
     # we use the persist_user_message and persist_ai_message methods.
 
-    # fetch the history object for this session
+    # fetch the history object for this session.
+    # the same object is used by the agent for this turn.
     history = get_history(str(thread_id))
 
     # add the user’s message
@@ -135,14 +351,148 @@ def send_message(thread_id: int, user_input: str) -> list[ChatMessage]:
     # so using the persist_user_message method directly
     user_message = history.persist_user_message(user_input)
 
-    result = get_agent_with_history(thread_id).invoke(
-        {"input": user_input},
-        config=config,
+    output, turn_trace = _answer_traced_turn(
+        history, user_input, mode=mode, use_cache=use_cache
     )
 
     # add the AI response
     # the built-in add_ai_message returns None.
     # so using the persist_ai_message method directly
-    ai_message = history.persist_ai_message(result["output"])
+    ai_message = history.persist_ai_message(output, reply_to=user_message)
+    _save_spans(turn_trace, ai_message)
 
     return [user_message, ai_message]
+
+
+def stream_message(thread_id: int, user_input: str) -> Generator[str, None, None]:
+    """
+    Send a message to a specific chat thread and stream the AI response as Server-Sent Events.
+
+    The turn is answered like in send_message, in a separate thread. The agent pushes its tokens and tool calls
+    on to a queue, which is drained by this generator. A cached or retrieve-first answer is not generated
+    token by token, and is sent as a single token event. The AI message is persisted by the agent thread,
+    so the response is saved even if the client disconnects midway.
+
+    Args:
+        thread_id (int): The ID of the chat thread.
+        user_input (str): The user message to send.
+
+    Yields:
+        str: SSE encoded events - user_message, token, tool_start, tool_end, done and error.
+    """
+
+    history = get_history(str(thread_id))
+    user_message = history.persist_user_message(user_input)
+    yield format_sse("user_message", {"id": user_message.id})
+
+    events = queue.Queue()
+
+    def _run_agent():
+        try:
+            handler = QueueCallbackHandler(events)
+            output, turn_trace = _answer_traced_turn(
+                history, user_input, callbacks=[handler]
+            )
+            if not handler.streamed_tokens:
+                events.put(("token", {"content": output}))
+
+            ai_message = history.persist_ai_message(output, reply_to=user_message)
+            _save_spans(turn_trace, ai_message)
+            events.put(
+                (
+                    "done",
+                    {
+                        "user_message_id": user_message.id,
+                        "ai_message_id": ai_message.id,
+                    },
+                )
+            )
+        except Exception as e:
+            logger.exception(f"Error streaming response for chat thread {thread_id}")
+            events.put(("error", {"detail": str(e)}))
+        finally:
+            # the agent thread opens its own database connection
+            connection.close()
+
+    threading.Thread(target=_run_agent, daemon=True).start()
+
+    while True:
+        try:
+            event, data = events.get(timeout=STREAM_KEEPALIVE_INTERVAL)
+        except queue.Empty:
+            # SSE comment. keeps proxies from closing an idle connection.
+            yield ": keep-alive\n\n"
+            continue
+
+        yield format_sse(event, data)
+
+        if event in ("done", "error"):
+            break
+
+
+def answer_pending_messages(
+    thread_id: int, stale_after: int | None = None
+) -> list[ChatMessage]:
+    """
+    Answer the pending user messages of a chat thread in the order they were posted.
+    Used by the async mode, where user messages are persisted by the API and answered by a celery worker.
+    The caller must ensure that only one worker answers a thread at a time.
+
+    Args:
+        thread_id (int): The ID of the chat thread.
+        stale_after (int | None): Seconds after which a message still processing is answered again,
+            e.g. when the worker answering it died. By default, only pending messages are answered.
+
+    Returns:
+        list[ChatMessage]: The saved AI responses.
+    """
+
+    history = get_history(str(thread_id))
+    ai_messages = []
+
+    # ? Why a loop?
+    # Messages posted while a turn is running are picked up by the worker holding the thread,
+    # so that the messages of a thread are always answered in order.
+    while True:
+        unanswered = Q(status=ChatMessage.Status.PENDING)
+        if stale_after is not None:
+            unanswered |= Q(
+                status=ChatMessage.Status.PROCESSING,
+                updated_at__lt=timezone.now() - timedelta(seconds=stale_after),
+            )
+
+        user_message = (
+            ChatMessage.objects.filter(
+                unanswered, thread_id=thread_id, role=ChatMessage.Role.USER
+            )
+            .order_by("id")
+            .first()
+        )
+        if user_message is None:
+            break
+
+        if user_message.status == ChatMessage.Status.PROCESSING:
+            logger.warning(
+                f"Answering chat message {user_message.id} of thread {thread_id} again. "
+                "Its previous worker did not finish it."
+            )
+            # claimed again, so that it is not stale while being answered
+            user_message.save(update_fields=["updated_at"])
+        else:
+            user_message.mark_as_processing()
+
+        try:
+            output, turn_trace = _answer_traced_turn(history, user_message.content)
+        except Exception as e:
+            logger.exception(
+                f"Error answering chat message {user_message.id} of thread {thread_id}"
+            )
+            user_message.mark_as_failed(error_message=str(e))
+            continue
+
+        ai_message = history.persist_ai_message(output, reply_to=user_message)
+        _save_spans(turn_trace, ai_message)
+        ai_messages.append(ai_message)
+        user_message.mark_as_completed()
+
+    return ai_messages
@@ -1,33 +1,197 @@
+import logging
+
+from django.conf import settings
+from django.dispatch import Signal
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
 
+from core import metrics
+from core.rate_limit import get_http_client
+from core.tracing import span
 from poc.models import ChatMessage, ChatThread
+from poc.utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# sent, with the thread_id, when an AI message pushes older messages out of the token budget.
+# the receiver folds them into the thread's summary. see poc.signals
+history_over_budget = Signal()
+
+summary_llm = ChatOpenAI(
+    model="gpt-4o-mini",
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    http_client=get_http_client(),
+)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a lawyer and a legal assistant about a case.
+Update the existing summary with the new messages.
+Keep the facts, dates, names, figures and the sources cited. Drop greetings and repetition.
+Write at most 250 words.
+
+Existing summary:
+{summary}
+
+New messages:
+{messages}
+"""
+
+# counters reported by the show_chat_stats command
+COUNTERS = [
+    "chat_history.turns",
+    "chat_history.tokens_replayed",
+    "chat_history.tokens_saved",
+    "chat_history.messages_summarized",
+]
 
 
 class DjangoChatMessageHistory(BaseChatMessageHistory):
-    def __init__(self, thread_id: int, max_turns: int = 10):
+    def __init__(
+        self, thread_id: int, max_turns: int = 10, token_budget: int | None = None
+    ):
         self.thread = ChatThread.objects.get(pk=thread_id)
         self.max_turns = max_turns
+        self.token_budget = token_budget or settings.CHAT_HISTORY_TOKEN_BUDGET
+        # the messages, and their token counts, loaded for the current turn
+        self._loaded = None
+
+    def _get_conversation(self):
+        # messages queued in async mode are not part of the conversation yet
+        return self.thread.messages.exclude(
+            status__in=[ChatMessage.Status.PENDING, ChatMessage.Status.FAILED]
+        )
+
+    def _split_by_budget(self, msgs: list[ChatMessage], token_counts: list[int]) -> int:
+        """Returns the number of messages (from the newest) that fit in the token budget.
+
+        Args:
+            msgs (list[ChatMessage]): Messages in reverse chronological order.
+            token_counts (list[int]): Token count of each message.
+
+        Returns:
+            int: The number of messages to replay verbatim. The newest message is always included.
+        """
+        total = 0
+        for idx, msg in enumerate(msgs):
+            if (
+                self.thread.summarized_until_id
+                and msg.id <= self.thread.summarized_until_id
+            ):
+                # already folded into the summary
+                return idx
+
+            if idx > 0 and total + token_counts[idx] > self.token_budget:
+                return idx
+
+            total += token_counts[idx]
+
+        return len(msgs)
 
     @property
     def messages(self):
-        msgs = (
-            self.thread.messages.order_by("-created_at")[: self.max_turns * 2]
-            .select_related("thread")
-            .all()
-        )
+        with span("history", "load") as extra:
+            msgs = list(
+                self._get_conversation()
+                .order_by("-created_at")[: self.max_turns * 2]
+                .select_related("thread")
+            )
+            extra["rows"] = len(msgs)
 
-        msgs = list(msgs)[::-1]  # reverse to chronological order
+        token_counts = [count_tokens(msg.content) for msg in msgs]
+        recent_count = self._split_by_budget(msgs, token_counts)
+        self._loaded = msgs, token_counts
 
         formatted = []
-        for msg in msgs:
+        if self.thread.summary:
+            formatted.append(
+                SystemMessage(
+                    content=f"Summary of the earlier conversation:\n{self.thread.summary}"
+                )
+            )
+
+        for msg in msgs[:recent_count][::-1]:  # reverse to chronological order
             if msg.role == ChatMessage.Role.USER:
                 formatted.append(HumanMessage(content=msg.content))
             else:
                 formatted.append(AIMessage(content=msg.content))
 
+        # compared against replaying the last max_turns messages verbatim
+        replayed_tokens = sum(token_counts[:recent_count]) + count_tokens(
+            self.thread.summary
+        )
+        saved_tokens = max(sum(token_counts) - replayed_tokens, 0)
+        metrics.incr("chat_history.turns")
+        metrics.incr("chat_history.tokens_replayed", replayed_tokens)
+        metrics.incr("chat_history.tokens_saved", saved_tokens)
+        logger.debug(
+            f"Chat thread {self.thread.id}: replaying {recent_count} of {len(msgs)} messages, {replayed_tokens} tokens ({saved_tokens} saved)."
+        )
+
         return formatted
 
+    def _is_over_budget(self, ai_message: ChatMessage) -> bool:
+        """Whether fold_into_summary has messages to fold, once the AI message of the turn is added.
+        Reuses the messages loaded for the turn. False if the turn did not load them, e.g. a cached answer.
+        """
+        if self._loaded is None:
+            return False
+
+        msgs, token_counts = self._loaded
+        msgs = [ai_message, *msgs]
+        token_counts = [count_tokens(ai_message.content), *token_counts]
+        unsummarized_count = sum(
+            1
+            for msg in msgs
+            if not self.thread.summarized_until_id
+            or msg.id > self.thread.summarized_until_id
+        )
+        recent_count = min(
+            self._split_by_budget(msgs, token_counts), self.max_turns * 2
+        )
+        return recent_count < unsummarized_count
+
+    def fold_into_summary(self) -> int:
+        """
+        Folds the messages that no longer fit in the token budget into the thread's rolling summary.
+        Only the messages since the last fold are sent to the LLM, along with the existing summary.
+
+        Returns:
+            int: The number of messages folded into the summary.
+        """
+        queryset = self._get_conversation().order_by("-created_at")
+        if self.thread.summarized_until_id:
+            queryset = queryset.filter(id__gt=self.thread.summarized_until_id)
+
+        # ? Why the limit?
+        # Threads that predate summaries may have hundreds of messages. Only the recent ones are folded.
+        msgs = list(queryset[: self.max_turns * 4])
+        token_counts = [count_tokens(msg.content) for msg in msgs]
+        recent_count = min(
+            self._split_by_budget(msgs, token_counts), self.max_turns * 2
+        )
+
+        to_fold = msgs[recent_count:][::-1]  # chronological order
+        if not to_fold:
+            return 0
+
+        transcript = "\n\n".join(
+            f"{'User' if msg.role == ChatMessage.Role.USER else 'Assistant'}: {msg.content}"
+            for msg in to_fold
+        )
+        response = summary_llm.invoke(
+            SUMMARY_PROMPT.format(
+                summary=self.thread.summary or "(none)", messages=transcript
+            )
+        )
+
+        self.thread.summary = response.content
+        self.thread.summarized_until = to_fold[-1]
+        self.thread.save(update_fields=["summary", "summarized_until", "updated_at"])
+
+        metrics.incr("chat_history.messages_summarized", len(to_fold))
+        return len(to_fold)
+
     def persist_user_message(self, message: str) -> ChatMessage:
         """
         Persist a user message and return the created ChatMessage instance.
@@ -37,15 +201,25 @@ class DjangoChatMessageHistory(BaseChatMessageHistory):
             thread=self.thread, role=ChatMessage.Role.USER, content=message
         )
 
-    def persist_ai_message(self, message: str) -> ChatMessage:
+    def persist_ai_message(
+        self, message: str, reply_to: ChatMessage | None = None
+    ) -> ChatMessage:
         """
         Persist an AI message and return the created ChatMessage instance.
         Adding this extra method to NOT change the return type of add_ai_message.
         """
-        return ChatMessage.objects.create(
-            thread=self.thread, role=ChatMessage.Role.AI, content=message
+        ai_message = ChatMessage.objects.create(
+            thread=self.thread,
+            role=ChatMessage.Role.AI,
+            content=message,
+            reply_to=reply_to,
         )
 
+        if self._is_over_budget(ai_message):
+            history_over_budget.send(sender=self.__class__, thread_id=self.thread.id)
+
+        return ai_message
+
     def add_message(self, message) -> None:
         # if isinstance(message, HumanMessage):
         #     self.persist_user_message(message.content)
@@ -0,0 +1,141 @@
+import functools
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import close_old_connections
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentStep
+
+__all__ = [
+    "ConcurrentAgentExecutor",
+    "submit_to_tool_pool",
+]
+
+logger = logging.getLogger(__name__)
+
+# shared by all the agent turns of the process
+tool_pool = ThreadPoolExecutor(
+    max_workers=settings.CHAT_TOOL_MAX_WORKERS, thread_name_prefix="agent-tool"
+)
+
+
+def _run_in_pool_thread(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # the pool threads open their own database connections. closed as per CONN_MAX_AGE.
+        close_old_connections()
+
+
+def submit_to_tool_pool(func, *args, **kwargs) -> Future:
+    """
+    Run the function in the tool pool.
+    The function runs in a copy of the caller's context, which carries the case the turn is scoped to.
+    See tools.base.use_case.
+
+    Returns:
+        Future: The future of the function's result.
+    """
+    return tool_pool.submit(
+        copy_context().run, _run_in_pool_thread, func, *args, **kwargs
+    )
+
+
+class _ToolRun:
+    """Records when a tool call starts running in the pool, so that the time queued does not count against its timeout."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.started_at = 0.0
+
+    def __call__(self, perform_action: functools.partial) -> AgentStep:
+        self.started_at = time.monotonic()
+        self.started.set()
+        return perform_action()
+
+
+class ConcurrentAgentExecutor(AgentExecutor):
+    """
+    Agent executor that runs the tool calls of a step concurrently, instead of one after the other.
+    The wall time of a step is that of its slowest tool call, bound by the tool's timeout.
+
+    Overrides the private _perform_agent_action and _iter_next_step methods of AgentExecutor,
+    as of langchain 0.3 (pinned in requirements.in). See test_executor for a check of their signatures.
+    """
+
+    tool_timeouts: dict[str, float] = {}
+    """Timeout (in seconds) by tool name. The other tools time out after settings.CHAT_TOOL_TIMEOUT."""
+
+    def _perform_agent_action(self, *args, **kwargs):
+        # ? Why defer?
+        # AgentExecutor performs the actions of a step one by one, as it iterates over them.
+        # Deferring lets _iter_next_step collect all the actions of the step and run them together.
+        return functools.partial(super()._perform_agent_action, *args, **kwargs)
+
+    def _iter_next_step(self, *args, **kwargs) -> Iterator:
+        actions = []
+        deferred = []
+        for step in super()._iter_next_step(*args, **kwargs):
+            if isinstance(step, functools.partial):
+                deferred.append(step)
+                continue
+
+            if isinstance(step, AgentAction):
+                actions.append(step)
+
+            yield step
+
+        # a single tool call runs in the pool too, so that its timeout applies
+        yield from self._perform_concurrently(actions, deferred)
+
+    def _perform_concurrently(
+        self, actions: list[AgentAction], deferred: list[functools.partial]
+    ) -> Iterator[AgentStep]:
+        """
+        Run the deferred actions in the tool pool, and yield their steps in the order of the actions.
+
+        Args:
+            actions (list[AgentAction]): The actions of the step.
+            deferred (list[functools.partial]): The deferred tool calls of the actions, in the same order.
+
+        Yields:
+            AgentStep: The action and its observation. The observation of a timed out tool call is an error message.
+        """
+        runs = [_ToolRun() for _ in deferred]
+        futures = [
+            submit_to_tool_pool(run, perform_action)
+            for run, perform_action in zip(runs, deferred)
+        ]
+
+        for action, run, future in zip(actions, runs, futures):
+            timeout = self.tool_timeouts.get(action.tool, settings.CHAT_TOOL_TIMEOUT)
+            # the pool is shared by the turns of the process. a tool call may wait for a worker as long as its timeout.
+            if not run.started.wait(timeout) and future.cancel():
+                logger.warning(
+                    f"Tool {action.tool} did not start within {timeout}s. The tool pool is busy."
+                )
+                yield self._timed_out_step(action)
+                continue
+
+            # started, if the cancel failed
+            run.started.wait()
+            remaining = max(0, run.started_at + timeout - time.monotonic())
+            try:
+                yield future.result(timeout=remaining)
+            except FutureTimeoutError:
+                # ? Why not stop the tool call?
+                # A thread cannot be interrupted. It holds its pool worker until it completes, and its result is discarded.
+                logger.warning(f"Tool {action.tool} timed out after {timeout}s.")
+                yield self._timed_out_step(action)
+
+    def _timed_out_step(self, action: AgentAction) -> AgentStep:
+        return AgentStep(
+            action=action,
+            observation=f"The {action.tool} tool timed out. Answer without its results, or try again.",
+        )
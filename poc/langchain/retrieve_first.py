@@ -0,0 +1,197 @@
+import logging
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_openai import ChatOpenAI
+
+from core import metrics
+from core.rate_limit import get_http_client
+from poc.utils import get_encoding
+
+from .chat_history import DjangoChatMessageHistory
+from .executor import submit_to_tool_pool
+from .tools import cases, emails, files
+from .tools.base import use_case
+
+__all__ = [
+    "answer_with_retrieval",
+]
+
+logger = logging.getLogger(__name__)
+
+answer_llm = ChatOpenAI(
+    model="gpt-4o",
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    http_client=get_http_client(),
+)
+
+# counters reported by the show_chat_stats command
+COUNTERS = [
+    "retrieve_first.answers",
+    "retrieve_first.fallbacks",
+]
+
+# the model replies with this when the retrieved context is not enough to answer.
+# the turn is then answered by the agent, which can call the tools as it sees fit.
+FALLBACK_REPLY = "NEED_MORE_CONTEXT"
+
+# seconds. a retrieval that runs longer is left out of the context.
+RETRIEVAL_TIMEOUT = 30
+
+case_details_tool = cases.CaseDetails()
+semantic_file_search_tool = files.SemanticFileSearch()
+semantic_email_search_tool = emails.SemanticEmailSearch()
+
+
+def build_prompt():
+    system_prompt = """You are an intelligent legal assistant helping lawyers
+recognize patterns and uncover insights from legal documents.
+
+Answer the user's last message using only the case context below.
+The context was retrieved for the message from the case details, files and emails of the case.
+
+Instructions:
+- Use markdown formatting for your answers.
+- Use the dispute description only for context. Treat it as allegations and not facts.
+- Always use the "Content" of the context for facts, and include its "Source" as a citation.
+- For files, include the filename in the citation. Example: _Source: [filename.pdf](link-to-file)_.
+- For emails, include the subject, sender and sent date in the citation. Example: _Source: Email "Subject" dated 05 Oct 2023 from Sender_.
+- If the user question is unrelated to the case, politely inform them that you can only answer questions related to the case.
+- If multiple sources are used, include all of them.
+- Keep your answers brief, concise and to the point.
+- Never make up case details.
+- If the context is not enough to answer the question, reply only with {fallback_reply}
+
+Case context:
+{context}
+"""
+    # the user's message is the last message of the history
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            MessagesPlaceholder("chat_history"),
+        ]
+    )
+
+
+def _format_documents(documents: list) -> list[str]:
+    return [
+        f"Content:\n{document['content']}\nSource:\n" + "\n".join(document["source"])
+        for document in documents
+    ]
+
+
+def retrieve(thread_id: int, user_input: str) -> list[list[str]]:
+    """
+    Run the fixed retrieval plan concurrently: case details, and semantic search across files and emails.
+
+    Args:
+        thread_id (int): The ID of the chat thread.
+        user_input (str): The user message. Used as the search query.
+
+    Returns:
+        list[list[str]]: The formatted sections of each retrieval, in the order of relevance.
+    """
+    plan = [
+        (case_details_tool, {"thread_id": thread_id}),
+        (semantic_file_search_tool, {"query": user_input}),
+        (semantic_email_search_tool, {"query": user_input}),
+    ]
+
+    started_at = time.monotonic()
+    futures = [submit_to_tool_pool(tool.run, tool_input) for tool, tool_input in plan]
+
+    retrievals = []
+    for (tool, _), future in zip(plan, futures):
+        remaining = max(0, started_at + RETRIEVAL_TIMEOUT - time.monotonic())
+        try:
+            result = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            logger.warning(
+                f"Retrieval {tool.name} timed out after {RETRIEVAL_TIMEOUT}s."
+            )
+            continue
+        except Exception:
+            # the other retrievals may still be enough to answer. if not, the agent takes over.
+            logger.exception(f"Error in retrieval {tool.name}")
+            continue
+
+        retrievals.append(
+            [result] if isinstance(result, str) else _format_documents(result)
+        )
+
+    return retrievals
+
+
+def pack_context(retrievals: list[list[str]], token_budget: int) -> str:
+    """
+    Pack the retrieved sections into the token budget.
+    The retrievals take turns, so that the top results of each make it into the context.
+
+    Args:
+        retrievals (list[list[str]]): The formatted sections of each retrieval, in the order of relevance.
+        token_budget (int): Max. tokens of the context.
+
+    Returns:
+        str: The packed context. The section that crosses the budget is truncated.
+    """
+    encoding = get_encoding()
+    packed = []
+    remaining = token_budget
+
+    rank = 0
+    while remaining > 0 and any(rank < len(sections) for sections in retrievals):
+        for sections in retrievals:
+            if rank >= len(sections) or remaining <= 0:
+                continue
+
+            tokens = encoding.encode(sections[rank])
+            packed.append(encoding.decode(tokens[:remaining]))
+            remaining -= len(tokens)
+
+        rank += 1
+
+    return "\n---\n".join(packed)
+
+
+def answer_with_retrieval(
+    history: DjangoChatMessageHistory, user_input: str
+) -> str | None:
+    """
+    Answer a turn of the chat thread with a single LLM call, over a fixed retrieval done up front.
+    Saves the LLM round trips the agent spends deciding to call the same tools for most questions.
+
+    Args:
+        history (DjangoChatMessageHistory): The history of the chat thread. Must include the user message.
+        user_input (str): The user message.
+
+    Returns:
+        str | None: The AI response. None if the retrieved context was not enough to answer,
+            in which case the caller falls back to the agent.
+    """
+    thread = history.thread
+
+    # the tools search, and cache their results, within the thread's case
+    with use_case(thread.case_id):
+        retrievals = retrieve(thread.id, user_input)
+
+    context = pack_context(retrievals, settings.CHAT_CONTEXT_TOKEN_BUDGET)
+
+    chain = build_prompt() | answer_llm
+    response = chain.invoke(
+        {
+            "context": context,
+            "fallback_reply": FALLBACK_REPLY,
+            "chat_history": history.messages,
+        }
+    )
+
+    if FALLBACK_REPLY in response.content:
+        metrics.incr("retrieve_first.fallbacks")
+        return None
+
+    metrics.incr("retrieve_first.answers")
+    return response.content
@@ -0,0 +1,79 @@
+import json
+import queue
+import time
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+__all__ = [
+    "QueueCallbackHandler",
+    "format_sse",
+]
+
+
+def format_sse(event: str, data: dict) -> str:
+    """
+    Format a single Server-Sent Event.
+
+    Args:
+        event (str): The event name (token, tool_start, tool_end, done, etc.).
+        data (dict): The JSON serializable payload of the event.
+
+    Returns:
+        str: The event encoded as per the text/event-stream format.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class QueueCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler that pushes the agent's tokens and tool calls on to a queue.
+    The queue is drained by the HTTP response generator while the agent runs in a separate thread.
+    """
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+        self.streamed_tokens = 0
+        self._tool_runs: dict[UUID, tuple[str, float]] = {}
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        # tool-call chunks stream with empty content. skip them.
+        if token:
+            self.streamed_tokens += 1
+            self.events.put(("token", {"content": token}))
+
+    def on_tool_start(
+        self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs
+    ) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name", "")
+        self._tool_runs[run_id] = (name, time.perf_counter())
+        self.events.put(
+            ("tool_start", {"id": str(run_id), "name": name, "input": input_str})
+        )
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs) -> None:
+        name, started_at = self._tool_runs.pop(run_id, ("", time.perf_counter()))
+        self.events.put(
+            (
+                "tool_end",
+                {
+                    "id": str(run_id),
+                    "name": name,
+                    "duration_ms": round((time.perf_counter() - started_at) * 1000),
+                },
+            )
+        )
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        name, started_at = self._tool_runs.pop(run_id, ("", time.perf_counter()))
+        self.events.put(
+            (
+                "tool_end",
+                {
+                    "id": str(run_id),
+                    "name": name,
+                    "duration_ms": round((time.perf_counter() - started_at) * 1000),
+                    "error": str(error),
+                },
+            )
+        )
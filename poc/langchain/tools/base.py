@@ -0,0 +1,155 @@
+import functools
+import hashlib
+import inspect
+import json
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+from core import metrics
+from poc.utils import LRUCache, get_case_data_version, normalize_query
+
+__all__ = [
+    "cached_tool_result",
+    "filter_by_current_case",
+    "get_current_case_id",
+    "use_case",
+]
+
+# counters reported by the show_chat_stats command
+TOOL_CACHE_COUNTERS = [
+    "tool_cache.local_hits",
+    "tool_cache.redis_hits",
+    "tool_cache.misses",
+    "tool_cache.tool_ms",
+]
+
+# first level of the tool result cache. the second level is redis (the default cache).
+tool_result_lru = LRUCache(maxsize=256)
+# the entries of older data versions are never read again. let them expire.
+TOOL_RESULT_CACHE_TIMEOUT = 24 * 60 * 60  # 1 day
+
+# (case ID, data version) of the current agent turn. set by use_case.
+# context variables are copied into the threads langchain runs the pipeline steps in.
+_current_case: ContextVar[tuple[int, int] | None] = ContextVar(
+    "current_case", default=None
+)
+
+
+@contextmanager
+def use_case(case_id: int | None) -> Generator[None, None, None]:
+    """
+    Scope the tool calls of an agent turn to a case.
+    The case's data version is read once per turn, so that cache hits do not need a round trip to redis.
+
+    Args:
+        case_id (int | None): The ID of the chat thread's case. None if the thread has no case.
+    """
+    current = (case_id, get_case_data_version(case_id)) if case_id else None
+    token = _current_case.set(current)
+    try:
+        yield
+    finally:
+        _current_case.reset(token)
+
+
+def get_current_case_id() -> int | None:
+    """Returns the ID of the case the current agent turn is scoped to. See use_case."""
+    current = _current_case.get()
+    return current[0] if current else None
+
+
+def filter_by_current_case(queryset: QuerySet, case_lookup: str) -> QuerySet:
+    """
+    Filter the queryset by the case of the current agent turn, if any.
+
+    Args:
+        queryset (QuerySet): The queryset to filter.
+        case_lookup (str): The lookup of the case ID from the queryset's model. Example: "uploaded_file__case_id".
+
+    Returns:
+        QuerySet: The filtered queryset.
+    """
+    case_id = get_current_case_id()
+    if case_id is None:
+        return queryset
+
+    return queryset.filter(**{case_lookup: case_id})
+
+
+def _normalize_argument(value):
+    if isinstance(value, Enum):
+        return value.value
+
+    if isinstance(value, str):
+        # the tools search case-insensitively
+        return normalize_query(value)
+
+    return value
+
+
+def _get_key(tool_name: str, case_id: int, version: int, arguments: dict) -> str:
+    normalized = json.dumps(
+        {name: _normalize_argument(value) for name, value in arguments.items()},
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"tool_result:{case_id}:{version}:{tool_name}:{digest}"
+
+
+def cached_tool_result(func):
+    """
+    Decorator for the _run method of a tool.
+    Caches the result in-process, and in redis, by the case, the tool name and the normalized arguments.
+
+    The key includes the case's data version, which is bumped when the case's files, emails,
+    attachments or litigants change. So, the results never outlive the data they were fetched from.
+    Tool calls outside of an agent turn scoped to a case are not cached. See use_case.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        current = _current_case.get()
+        if current is None:
+            return func(self, *args, **kwargs)
+
+        case_id, version = current
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        arguments.pop("self")
+        key = _get_key(self.name, case_id, version, arguments)
+
+        result = tool_result_lru.get(key)
+        if result is not None:
+            # a round trip to redis would take longer than the hit itself
+            metrics.incr_local("tool_cache.local_hits")
+            return result
+
+        # the local hits are added to the shared counter along with the other counters
+        metrics.flush_local()
+        result = cache.get(key)
+        if result is not None:
+            metrics.incr("tool_cache.redis_hits")
+            tool_result_lru.set(key, result)
+            return result
+
+        started_at = time.perf_counter()
+        result = func(self, *args, **kwargs)
+        metrics.incr("tool_cache.misses")
+        metrics.incr(
+            "tool_cache.tool_ms", round((time.perf_counter() - started_at) * 1000)
+        )
+
+        cache.set(key, result, timeout=TOOL_RESULT_CACHE_TIMEOUT)
+        tool_result_lru.set(key, result)
+        return result
+
+    return wrapper
@@ -1,30 +1,32 @@
 from langchain_core.tools import BaseTool
 
-from poc.models import Case, ChatThread
+from poc.case_context import CaseContext, get_case_context
+from poc.models import ChatThread
+
+from .base import cached_tool_result
 
 __all__ = [
     "CaseDetails",
 ]
 
 
-def get_case_details(case: Case) -> str:
-    case_litigants = case.case_litigants.all()
+def get_case_details(case_context: CaseContext) -> str:
     litigant_details = ""
-    for litigant in case_litigants:
+    for litigant in case_context.litigants:
         our_client = "Yes" if litigant.is_our_client else "No"
         litigant_details += (
-            f"{litigant.role.name}\n"
-            f"Name: {litigant.litigant.name}\n"
-            f"Bio: {litigant.litigant.bio}\n"
-            f"Phone: {litigant.litigant.phone}\n"
-            f"Email: {litigant.litigant.email}\n"
+            f"{litigant.role}\n"
+            f"Name: {litigant.name}\n"
+            f"Bio: {litigant.bio}\n"
+            f"Phone: {litigant.phone}\n"
+            f"Email: {litigant.email}\n"
             f"Our Client: {our_client}\n"
             "---\n"
         )
 
     details = (
-        f"Case Number: {case.case_number}\n"
-        f"Title: {case.title}\n"
+        f"Case Number: {case_context.case_number}\n"
+        f"Title: {case_context.title}\n"
         f"Litigants:\n{litigant_details if litigant_details else 'No litigants found.'}\n"
         # f"Dispute/Allegations:\n{case.description}\n\n"
     )
@@ -36,13 +38,13 @@ class CaseDetails(BaseTool):
     name: str = "case_details"
     description: str = "Get case details by chat thread ID"
 
+    @cached_tool_result
     def _run(self, thread_id: int) -> str:
-        try:
-            thread = ChatThread.objects.get(id=thread_id)
-        except ChatThread.DoesNotExist:
+        thread = ChatThread.objects.filter(id=thread_id).values("case_id").first()
+        if thread is None:
             return "Chat thread not found."
 
-        if not thread.case:
+        if not thread["case_id"]:
             return "No case associated with this chat thread."
 
-        return get_case_details(thread.case)
+        return get_case_details(get_case_context(thread["case_id"]))
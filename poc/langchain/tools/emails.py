@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db.models import Q
 from django.utils.timezone import datetime
 from langchain.schema import Document
@@ -5,7 +6,10 @@ from langchain_core.tools import BaseTool
 from pgvector.django.functions import CosineDistance
 
 from poc.models import ParsedEmail, ParsedEmailEmbedding
-from poc.utils import create_vector_embedding
+from poc.utils import create_query_embedding
+
+from .base import cached_tool_result, filter_by_current_case
+from .rerank import RERANK_CANDIDATES, Candidate, rerank
 
 __all__ = [
     "SearchByDate",
@@ -16,18 +20,26 @@ __all__ = [
 ]
 
 
+def _get_case_emails():
+    return filter_by_current_case(ParsedEmail.objects.all(), "uploaded_file__case_id")
+
+
+def _get_source(email: ParsedEmail) -> tuple:
+    return (
+        "Type: Email",
+        f"Subject: {email.subject}\n"
+        f"From: {email.sender}\n"
+        f"To: {email.to_recipients}\n"
+        f"CC: {email.cc_recipients}\n"
+        f"Date: {email.sent_on}\n",
+    )
+
+
 def _get_results(emails: list[ParsedEmail]) -> list:
     results = []
     for email in emails:
         content = email.cleaned_body
-        source = (
-            "Type: Email",
-            f"Subject: {email.subject}\n"
-            f"From: {email.sender}\n"
-            f"To: {email.to_recipients}\n"
-            f"CC: {email.cc_recipients}\n"
-            f"Date: {email.sent_on}\n",
-        )
+        source = _get_source(email)
         results.append(
             {
                 "content": content,
@@ -46,6 +58,7 @@ class SearchByDate(BaseTool):
         " Returns the email content and metadata about the source."
     )
 
+    @cached_tool_result
     def _run(self, from_date: str, to_date: str) -> list[Document]:
         try:
             _from_date = datetime.strptime(from_date, "%Y-%m-%d").date()
@@ -53,9 +66,11 @@ class SearchByDate(BaseTool):
         except ValueError:
             return []
 
-        emails = ParsedEmail.objects.filter(
-            sent_on__date__range=(_from_date, _to_date)
-        ).order_by("-sent_on")
+        emails = (
+            _get_case_emails()
+            .filter(sent_on__date__range=(_from_date, _to_date))
+            .order_by("-sent_on")
+        )
         return _get_results(emails)
 
 
@@ -66,9 +81,10 @@ class SearchBySender(BaseTool):
         " Returns the email content and metadata about the source."
     )
 
+    @cached_tool_result
     def _run(self, sender: str) -> list[Document]:
-        emails = ParsedEmail.objects.filter(sender__icontains=sender).order_by(
-            "-sent_on"
+        emails = (
+            _get_case_emails().filter(sender__icontains=sender).order_by("-sent_on")
         )
         return _get_results(emails)
 
@@ -80,11 +96,16 @@ class SearchByRecipient(BaseTool):
         " Returns the email content and metadata about the source."
     )
 
+    @cached_tool_result
     def _run(self, recipient: str) -> list[Document]:
-        emails = ParsedEmail.objects.filter(
-            Q(to_recipients__icontains=recipient)
-            | Q(cc_recipients__icontains=recipient)
-        ).order_by("-sent_on")
+        emails = (
+            _get_case_emails()
+            .filter(
+                Q(to_recipients__icontains=recipient)
+                | Q(cc_recipients__icontains=recipient)
+            )
+            .order_by("-sent_on")
+        )
         return _get_results(emails)
 
 
@@ -95,10 +116,13 @@ class SearchBySubject(BaseTool):
         " Returns the email content and metadata about the source."
     )
 
+    @cached_tool_result
     def _run(self, subject_keywords: str) -> list[Document]:
-        emails = ParsedEmail.objects.filter(
-            subject__icontains=subject_keywords
-        ).order_by("-sent_on")
+        emails = (
+            _get_case_emails()
+            .filter(subject__icontains=subject_keywords)
+            .order_by("-sent_on")
+        )
         return _get_results(emails)
 
 
@@ -106,17 +130,38 @@ class SemanticEmailSearch(BaseTool):
     name: str = "semantic_email_search"
     description: str = (
         "Search emails using semantic search."
-        " Returns a list of relevant emails including metadata about the source."
+        " Returns a list of relevant email excerpts including metadata about the source."
     )
 
+    @cached_tool_result
     def _run(self, query: str, top_k: int = 5) -> list[Document]:
-        query_vector = create_vector_embedding([query])[0]["embedding"]
-        email_chunks = ParsedEmailEmbedding.objects.annotate(
-            distance=CosineDistance("embedding", query_vector)
-        ).order_by("distance")[:top_k]
-
-        # adding to a set to remove duplicates
-        email_set = {chunk.parsed_email for chunk in email_chunks}
-
-        emails = list(email_set)
-        return _get_results(emails)
+        query_vector = create_query_embedding(query)
+        # over-fetched and re-ranked locally. see SemanticFileSearch
+        email_chunks = (
+            filter_by_current_case(
+                ParsedEmailEmbedding.objects.all(),
+                "parsed_email__uploaded_file__case_id",
+            )
+            .select_related("parsed_email")
+            .defer("embedding")
+            .annotate(distance=CosineDistance("embedding", query_vector))
+            .order_by("distance")[:RERANK_CANDIDATES]
+        )
+        candidates = [
+            Candidate(
+                text=chunk.chunk,
+                distance=chunk.distance,
+                title=f"Email: {chunk.parsed_email.subject}",
+                source=_get_source(chunk.parsed_email),
+            )
+            for chunk in email_chunks
+        ]
+
+        snippets = rerank(query, candidates, top_k, settings.CHAT_SNIPPET_TOKEN_BUDGET)
+        return [
+            {
+                "content": f"{snippet.candidate.title}\nExcerpt:\n{snippet.text}",
+                "source": snippet.candidate.source,
+            }
+            for snippet in snippets
+        ]
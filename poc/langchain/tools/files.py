@@ -1,5 +1,6 @@
 from enum import Enum
 
+from django.conf import settings
 from django.db.models import Q
 from langchain.schema import Document
 from langchain_core.tools import BaseTool
@@ -12,7 +13,10 @@ from poc.models import (
     UploadedFile,
     UploadedFileEmbedding,
 )
-from poc.utils import create_vector_embedding
+from poc.utils import create_query_embedding
+
+from .base import cached_tool_result, filter_by_current_case
+from .rerank import RERANK_CANDIDATES, Candidate, rerank
 
 __all__ = [
     "SearchByFilename",
@@ -21,6 +25,33 @@ __all__ = [
 ]
 
 
+def _get_case_files():
+    return filter_by_current_case(UploadedFile.objects.all(), "case_id")
+
+
+def _get_case_attachments():
+    return filter_by_current_case(
+        ParsedEmailAttachment.objects.all(), "parsed_email__uploaded_file__case_id"
+    )
+
+
+def _get_uploaded_file_source(uploaded_file: UploadedFile) -> tuple:
+    return (
+        "Type: Uploaded File",
+        f"Filename: {uploaded_file.file.name}\nFile path: {uploaded_file.file.path}\n",
+    )
+
+
+def _get_email_attachment_source(attachment: ParsedEmailAttachment) -> tuple:
+    return (
+        "Type: Email attachment",
+        f"Filename: {attachment.filename}\n"
+        f"Email Subject: {attachment.parsed_email.subject}\n"
+        f"Email From: {attachment.parsed_email.sender}\n"
+        f"Email Sent on: {attachment.parsed_email.sent_on}\n",
+    )
+
+
 def _transform_uploaded_files(uploaded_files: list[UploadedFile]) -> list:
     """
     Transform a list of UploadedFile objects into a list of Document objects.
@@ -32,11 +63,7 @@ def _transform_uploaded_files(uploaded_files: list[UploadedFile]) -> list:
         for embedding in embeddings:
             content += f"{embedding.chunk}\n"
 
-        source = (
-            "Type: Uploaded File",
-            f"Filename: {uploaded_file.file.name}\n"
-            f"File path: {uploaded_file.file.path}\n",
-        )
+        source = _get_uploaded_file_source(uploaded_file)
         documents.append(
             {
                 "content": content,
@@ -60,13 +87,7 @@ def _transform_email_attachments(
         for embedding in embeddings:
             content += f"{embedding.chunk}\n"
 
-        source = (
-            "Type: Email attachment",
-            f"Filename: {attachment.filename}\n"
-            f"Email Subject: {attachment.parsed_email.subject}\n"
-            f"Email From: {attachment.parsed_email.sender}\n"
-            f"Email Sent on: {attachment.parsed_email.sent_on}\n",
-        )
+        source = _get_email_attachment_source(attachment)
 
         documents.append(
             {
@@ -82,6 +103,7 @@ class SearchByFilename(BaseTool):
     name: str = "search_file_by_name"
     description: str = "Search for a file by its name. Returns a list of file content and metadata about the source."
 
+    @cached_tool_result
     def _run(self, filename: str) -> list[Document]:
         words = filename.split(" ")
 
@@ -91,10 +113,10 @@ class SearchByFilename(BaseTool):
 
         results = []
 
-        uploaded_files = UploadedFile.objects.filter(query)
+        uploaded_files = _get_case_files().filter(query)
         results.extend(_transform_uploaded_files(uploaded_files))
 
-        email_attachments = ParsedEmailAttachment.objects.filter(query)
+        email_attachments = _get_case_attachments().filter(query)
         results.extend(_transform_email_attachments(email_attachments))
 
         return results
@@ -116,6 +138,7 @@ class SearchByFileType(BaseTool):
     description: str = "Search for files by their type (document, spreadsheet, presentation, email). Returns a list of file content and metadata about the source."
     args_schema: type[BaseModel] = FileTypeInput
 
+    @cached_tool_result
     def _run(self, file_type: FileType) -> list[Document]:
         content_types = []
         extensions = []
@@ -153,11 +176,11 @@ class SearchByFileType(BaseTool):
             for ext in extensions:
                 uf_query |= Q(file__iendswith=ext)
 
-            uploaded_files = UploadedFile.objects.filter(uf_query)
+            uploaded_files = _get_case_files().filter(uf_query)
             results.extend(_transform_uploaded_files(uploaded_files))
 
         if content_types:
-            email_attachments = ParsedEmailAttachment.objects.filter(
+            email_attachments = _get_case_attachments().filter(
                 content_type__in=content_types
             )
             results.extend(_transform_email_attachments(email_attachments))
@@ -167,29 +190,59 @@ class SearchByFileType(BaseTool):
 
 class SemanticFileSearch(BaseTool):
     name: str = "semantic_file_search"
-    description: str = "Search case files using semantic search. Returns a list of relevant documents including metadata about the source."
+    description: str = "Search case files using semantic search. Returns a list of relevant excerpts including metadata about the source."
 
+    @cached_tool_result
     def _run(self, query: str, top_k: int = 5) -> list[Document]:
-        query = create_vector_embedding([query])[0]["embedding"]
-        docs = []
-
-        file_chunks = UploadedFileEmbedding.objects.annotate(
-            distance=CosineDistance("embedding", query)
-        ).order_by("distance")[:top_k]
-
-        # adding to a set to remove duplicates
-        uploaded_files_set = {chunk.uploaded_file for chunk in file_chunks}
-        uploaded_files = list(uploaded_files_set)
-        docs.extend(_transform_uploaded_files(uploaded_files))
-
-        attachment_chunks = ParsedEmailAttachmentEmbedding.objects.annotate(
-            distance=CosineDistance("embedding", query)
-        ).order_by("distance")[:top_k]
+        query_vector = create_query_embedding(query)
+
+        # ? Why over-fetch?
+        # The nearest chunks by vector distance are not always the most relevant.
+        # The candidates are re-ranked locally, and only their best snippets are returned.
+        file_chunks = (
+            filter_by_current_case(
+                UploadedFileEmbedding.objects.all(), "uploaded_file__case_id"
+            )
+            .select_related("uploaded_file")
+            .defer("embedding")
+            .annotate(distance=CosineDistance("embedding", query_vector))
+            .order_by("distance")[:RERANK_CANDIDATES]
+        )
+        candidates = [
+            Candidate(
+                text=chunk.chunk,
+                distance=chunk.distance,
+                title=f"File: {chunk.uploaded_file.file.name}",
+                source=_get_uploaded_file_source(chunk.uploaded_file),
+            )
+            for chunk in file_chunks
+        ]
 
-        email_attachments_set = {
-            chunk.parsed_email_attachment for chunk in attachment_chunks
-        }
-        email_attachments = list(email_attachments_set)
-        docs.extend(_transform_email_attachments(email_attachments))
+        attachment_chunks = (
+            filter_by_current_case(
+                ParsedEmailAttachmentEmbedding.objects.all(),
+                "parsed_email_attachment__parsed_email__uploaded_file__case_id",
+            )
+            .select_related("parsed_email_attachment__parsed_email")
+            .defer("embedding")
+            .annotate(distance=CosineDistance("embedding", query_vector))
+            .order_by("distance")[:RERANK_CANDIDATES]
+        )
+        candidates.extend(
+            Candidate(
+                text=chunk.chunk,
+                distance=chunk.distance,
+                title=f"Filename: {chunk.parsed_email_attachment.filename}",
+                source=_get_email_attachment_source(chunk.parsed_email_attachment),
+            )
+            for chunk in attachment_chunks
+        )
 
-        return docs
+        snippets = rerank(query, candidates, top_k, settings.CHAT_SNIPPET_TOKEN_BUDGET)
+        return [
+            {
+                "content": f"{snippet.candidate.title}\nExcerpt:\n{snippet.text}",
+                "source": snippet.candidate.source,
+            }
+            for snippet in snippets
+        ]
@@ -0,0 +1,174 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from poc.utils import get_encoding
+
+__all__ = [
+    "Candidate",
+    "Snippet",
+    "rerank",
+]
+
+# chunks fetched by vector search for re-ranking. only the best snippets are passed on to the LLM.
+RERANK_CANDIDATES = 50
+# weight of the lexical score. the rest is the vector similarity of the snippet's chunk.
+LEXICAL_WEIGHT = 0.5
+# max. words of a snippet. a chunk is split into snippets on paragraph boundaries.
+SNIPPET_MAX_WORDS = 150
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+TERM_RE = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "as", "at", "be", "by", "did",
+    "do", "does", "for", "from", "had", "has", "have", "how", "i", "in", "is", "it",
+    "its", "me", "of", "on", "or", "that", "the", "their", "there", "this", "to",
+    "was", "were", "what", "when", "where", "which", "who", "why", "with",
+}  # fmt: skip
+
+
+@dataclass
+class Candidate:
+    """A chunk fetched by vector search."""
+
+    text: str
+    distance: float  # cosine distance from the query
+    title: str  # prefixed to the snippets. example: "File: notice.pdf"
+    source: tuple  # see the "source" of the tool results
+
+
+@dataclass
+class Snippet:
+    """A passage of a candidate chunk, with its re-ranking score."""
+
+    text: str
+    score: float
+    candidate: Candidate
+
+
+def get_terms(text: str) -> list[str]:
+    """Returns the lowercase words of the text, excluding the stopwords."""
+    return [term for term in TERM_RE.findall(text.lower()) if term not in STOPWORDS]
+
+
+def split_snippets(text: str, max_words: int = SNIPPET_MAX_WORDS) -> list[str]:
+    """
+    Split the text into snippets of up to max_words words.
+    Consecutive paragraphs are kept together while they fit. Longer paragraphs are split by words.
+
+    Args:
+        text (str): The text to split.
+        max_words (int, optional): Max. words of a snippet. Defaults to SNIPPET_MAX_WORDS.
+
+    Returns:
+        list[str]: The snippets.
+    """
+    snippets = []
+    current = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        if not words:
+            continue
+
+        if len(current) + len(words) > max_words and current:
+            snippets.append(" ".join(current))
+            current = []
+
+        while len(words) > max_words:
+            snippets.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+
+        current.extend(words)
+
+    if current:
+        snippets.append(" ".join(current))
+
+    return snippets
+
+
+def _bm25_scores(query_terms: list[str], documents: list[list[str]]) -> list[float]:
+    # the candidate snippets are the corpus
+    doc_count = len(documents)
+    avg_length = sum(len(terms) for terms in documents) / doc_count or 1
+    document_frequency = Counter(
+        term for terms in documents for term in set(terms) if term in query_terms
+    )
+
+    scores = []
+    for terms in documents:
+        term_frequency = Counter(terms)
+        score = 0.0
+        for term in set(query_terms):
+            tf = term_frequency.get(term, 0)
+            if not tf:
+                continue
+
+            df = document_frequency[term]
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            score += (
+                idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(terms) / avg_length))
+            )
+
+        scores.append(score)
+
+    return scores
+
+
+def rerank(
+    query: str, candidates: list[Candidate], top_k: int, token_budget: int
+) -> list[Snippet]:
+    """
+    Re-rank the snippets of the candidate chunks by their lexical overlap with the query (BM25),
+    and the vector similarity of their chunk. Runs locally on the CPU.
+
+    Args:
+        query (str): The search query.
+        candidates (list[Candidate]): The chunks fetched by vector search.
+        top_k (int): Max. snippets to return.
+        token_budget (int): Max. tokens of the returned snippets, including their titles.
+
+    Returns:
+        list[Snippet]: The best snippets, best first.
+    """
+    snippets = [
+        Snippet(text=text, score=0.0, candidate=candidate)
+        for candidate in candidates
+        for text in split_snippets(candidate.text)
+    ]
+    if not snippets:
+        return []
+
+    lexical_scores = _bm25_scores(
+        get_terms(query), [get_terms(snippet.text) for snippet in snippets]
+    )
+    max_lexical_score = max(lexical_scores) or 1
+
+    for snippet, lexical_score in zip(snippets, lexical_scores):
+        similarity = 1 - snippet.candidate.distance
+        snippet.score = (
+            LEXICAL_WEIGHT * lexical_score / max_lexical_score
+            + (1 - LEXICAL_WEIGHT) * similarity
+        )
+
+    snippets.sort(key=lambda snippet: snippet.score, reverse=True)
+
+    encoding = get_encoding()
+    selected = []
+    remaining = token_budget
+    for snippet in snippets:
+        if len(selected) == top_k:
+            break
+
+        tokens = len(encoding.encode(f"{snippet.candidate.title}\n{snippet.text}"))
+        if tokens > remaining:
+            # a shorter snippet may still fit
+            continue
+
+        selected.append(snippet)
+        remaining -= tokens
+
+    return selected
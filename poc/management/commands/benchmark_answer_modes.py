@@ -0,0 +1,111 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from langchain_core.callbacks import get_usage_metadata_callback
+
+from core import metrics
+from poc.langchain.chat_agent import AnswerMode, send_message
+from poc.models import ChatThread
+
+# questions that most case threads start with
+QUESTIONS = [
+    "Who are the parties involved in this case?",
+    "Summarize the dispute in a few sentences.",
+    "When was the agreement signed, and what were its key terms?",
+    "What payments were made, and when?",
+    "Which emails discuss the termination of the agreement?",
+    "Is there any evidence of a breach of contract?",
+    "List the key dates in this case.",
+    "What did the opposite party admit in writing?",
+]
+
+
+class Command(BaseCommand):
+    help = "Compare the latency and token use of the chat answer modes on a fixed set of questions. Calls the OpenAI API."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "thread_id",
+            type=int,
+            help="ID of a chat thread. The questions are asked about its case.",
+        )
+        parser.add_argument(
+            "--questions-file",
+            type=str,
+            help="Path to a text file with one question per line. Defaults to a built-in set of questions.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            thread = ChatThread.objects.select_related("case").get(
+                id=options["thread_id"]
+            )
+        except ChatThread.DoesNotExist:
+            raise CommandError(
+                f"Chat thread with ID {options['thread_id']} does not exist."
+            )
+
+        questions = QUESTIONS
+        if options["questions_file"]:
+            with open(options["questions_file"]) as f:
+                questions = [line.strip() for line in f if line.strip()]
+
+        for mode in AnswerMode:
+            fallbacks_before = metrics.get_counters(["retrieve_first.fallbacks"])
+            results = [self._ask(thread, question, mode) for question in questions]
+            fallbacks_after = metrics.get_counters(["retrieve_first.fallbacks"])
+
+            self._report(mode, results)
+            if mode == AnswerMode.retrieve_first:
+                fallbacks = (
+                    fallbacks_after["retrieve_first.fallbacks"]
+                    - fallbacks_before["retrieve_first.fallbacks"]
+                )
+                self.stdout.write(
+                    f"  fell back to the agent: {fallbacks}/{len(questions)}"
+                )
+
+    def _ask(self, thread: ChatThread, question: str, mode: AnswerMode) -> dict:
+        """
+        Ask the question in a new thread of the case, so that the questions and modes do not share history.
+
+        Returns:
+            dict: The duration (in seconds), and the input and output tokens of the turn.
+        """
+        scratch_thread = ChatThread.objects.create(
+            case=thread.case, title=f"Benchmark ({mode.value})"
+        )
+
+        try:
+            with get_usage_metadata_callback() as usage:
+                started_at = time.perf_counter()
+                # the answer cache would answer the second mode with the answer of the first
+                send_message(scratch_thread.id, question, mode=mode, use_cache=False)
+                duration = time.perf_counter() - started_at
+        finally:
+            scratch_thread.delete()
+
+        return {
+            "duration": duration,
+            "input_tokens": sum(
+                model_usage["input_tokens"]
+                for model_usage in usage.usage_metadata.values()
+            ),
+            "output_tokens": sum(
+                model_usage["output_tokens"]
+                for model_usage in usage.usage_metadata.values()
+            ),
+        }
+
+    def _report(self, mode: AnswerMode, results: list[dict]):
+        durations = sorted(result["duration"] for result in results)
+        p95 = durations[max(0, int(len(durations) * 0.95) - 1)]
+        self.stdout.write(
+            f"{mode.value}: "
+            f"mean {statistics.mean(durations):.2f}s, "
+            f"p50 {statistics.median(durations):.2f}s, "
+            f"p95 {p95:.2f}s, "
+            f"tokens/turn {statistics.mean(r['input_tokens'] for r in results):.0f} in, "
+            f"{statistics.mean(r['output_tokens'] for r in results):.0f} out"
+        )
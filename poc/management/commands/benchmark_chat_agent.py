@@ -0,0 +1,116 @@
+import statistics
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from langchain_core.language_models.fake_chat_models import (
+    FakeMessagesListChatModel,
+)
+from langchain_core.messages import AIMessage
+
+from core.db import count_queries
+from poc.langchain import chat_agent
+from poc.models import ChatThread
+
+
+class InstantChatModel(FakeMessagesListChatModel):
+    """Fake chat model that answers instantly, so that only the per-turn overhead is measured."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class Command(BaseCommand):
+    help = "Measure the per-turn overhead of the chat agent, excluding LLM time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "thread_id", type=int, help="ID of the chat thread to run the turns on."
+        )
+        parser.add_argument(
+            "--turns",
+            type=int,
+            default=50,
+            help="Number of turns to run in each mode. Defaults to 50.",
+        )
+
+    def handle(self, *args, **options):
+        thread_id = options["thread_id"]
+        turns = options["turns"]
+
+        if not ChatThread.objects.filter(id=thread_id).exists():
+            raise CommandError(f"Chat thread with ID {thread_id} does not exist.")
+
+        fake_llm = InstantChatModel(
+            responses=[AIMessage(content="Benchmark answer.")] * (turns * 2)
+        )
+
+        with (
+            mock.patch.object(chat_agent, "llm", fake_llm),
+            mock.patch.object(chat_agent, "streaming_llm", fake_llm),
+        ):
+            cold = self._run_turns(thread_id, turns, warm=False)
+            warm = self._run_turns(thread_id, turns, warm=True)
+
+        # do not leave pipelines built with the fake model in the cache
+        chat_agent.get_agent_with_history.cache_clear()
+        chat_agent.get_tools.cache_clear()
+
+        self._report("cold (rebuild per turn)", cold)
+        self._report("warm (cached pipeline)", warm)
+
+        speedup = statistics.mean(cold["durations"]) / statistics.mean(
+            warm["durations"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {speedup:.1f}x"))
+
+    def _run_turns(self, thread_id: int, turns: int, warm: bool) -> dict:
+        """Run the given number of turns and collect the duration and query count of each turn.
+
+        Args:
+            thread_id (int): ID of the chat thread.
+            turns (int): Number of turns to run.
+            warm (bool): If False, the pipeline is rebuilt and the history is loaded twice per turn,
+                as was the case before the pipeline was cached.
+
+        Returns:
+            dict: The durations (in seconds) and query counts of each turn.
+        """
+        chat_agent.get_agent_with_history.cache_clear()
+        chat_agent.get_tools.cache_clear()
+
+        if warm:
+            # warm up the cache
+            chat_agent.get_agent_with_history()
+
+        durations = []
+        queries = []
+        for _ in range(turns):
+            with count_queries() as counter:
+                started_at = time.perf_counter()
+
+                if not warm:
+                    chat_agent.get_agent_with_history.cache_clear()
+                    chat_agent.get_tools.cache_clear()
+                    # the second history object created by RunnableWithMessageHistory
+                    chat_agent.get_history(str(thread_id))
+
+                history = chat_agent.get_history(str(thread_id))
+                chat_agent.invoke_agent(history, "Benchmark question.")
+
+                durations.append(time.perf_counter() - started_at)
+
+            queries.append(counter.count)
+
+        return {"durations": durations, "queries": queries}
+
+    def _report(self, label: str, results: dict):
+        durations_ms = sorted(d * 1000 for d in results["durations"])
+        p95 = durations_ms[max(0, int(len(durations_ms) * 0.95) - 1)]
+        self.stdout.write(
+            f"{label}: "
+            f"mean {statistics.mean(durations_ms):.2f} ms, "
+            f"p50 {statistics.median(durations_ms):.2f} ms, "
+            f"p95 {p95:.2f} ms, "
+            f"queries/turn {statistics.mean(results['queries']):.1f}"
+        )
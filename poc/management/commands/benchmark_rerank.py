@@ -0,0 +1,143 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pgvector.django.functions import CosineDistance
+
+from poc.langchain.tools import emails, files
+from poc.langchain.tools.base import use_case
+from poc.models import (
+    Case,
+    ParsedEmailAttachmentEmbedding,
+    ParsedEmailEmbedding,
+    UploadedFileEmbedding,
+)
+from poc.utils import count_tokens, create_query_embedding
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the recall@k, latency and tokens of the semantic search tools with and without re-ranking. "
+        "The labels file is a JSON list of questions and the documents relevant to them, e.g. "
+        '[{"question": "When was the contract terminated?", "relevant": ["termination_notice.pdf"]}]. '
+        "A document is identified by a part of its filename, or of its email subject."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("case_id", type=int, help="ID of the case to search.")
+        parser.add_argument(
+            "labels_file", type=str, help="Path to the labelled question set."
+        )
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=5,
+            help="Number of results of each tool call. Defaults to 5.",
+        )
+
+    def handle(self, *args, **options):
+        case_id = options["case_id"]
+        top_k = options["top_k"]
+
+        if not Case.objects.filter(id=case_id).exists():
+            raise CommandError(f"Case with ID {case_id} does not exist.")
+
+        with open(options["labels_file"]) as f:
+            labels = json.load(f)
+
+        baseline = []
+        reranked = []
+        for label in labels:
+            # embedded up front, so that the API call is not measured
+            query_vector = create_query_embedding(label["question"])
+
+            baseline.append(
+                self._measure(
+                    label, lambda: self._vector_top_k(case_id, query_vector, top_k)
+                )
+            )
+            with use_case(case_id):
+                reranked.append(
+                    self._measure(label, lambda: self._rerank(label["question"], top_k))
+                )
+
+        self._report(f"vector top-{top_k} (whole documents)", baseline)
+        self._report(f"re-ranked top-{top_k} (snippets)", reranked)
+
+    def _vector_top_k(self, case_id: int, query_vector: list, top_k: int) -> list:
+        """The results of the semantic search tools before re-ranking: the documents of the nearest chunks."""
+        documents = {}
+
+        file_chunks = (
+            UploadedFileEmbedding.objects.filter(uploaded_file__case_id=case_id)
+            .select_related("uploaded_file")
+            .annotate(distance=CosineDistance("embedding", query_vector))
+            .order_by("distance")[:top_k]
+        )
+        for chunk in file_chunks:
+            uploaded_file = chunk.uploaded_file
+            documents[uploaded_file.file.name] = "\n".join(
+                uploaded_file.uploaded_file_embeddings.values_list("chunk", flat=True)
+            )
+
+        attachment_chunks = (
+            ParsedEmailAttachmentEmbedding.objects.filter(
+                parsed_email_attachment__parsed_email__uploaded_file__case_id=case_id
+            )
+            .select_related("parsed_email_attachment")
+            .annotate(distance=CosineDistance("embedding", query_vector))
+            .order_by("distance")[:top_k]
+        )
+        for chunk in attachment_chunks:
+            attachment = chunk.parsed_email_attachment
+            documents[attachment.filename] = "\n".join(
+                attachment.parsed_email_attachment_embeddings.values_list(
+                    "chunk", flat=True
+                )
+            )
+
+        email_chunks = (
+            ParsedEmailEmbedding.objects.filter(
+                parsed_email__uploaded_file__case_id=case_id
+            )
+            .select_related("parsed_email")
+            .annotate(distance=CosineDistance("embedding", query_vector))
+            .order_by("distance")[:top_k]
+        )
+        for chunk in email_chunks:
+            documents[chunk.parsed_email.subject] = chunk.parsed_email.cleaned_body
+
+        return [
+            {"content": content, "source": (name,)}
+            for name, content in documents.items()
+        ]
+
+    def _rerank(self, question: str, top_k: int) -> list:
+        results = []
+        for tool in (files.SemanticFileSearch(), emails.SemanticEmailSearch()):
+            # bypass the tool result cache
+            results.extend(type(tool)._run.__wrapped__(tool, question, top_k=top_k))
+
+        return results
+
+    def _measure(self, label: dict, search) -> dict:
+        started_at = time.perf_counter()
+        results = search()
+        duration = time.perf_counter() - started_at
+
+        retrieved = "\n".join("\n".join(result["source"]) for result in results)
+        found = [relevant for relevant in label["relevant"] if relevant in retrieved]
+        return {
+            "duration": duration,
+            "recall": len(found) / len(label["relevant"]) if label["relevant"] else 1,
+            "tokens": sum(count_tokens(result["content"]) for result in results),
+        }
+
+    def _report(self, label: str, results: list[dict]):
+        self.stdout.write(
+            f"{label}: "
+            f"recall@k {statistics.mean(r['recall'] for r in results):.2f}, "
+            f"latency {statistics.mean(r['duration'] for r in results) * 1000:.1f} ms, "
+            f"tokens/question {statistics.mean(r['tokens'] for r in results):.0f}"
+        )
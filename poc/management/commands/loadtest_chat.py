@@ -0,0 +1,159 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.db import count_queries
+from poc.models import Case, ChatThread
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the chat endpoint (ListCreateMessageAPI) with concurrent threads. "
+        "Reports the throughput, latency percentiles and DB queries per turn. "
+        "Run against a fake OpenAI API (see the run_fake_openai command), "
+        "so that the test costs nothing and does not depend on OpenAI's latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("case_id", type=int, help="ID of the case to chat about.")
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="Number of concurrent threads. Defaults to 4.",
+        )
+        parser.add_argument(
+            "--turns",
+            type=int,
+            default=10,
+            help="Number of turns per thread. Defaults to 10.",
+        )
+        parser.add_argument(
+            "--username",
+            type=str,
+            help="User to send the messages as. Defaults to the first superuser.",
+        )
+        parser.add_argument(
+            "--allow-openai",
+            action="store_true",
+            help="Run even if DJANGO_OPENAI_BASE_URL is not set, i.e. against the real OpenAI API.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.OPENAI_BASE_URL and not options["allow_openai"]:
+            raise CommandError(
+                "DJANGO_OPENAI_BASE_URL is not set. Start the run_fake_openai command and point "
+                "DJANGO_OPENAI_BASE_URL to it, or pass --allow-openai to load test the real API."
+            )
+
+        case = Case.objects.filter(id=options["case_id"]).first()
+        if case is None:
+            raise CommandError(f"Case with ID {options['case_id']} does not exist.")
+
+        user = self._get_user(options["username"])
+
+        # one scratch thread per client thread, so that the histories do not interleave
+        chat_threads = [
+            ChatThread.objects.create(case=case, title="Load test")
+            for _ in range(options["threads"])
+        ]
+        results = []
+        results_lock = threading.Lock()
+
+        def _run_client(chat_thread: ChatThread):
+            # server errors are counted as failed turns, instead of ending the thread
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(user=user)
+            url = reverse(
+                "poc_api:chat_messages",
+                kwargs={"case_uuid": case.uuid, "thread_uuid": chat_thread.uuid},
+            )
+            try:
+                for turn in range(options["turns"]):
+                    result = self._send(client, url, f"Load test question {turn + 1}.")
+                    with results_lock:
+                        results.append(result)
+            finally:
+                connection.close()
+
+        # the test client's host
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            started_at = time.perf_counter()
+            client_threads = [
+                threading.Thread(target=_run_client, args=(chat_thread,))
+                for chat_thread in chat_threads
+            ]
+            for client_thread in client_threads:
+                client_thread.start()
+            for client_thread in client_threads:
+                client_thread.join()
+            elapsed = time.perf_counter() - started_at
+
+        ChatThread.objects.filter(id__in=[t.id for t in chat_threads]).delete()
+
+        self._report(results, elapsed, options["threads"])
+
+    def _get_user(self, username: str | None):
+        User = get_user_model()
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by("id").first()
+
+        if user is None:
+            raise CommandError("User not found. Pass an existing user's --username.")
+
+        return user
+
+    def _send(self, client: APIClient, url: str, content: str) -> dict:
+        """Send a message and measure the turn.
+
+        Args:
+            client (APIClient): The client of the calling thread.
+            url (str): URL of the chat messages endpoint of the thread.
+            content (str): The user message.
+
+        Returns:
+            dict: The duration (in seconds), query count and success of the turn.
+        """
+        with count_queries() as counter:
+            started_at = time.perf_counter()
+            # answers are not reused across turns. every turn runs the agent.
+            response = client.post(
+                f"{url}?cache=false", {"content": content}, format="json"
+            )
+            duration = time.perf_counter() - started_at
+
+        return {
+            "duration": duration,
+            "queries": counter.count,
+            "ok": response.status_code == 201,
+        }
+
+    def _report(self, results: list[dict], elapsed: float, threads: int):
+        succeeded = [r for r in results if r["ok"]]
+        failed = len(results) - len(succeeded)
+        if not succeeded:
+            raise CommandError(f"All {failed} turns failed.")
+
+        durations_ms = sorted(r["duration"] * 1000 for r in succeeded)
+        p50, p95, p99 = (
+            durations_ms[max(0, int(len(durations_ms) * q) - 1)]
+            for q in (0.5, 0.95, 0.99)
+        )
+        self.stdout.write(
+            f"{len(succeeded)} turns on {threads} threads in {elapsed:.1f}s: "
+            f"throughput {len(succeeded) / elapsed:.2f} turns/s, "
+            f"p50 {p50:.0f} ms, p95 {p95:.0f} ms, p99 {p99:.0f} ms, "
+            f"queries/turn {statistics.mean(r['queries'] for r in succeeded):.1f}"
+        )
+        if failed:
+            self.stdout.write(self.style.ERROR(f"{failed} turns failed."))
@@ -0,0 +1,112 @@
+from django.core.management.base import BaseCommand
+
+from core import metrics
+from poc import utils
+from poc.langchain import answer_cache, chat_history, retrieve_first
+from poc.langchain.tools import base as tools_base
+
+
+class Command(BaseCommand):
+    help = "Show the chat counters shared by all web and celery processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after showing them.",
+        )
+
+    def handle(self, *args, **options):
+        names = (
+            chat_history.COUNTERS
+            + utils.QUERY_EMBEDDING_COUNTERS
+            + tools_base.TOOL_CACHE_COUNTERS
+            + retrieve_first.COUNTERS
+            + answer_cache.COUNTERS
+        )
+        counters = metrics.get_counters(names)
+
+        for name, value in counters.items():
+            self.stdout.write(f"{name}: {value}")
+
+        self._report_history(counters)
+        self._report_query_embeddings(counters)
+        self._report_tool_cache(counters)
+        self._report_retrieve_first(counters)
+        self._report_answer_cache(counters)
+
+        if options["reset"]:
+            metrics.reset_counters(names)
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
+
+    def _report_history(self, counters: dict):
+        turns = counters["chat_history.turns"]
+        if not turns:
+            return
+
+        replayed = counters["chat_history.tokens_replayed"]
+        saved = counters["chat_history.tokens_saved"]
+        self.stdout.write(
+            f"History tokens per turn: {replayed / turns:.0f} replayed, {saved / turns:.0f} saved"
+        )
+
+    def _report_query_embeddings(self, counters: dict):
+        local_hits = counters["query_embedding.local_hits"]
+        redis_hits = counters["query_embedding.redis_hits"]
+        misses = counters["query_embedding.misses"]
+        lookups = local_hits + redis_hits + misses
+        if not lookups:
+            return
+
+        self.stdout.write(
+            f"Query embedding hit ratio: {(local_hits + redis_hits) / lookups:.1%} "
+            f"(in-process {local_hits / lookups:.1%}, redis {redis_hits / lookups:.1%})"
+        )
+
+        if misses:
+            # each hit saves an embeddings API call of average latency
+            avg_api_ms = counters["query_embedding.api_ms"] / misses
+            saved_seconds = (local_hits + redis_hits) * avg_api_ms / 1000
+            self.stdout.write(
+                f"Query embedding latency saved: {saved_seconds:.1f}s (avg. API call {avg_api_ms:.0f} ms)"
+            )
+
+    def _report_tool_cache(self, counters: dict):
+        local_hits = counters["tool_cache.local_hits"]
+        redis_hits = counters["tool_cache.redis_hits"]
+        misses = counters["tool_cache.misses"]
+        lookups = local_hits + redis_hits + misses
+        if not lookups:
+            return
+
+        self.stdout.write(
+            f"Tool result hit ratio: {(local_hits + redis_hits) / lookups:.1%} "
+            f"(in-process {local_hits / lookups:.1%}, redis {redis_hits / lookups:.1%})"
+        )
+
+        if misses:
+            avg_tool_ms = counters["tool_cache.tool_ms"] / misses
+            saved_seconds = (local_hits + redis_hits) * avg_tool_ms / 1000
+            self.stdout.write(
+                f"Tool latency saved: {saved_seconds:.1f}s (avg. tool call {avg_tool_ms:.0f} ms)"
+            )
+
+    def _report_retrieve_first(self, counters: dict):
+        answers = counters["retrieve_first.answers"]
+        fallbacks = counters["retrieve_first.fallbacks"]
+        turns = answers + fallbacks
+        if not turns:
+            return
+
+        self.stdout.write(
+            f"Retrieve-first turns answered in a single call: {answers / turns:.1%} "
+            f"({fallbacks} fell back to the agent)"
+        )
+
+    def _report_answer_cache(self, counters: dict):
+        hits = counters["answer_cache.hits"]
+        lookups = hits + counters["answer_cache.misses"]
+        if not lookups:
+            return
+
+        self.stdout.write(f"Answer cache hit ratio: {hits / lookups:.1%}")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poc', '0025_remove_parsedemail_event_extraction_error_message_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='error_message',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='reply_to',
+            field=models.ForeignKey(blank=True, help_text='The user message that this AI message answers', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replies', to='poc.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=20),
+        ),
+    ]
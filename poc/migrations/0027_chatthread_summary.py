@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poc', '0026_chatmessage_status_reply_to'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatthread',
+            name='summarized_until',
+            field=models.ForeignKey(blank=True, help_text='The last message folded into the summary', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='poc.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='chatthread',
+            name='summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
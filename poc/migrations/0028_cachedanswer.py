@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:39
+
+import django.db.models.deletion
+import pgvector.django.indexes
+import pgvector.django.vector
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poc', '0027_chatthread_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.TextField()),
+                ('embedding', pgvector.django.vector.VectorField(dimensions=1536)),
+                ('answer', models.TextField()),
+                ('data_version', models.BigIntegerField(help_text="The case's data version when the answer was generated")),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cached_answers', to='poc.case')),
+            ],
+            options={
+                'db_table': 'poc_cached_answers',
+                'indexes': [pgvector.django.indexes.HnswIndex(ef_construction=200, fields=['embedding'], m=16, name='cached_answer_hnsw_idx', opclasses=['vector_cosine_ops'])],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poc', '0028_cachedanswer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatTurnSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(choices=[('turn', 'Turn'), ('history', 'History'), ('cache', 'Cache'), ('llm', 'LLM'), ('tool', 'Tool'), ('embedding', 'Embedding')], max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('start_ms', models.PositiveIntegerField(help_text='Since the start of the turn')),
+                ('duration_ms', models.PositiveIntegerField()),
+                ('input_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('output_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('rows', models.PositiveIntegerField(blank=True, help_text='Results returned by a tool', null=True)),
+                ('error', models.BooleanField(default=False)),
+                ('ai_message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spans', to='poc.chatmessage')),
+            ],
+            options={
+                'db_table': 'poc_chat_turn_spans',
+                'indexes': [models.Index(fields=['kind', 'name'], name='poc_chat_tu_kind_c554ec_idx')],
+            },
+        ),
+    ]
@@ -328,6 +328,16 @@ class ChatThread(TimestampedModel):
         blank=False,
         null=True,
     )
+    # rolling summary of the messages that no longer fit in the history's token budget
+    summary = models.TextField(blank=True, default="")
+    summarized_until = models.ForeignKey(
+        "ChatMessage",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+        help_text="The last message folded into the summary",
+    )
 
     class Meta:
         db_table = "poc_chat_threads"
@@ -345,8 +355,122 @@ class ChatMessage(TimestampedModel):
         USER = "user", "User"
         AI = "ai", "AI"
 
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
     thread = models.ForeignKey(
         ChatThread, on_delete=models.CASCADE, related_name="messages"
     )
     role = models.CharField(max_length=10, choices=Role.choices)
     content = models.TextField()
+    # ? Why a status on chat messages?
+    # * User messages posted in async mode are answered later by a celery worker.
+    # * Messages answered synchronously are created as COMPLETED.
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.COMPLETED
+    )
+    error_message = models.TextField(blank=True, default="")
+    reply_to = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        related_name="replies",
+        blank=True,
+        null=True,
+        help_text="The user message that this AI message answers",
+    )
+
+    def mark_as_processing(self):
+        if self.status == self.Status.PROCESSING:
+            return
+
+        self.status = self.Status.PROCESSING
+        self.save(update_fields=["status", "updated_at"])
+
+    def mark_as_completed(self):
+        if self.status == self.Status.COMPLETED:
+            return
+
+        self.status = self.Status.COMPLETED
+        self.save(update_fields=["status", "updated_at"])
+
+    def mark_as_failed(self, error_message=None):
+        if self.status == self.Status.FAILED and not error_message:
+            return
+
+        self.status = self.Status.FAILED
+        if error_message:
+            self.error_message = error_message
+
+        self.save(update_fields=["status", "error_message", "updated_at"])
+
+
+class CachedAnswer(TimestampedModel):
+    """
+    Model to store the AI answers to the standalone questions asked about a case.
+    Reused for similar questions asked in other threads of the case, until the case's data changes.
+    """
+
+    case = models.ForeignKey(
+        Case, on_delete=models.CASCADE, related_name="cached_answers"
+    )
+    question = models.TextField()
+    embedding = VectorField(dimensions=1536)  # embedding of the question
+    answer = models.TextField()  # includes the citations of the sources
+    data_version = models.BigIntegerField(
+        help_text="The case's data version when the answer was generated"
+    )
+    hits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "poc_cached_answers"
+        indexes = [
+            HnswIndex(
+                name="cached_answer_hnsw_idx",
+                fields=["embedding"],
+                m=16,
+                ef_construction=200,
+                opclasses=["vector_cosine_ops"],
+            )
+        ]
+
+    def __str__(self):
+        return self.question
+
+
+class ChatTurnSpan(TimestampedModel):
+    """
+    Model to store the latency breakdown of a chat turn: the LLM calls, tool calls, history load, etc.
+    Aggregated in the admin to find slow tools and prompts.
+    """
+
+    class Kind(models.TextChoices):
+        TURN = "turn", "Turn"
+        HISTORY = "history", "History"
+        CACHE = "cache", "Cache"
+        LLM = "llm", "LLM"
+        TOOL = "tool", "Tool"
+        EMBEDDING = "embedding", "Embedding"
+
+    ai_message = models.ForeignKey(
+        ChatMessage, on_delete=models.CASCADE, related_name="spans"
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    name = models.CharField(max_length=100)  # example: the model or tool name
+    start_ms = models.PositiveIntegerField(help_text="Since the start of the turn")
+    duration_ms = models.PositiveIntegerField()
+    input_tokens = models.PositiveIntegerField(blank=True, null=True)
+    output_tokens = models.PositiveIntegerField(blank=True, null=True)
+    rows = models.PositiveIntegerField(
+        blank=True, null=True, help_text="Results returned by a tool"
+    )
+    error = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = "poc_chat_turn_spans"
+        indexes = [models.Index(fields=["kind", "name"])]
+
+    def __str__(self):
+        return f"{self.kind}: {self.name}"
@@ -1,8 +1,27 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import Signal, receiver
 
-from .models import ParsedEmail, ParsedEmailAttachment, UploadedFile
-from .tasks import embed_email, embed_email_attachment, process_uploaded_file
+from .langchain.chat_history import history_over_budget
+from .models import (
+    Case,
+    CaseLitigant,
+    Litigant,
+    ParsedEmail,
+    ParsedEmailAttachment,
+    UploadedFile,
+)
+from .tasks import (
+    embed_email,
+    embed_email_attachment,
+    process_uploaded_file,
+    summarize_chat_thread,
+)
+from .utils import bump_case_data_version
+
+logger = logging.getLogger(__name__)
 
 # Custom signals for cross-app communication
 uploaded_file_created = Signal()
@@ -38,3 +57,71 @@ def handle_parsed_email_attachment_save(sender, instance, created, **kwargs):
     embed_email_attachment.delay(instance.id)
     # useful for listeners in other apps that want to trigger additional processing when a parsed email attachment is created
     parsed_email_attachment_created.send(sender=sender, instance=instance)
+
+
+@receiver(history_over_budget)
+def handle_history_over_budget(sender, thread_id, **kwargs):
+    # fold the messages that no longer fit in the history's token budget into the thread's summary
+    def _summarize():
+        try:
+            summarize_chat_thread.delay(thread_id)
+        except Exception:
+            # the answer is already saved. the next AI message of the thread triggers the fold again.
+            logger.exception(f"Error queueing the summary of chat thread {thread_id}")
+
+    transaction.on_commit(_summarize)
+
+
+def _bump_case_data_version_on_commit(case_ids: list[int]):
+    # after the commit, so that a concurrent tool call does not cache the old data under the new version
+    for case_id in set(case_ids):
+        if case_id:
+            transaction.on_commit(
+                lambda case_id=case_id: bump_case_data_version(case_id)
+            )
+
+
+@receiver([post_save, post_delete], sender=Case)
+def handle_case_change(sender, instance, **kwargs):
+    _bump_case_data_version_on_commit([instance.id])
+
+
+@receiver([post_save, post_delete], sender=UploadedFile)
+def handle_uploaded_file_change(sender, instance, **kwargs):
+    # also covers soft deletes and the embedding status updates
+    _bump_case_data_version_on_commit([instance.case_id])
+
+
+@receiver([post_save, post_delete], sender=ParsedEmail)
+def handle_parsed_email_change(sender, instance, **kwargs):
+    # ? Why not instance.uploaded_file.case_id?
+    # When the uploaded file is deleted, its emails are deleted first, and the file may no longer be fetched.
+    case_ids = UploadedFile.objects.filter(id=instance.uploaded_file_id).values_list(
+        "case_id", flat=True
+    )
+    _bump_case_data_version_on_commit(list(case_ids))
+
+
+@receiver([post_save, post_delete], sender=ParsedEmailAttachment)
+def handle_parsed_email_attachment_change(sender, instance, **kwargs):
+    case_ids = ParsedEmail.objects.filter(id=instance.parsed_email_id).values_list(
+        "uploaded_file__case_id", flat=True
+    )
+    _bump_case_data_version_on_commit(list(case_ids))
+
+
+@receiver([post_save, post_delete], sender=CaseLitigant)
+def handle_case_litigant_change(sender, instance, **kwargs):
+    _bump_case_data_version_on_commit([instance.case_id])
+
+
+@receiver(post_save, sender=Litigant)
+def handle_litigant_save(sender, instance, created, **kwargs):
+    # a litigant may be involved in several cases. deletes are covered by the case litigants.
+    if created:
+        return
+
+    case_ids = CaseLitigant.objects.filter(litigant=instance).values_list(
+        "case_id", flat=True
+    )
+    _bump_case_data_version_on_commit(list(case_ids))
@@ -1,8 +1,46 @@
+import functools
+import logging
+
+import redis
 from celery import shared_task
+from django.conf import settings
 from django.core.management import call_command
 
+from .langchain.chat_agent import answer_pending_messages
+from .langchain.chat_history import DjangoChatMessageHistory
 from .models import UploadedFile
 
+logger = logging.getLogger(__name__)
+
+# upper bound for answering the pending messages of a thread.
+# the lock expires on its own if a worker dies while holding it.
+CHAT_THREAD_LOCK_TIMEOUT = 10 * 60
+CHAT_THREAD_LOCK_RETRY_DELAY = 2
+
+# deletes the lock only if it is still held by its owner, and not by the worker that took it over after it expired.
+# KEYS: lock. ARGV: owner.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@functools.cache
+def _get_redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.CHAT_THREAD_LOCK_REDIS_URL)
+
+
+def acquire_lock(key: str, owner: str, timeout: int) -> bool:
+    """Takes the lock, unless it is held. It expires after the timeout (seconds), e.g. if its owner dies."""
+    return bool(_get_redis().set(key, owner, nx=True, ex=timeout))
+
+
+def release_lock(key: str, owner: str) -> bool:
+    """Releases the lock, if still held by the owner. Returns whether it was."""
+    return bool(_get_redis().eval(RELEASE_LOCK_SCRIPT, 1, key, owner))
+
 
 @shared_task
 def add(x: int, y: int) -> int:
@@ -47,3 +85,57 @@ def embed_email_attachment(parsed_email_attachment_id: int):
     This task is called after the attachment has been parsed and is ready for embedding.
     """
     call_command("embed_email_attachment", parsed_email_attachment_id)
+
+
+@shared_task(
+    bind=True,
+    max_retries=CHAT_THREAD_LOCK_TIMEOUT // CHAT_THREAD_LOCK_RETRY_DELAY,
+)
+def answer_chat_thread(self, thread_id: int):
+    """
+    Answer the pending messages of a chat thread.
+    This task is called when a message is posted in async mode. Routed to the dedicated "chat" queue.
+    """
+    lock_key = f"chat_thread_lock:{thread_id}"
+
+    # only one worker answers a thread at a time, so that messages are answered in order.
+    if not acquire_lock(lock_key, self.request.id, timeout=CHAT_THREAD_LOCK_TIMEOUT):
+        # the worker holding the lock picks up newly posted messages before releasing it.
+        # retry anyway, in case the message was posted after its last check.
+        raise self.retry(countdown=CHAT_THREAD_LOCK_RETRY_DELAY)
+
+    try:
+        # a message left processing by a worker that died is answered again, once its lock has expired
+        ai_messages = answer_pending_messages(
+            thread_id, stale_after=CHAT_THREAD_LOCK_TIMEOUT
+        )
+        logger.info(
+            f"Answered {len(ai_messages)} pending messages of chat thread {thread_id}."
+        )
+    finally:
+        if not release_lock(lock_key, self.request.id):
+            logger.warning(
+                f"The lock of chat thread {thread_id} expired before its messages were answered."
+            )
+
+
+@shared_task(bind=True)
+def summarize_chat_thread(self, thread_id: int):
+    """
+    Fold the older messages of a chat thread into its rolling summary.
+    This task is called when an AI message pushes older messages out of the token budget of the history. Routed to the dedicated "chat" queue.
+    """
+    lock_key = f"chat_thread_summary_lock:{thread_id}"
+
+    # the next AI message triggers the task again. no need to wait for the lock.
+    if not acquire_lock(lock_key, self.request.id, timeout=CHAT_THREAD_LOCK_TIMEOUT):
+        return
+
+    try:
+        folded = DjangoChatMessageHistory(thread_id=thread_id).fold_into_summary()
+        if folded:
+            logger.info(
+                f"Folded {folded} messages of chat thread {thread_id} into its summary."
+            )
+    finally:
+        release_lock(lock_key, self.request.id)
@@ -81,3 +81,37 @@ def test_happy_path(
     response = api_client.post(url, {"content": "Hello"})
     assert response.status_code == 201
     assert mock_send_message.call_count == 1
+
+
+@patch("poc.api.views.send_message")
+def test_happy_path_in_async_mode(
+    mock_send_message,
+    api_client,
+    users,
+    cases,
+    chat_thread_factory,
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    thread = chat_thread_factory.create(
+        title="Chat Thread 1", case=cases["mahadevan_vs_gopalan"]
+    )
+
+    answer_chat_thread_calls = []
+
+    def _mock_delay(thread_id):
+        answer_chat_thread_calls.append(thread_id)
+
+    monkeypatch.setattr("poc.api.views.answer_chat_thread.delay", _mock_delay)
+
+    url = _get_api_url(cases["mahadevan_vs_gopalan"].uuid, thread.uuid)
+    api_client.force_authenticate(users["user1"])
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(f"{url}?async=true", {"content": "Hello"})
+
+    assert response.status_code == 202
+    assert response.json()["role"] == "user"
+    assert response.json()["content"] == "Hello"
+    assert response.json()["status"] == "pending"
+    assert answer_chat_thread_calls == [thread.id]
+    assert mock_send_message.call_count == 0
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.urls import reverse
+
+
+def _get_api_url(case_uuid, thread_uuid):
+    return reverse(
+        "poc:chat_messages_stream",
+        kwargs={"case_uuid": case_uuid, "thread_uuid": thread_uuid},
+    )
+
+
+def test_with_anonymous_user(api_client):
+    url = _get_api_url(uuid4(), uuid4())
+    response = api_client.post(url, {})
+    assert response.status_code == 403
+
+
+def test_with_non_existent_thread(api_client, users, cases):
+    url = _get_api_url(cases["mahadevan_vs_gopalan"].uuid, uuid4())
+    api_client.force_authenticate(users["user1"])
+    response = api_client.post(url, {})
+    assert response.status_code == 404
+
+
+def test_with_empty_message(api_client, users, cases, chat_thread_factory):
+    thread = chat_thread_factory.create(
+        title="Chat Thread 1", case=cases["mahadevan_vs_gopalan"]
+    )
+    url = _get_api_url(cases["mahadevan_vs_gopalan"].uuid, thread.uuid)
+    api_client.force_authenticate(users["user1"])
+    response = api_client.post(url, {"content": ""})
+    assert response.status_code == 400
+    assert response.json() == {"content": ["This field may not be blank."]}
+
+
+@patch("poc.api.views.stream_message")
+def test_happy_path(
+    mock_stream_message,
+    api_client,
+    users,
+    cases,
+    chat_thread_factory,
+):
+    thread = chat_thread_factory.create(
+        title="Chat Thread 1", case=cases["mahadevan_vs_gopalan"]
+    )
+    mock_stream_message.return_value = iter(
+        [
+            'event: user_message\ndata: {"id": 1}\n\n',
+            'event: token\ndata: {"content": "Hello"}\n\n',
+            'event: done\ndata: {"user_message_id": 1, "ai_message_id": 2}\n\n',
+        ]
+    )
+    url = _get_api_url(cases["mahadevan_vs_gopalan"].uuid, thread.uuid)
+    api_client.force_authenticate(users["user1"])
+    response = api_client.post(url, {"content": "Hello"})
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "text/event-stream"
+    assert response["Cache-Control"] == "no-cache"
+
+    content = b"".join(response.streaming_content).decode()
+    assert "event: token" in content
+    assert "event: done" in content
+    mock_stream_message.assert_called_once_with(thread_id=thread.id, user_input="Hello")
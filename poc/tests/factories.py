@@ -1,5 +1,7 @@
 import factory
 
+from poc.utils import bump_case_data_version
+
 
 class LitigantFactory(factory.django.DjangoModelFactory):
     class Meta:
@@ -9,6 +11,13 @@ class LitigantFactory(factory.django.DjangoModelFactory):
 class CaseFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = "poc.Case"
+        skip_postgeneration_save = True
+
+    @factory.post_generation
+    def data_version(obj, create, extracted, **kwargs):
+        # the test database reuses the IDs of earlier test runs. start from a fresh data version.
+        if create:
+            bump_case_data_version(obj.id)
 
 
 class CaseLitigantFactory(factory.django.DjangoModelFactory):
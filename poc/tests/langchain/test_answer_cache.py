@@ -0,0 +1,122 @@
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from poc.langchain.chat_agent import send_message
+from poc.models import CachedAnswer
+from poc.utils import bump_case_data_version
+
+
+class _FakeAgent:
+    def __init__(self):
+        self.answered = []
+
+    def invoke(self, inputs, config=None):
+        self.answered.append(inputs["input"])
+        return {"output": f"Answer to {inputs['input']}"}
+
+
+def _embedding(axis: int, noise: float = 0.0) -> list[float]:
+    embedding = [0.0] * 1536
+    embedding[axis] = 1.0
+    embedding[axis + 1] = noise
+    return embedding
+
+
+def _mock_openai_client() -> MagicMock:
+    # questions about the termination are similar to each other. the others are not.
+    def _create(input, model):
+        if "terminated" in input:
+            embedding = _embedding(0, noise=0.1 if "exactly" in input else 0.0)
+        else:
+            embedding = _embedding(10)
+
+        response = MagicMock()
+        response.data = [MagicMock(embedding=embedding)]
+        response.usage.prompt_tokens = 8
+        return response
+
+    client = MagicMock()
+    client.embeddings.create.side_effect = _create
+    return client
+
+
+@pytest.fixture()
+def agent():
+    agent = _FakeAgent()
+    with (
+        patch("poc.utils.get_openai_client", return_value=_mock_openai_client()),
+        patch("poc.langchain.chat_agent.get_agent_with_history", return_value=agent),
+    ):
+        yield agent
+
+
+@pytest.fixture()
+def case(cases):
+    case = cases["mahadevan_vs_gopalan"]
+    # the test database reuses the IDs of earlier test runs. start from a fresh data version.
+    bump_case_data_version(case.id)
+    return case
+
+
+def test_similar_question_in_another_thread_is_answered_from_the_cache(
+    agent, case, chat_thread_factory
+):
+    # unique questions, as the query embeddings are cached in redis across test runs
+    suffix = uuid4()
+    question = f"When was the contract terminated? {suffix}"
+    similar_question = f"When exactly was the contract terminated? {suffix}"
+
+    _, first_answer = send_message(chat_thread_factory.create(case=case).id, question)
+    _, second_answer = send_message(
+        chat_thread_factory.create(case=case).id, similar_question
+    )
+
+    assert agent.answered == [question]
+    assert second_answer.content == first_answer.content
+    assert CachedAnswer.objects.get(case=case).hits == 1
+
+
+def test_different_question_is_not_answered_from_the_cache(
+    agent, case, chat_thread_factory
+):
+    suffix = uuid4()
+
+    send_message(
+        chat_thread_factory.create(case=case).id,
+        f"When was the contract terminated? {suffix}",
+    )
+    send_message(
+        chat_thread_factory.create(case=case).id, f"Who are the parties? {suffix}"
+    )
+
+    assert len(agent.answered) == 2
+
+
+def test_case_data_changes_invalidate_the_cached_answers(
+    agent, case, chat_thread_factory
+):
+    question = f"When was the contract terminated? {uuid4()}"
+
+    send_message(chat_thread_factory.create(case=case).id, question)
+    bump_case_data_version(case.id)
+    send_message(chat_thread_factory.create(case=case).id, question)
+
+    assert agent.answered == [question, question]
+    # the answer of the older data version is removed
+    assert CachedAnswer.objects.filter(case=case).count() == 1
+
+
+def test_opted_out_and_follow_up_questions_are_not_cached(
+    agent, case, chat_thread_factory
+):
+    question = f"When was the contract terminated? {uuid4()}"
+    thread = chat_thread_factory.create(case=case)
+
+    send_message(thread.id, question, use_cache=False)
+    # a follow-up question may depend on the earlier answers of the thread
+    send_message(thread.id, question)
+
+    assert agent.answered == [question, question]
+    assert not CachedAnswer.objects.filter(case=case).exists()
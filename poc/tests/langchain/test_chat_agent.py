@@ -0,0 +1,279 @@
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+from langchain_core.language_models.fake_chat_models import (
+    FakeMessagesListChatModel,
+)
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+
+from poc.langchain import chat_agent
+from poc.langchain.chat_agent import (
+    AnswerMode,
+    answer_pending_messages,
+    send_message,
+    stream_message,
+)
+from poc.models import ChatMessage, ChatTurnSpan
+
+
+class _FakeAgent:
+    def __init__(self, answered: list, fail_on: str | None = None):
+        self.answered = answered
+        self.fail_on = fail_on
+
+    def invoke(self, inputs, config=None):
+        if inputs["input"] == self.fail_on:
+            raise RuntimeError("LLM unavailable")
+
+        self.answered.append(inputs["input"])
+        return {"output": f"Answer to {inputs['input']}"}
+
+
+def _create_pending_messages(thread, chat_message_factory, contents):
+    return [
+        chat_message_factory.create(
+            thread=thread,
+            role=ChatMessage.Role.USER,
+            content=content,
+            status=ChatMessage.Status.PENDING,
+        )
+        for content in contents
+    ]
+
+
+def test_answers_pending_messages_in_order(
+    cases, chat_thread_factory, chat_message_factory, settings
+):
+    settings.CHAT_ANSWER_CACHE_ENABLED = False
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    user_messages = _create_pending_messages(
+        thread, chat_message_factory, ["first", "second", "third"]
+    )
+
+    answered = []
+    with patch(
+        "poc.langchain.chat_agent.get_agent_with_history",
+        return_value=_FakeAgent(answered),
+    ):
+        ai_messages = answer_pending_messages(thread.id)
+
+    assert answered == ["first", "second", "third"]
+    assert [message.reply_to_id for message in ai_messages] == [
+        message.id for message in user_messages
+    ]
+    for message in user_messages:
+        message.refresh_from_db()
+        assert message.status == ChatMessage.Status.COMPLETED
+
+
+def test_failed_message_does_not_block_the_thread(
+    cases, chat_thread_factory, chat_message_factory, settings
+):
+    settings.CHAT_ANSWER_CACHE_ENABLED = False
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    failing, following = _create_pending_messages(
+        thread, chat_message_factory, ["failing", "following"]
+    )
+
+    answered = []
+    with patch(
+        "poc.langchain.chat_agent.get_agent_with_history",
+        return_value=_FakeAgent(answered, fail_on="failing"),
+    ):
+        ai_messages = answer_pending_messages(thread.id)
+
+    assert answered == ["following"]
+    assert len(ai_messages) == 1
+
+    failing.refresh_from_db()
+    assert failing.status == ChatMessage.Status.FAILED
+    assert failing.error_message == "LLM unavailable"
+
+
+def test_stale_processing_message_is_answered_again(
+    cases, chat_thread_factory, chat_message_factory, settings
+):
+    settings.CHAT_ANSWER_CACHE_ENABLED = False
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    stale, processing = _create_pending_messages(
+        thread, chat_message_factory, ["stale", "processing"]
+    )
+    # the worker answering "stale" died. "processing" is still being answered.
+    ChatMessage.objects.filter(id__in=[stale.id, processing.id]).update(
+        status=ChatMessage.Status.PROCESSING
+    )
+    ChatMessage.objects.filter(id=stale.id).update(
+        updated_at=timezone.now() - timedelta(minutes=15)
+    )
+
+    answered = []
+    with patch(
+        "poc.langchain.chat_agent.get_agent_with_history",
+        return_value=_FakeAgent(answered),
+    ):
+        answer_pending_messages(thread.id, stale_after=10 * 60)
+
+    assert answered == ["stale"]
+    stale.refresh_from_db()
+    assert stale.status == ChatMessage.Status.COMPLETED
+
+
+class _FakeChatModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _usage(input_tokens: int, output_tokens: int) -> dict:
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+    }
+
+
+def test_send_message_stores_the_latency_breakdown_of_the_turn(
+    cases, chat_thread_factory, settings
+):
+    settings.CHAT_ANSWER_CACHE_ENABLED = False
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    fake_llm = _FakeChatModel(
+        responses=[
+            AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "search_file_by_name",
+                        "args": {"filename": "no such file"},
+                        "id": "1",
+                    }
+                ],
+                usage_metadata=_usage(120, 10),
+            ),
+            AIMessage(content="Final answer.", usage_metadata=_usage(150, 20)),
+        ]
+    )
+
+    chat_agent.get_agent_with_history.cache_clear()
+    try:
+        with patch.object(chat_agent, "llm", fake_llm):
+            _, ai_message = send_message(
+                thread.id, "Which files are there?", mode=AnswerMode.agent
+            )
+    finally:
+        # do not leave a pipeline built with the fake model in the cache
+        chat_agent.get_agent_with_history.cache_clear()
+
+    spans = list(ChatTurnSpan.objects.filter(ai_message=ai_message).order_by("id"))
+    assert [(span.kind, span.input_tokens, span.output_tokens) for span in spans] == [
+        ("history", None, None),
+        ("llm", 120, 10),
+        ("tool", None, None),
+        ("llm", 150, 20),
+        ("turn", None, None),
+    ]
+    tool_span = spans[2]
+    assert (tool_span.name, tool_span.rows) == ("search_file_by_name", 0)
+    # the turn spans the others
+    turn_span = spans[-1]
+    assert all(span.duration_ms <= turn_span.duration_ms for span in spans)
+
+
+def _stream(thread_id: int, user_input: str) -> list[str]:
+    events = list(stream_message(thread_id, user_input))
+    # the agent thread closes its database connection after the last event
+    for agent_thread in threading.enumerate():
+        if agent_thread.name.endswith("(_run_agent)"):
+            agent_thread.join()
+
+    return events
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streamed_turn_stores_the_token_usage(
+    case_factory, chat_thread_factory, settings, fake_openai
+):
+    settings.CHAT_ANSWER_CACHE_ENABLED = False
+    thread = chat_thread_factory.create(case=case_factory.create())
+    # answers right away. the tools would run in the pool threads, with their own database connections.
+    fake_openai.config.tool_calls = False
+    # the streaming model of the agent, served by the fake API
+    streaming_llm = ChatOpenAI(
+        **chat_agent.streaming_llm.model_dump(exclude_none=True),
+        openai_api_base=fake_openai.base_url,
+    )
+
+    chat_agent.get_agent_with_history.cache_clear()
+    try:
+        with patch.object(chat_agent, "streaming_llm", streaming_llm):
+            events = _stream(thread.id, "Who are the parties?")
+    finally:
+        chat_agent.get_agent_with_history.cache_clear()
+
+    assert events[-1].startswith("event: done")
+    llm_spans = ChatTurnSpan.objects.filter(
+        ai_message__thread=thread, kind="llm"
+    ).order_by("id")
+    assert llm_spans.exists()
+    for llm_span in llm_spans:
+        assert llm_span.input_tokens > 0
+        assert llm_span.output_tokens > 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streamed_turn_is_answered_in_the_configured_mode(
+    case_factory, chat_thread_factory, settings
+):
+    settings.CHAT_ANSWER_CACHE_ENABLED = False
+    settings.CHAT_ANSWER_MODE = AnswerMode.retrieve_first
+    thread = chat_thread_factory.create(case=case_factory.create())
+    answered = []
+
+    with (
+        patch(
+            "poc.langchain.chat_agent.answer_with_retrieval",
+            return_value="Single answer.",
+        ),
+        patch(
+            "poc.langchain.chat_agent.get_agent_with_history",
+            return_value=_FakeAgent(answered),
+        ),
+    ):
+        events = _stream(thread.id, "Who are the parties?")
+
+    # not generated token by token. sent as a single token.
+    assert [event.split("\n")[0] for event in events] == [
+        "event: user_message",
+        "event: token",
+        "event: done",
+    ]
+    assert '"Single answer."' in events[1]
+    assert not answered
+    assert thread.messages.get(role=ChatMessage.Role.AI).content == "Single answer."
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streamed_turn_is_answered_from_the_cache(
+    case_factory, chat_thread_factory, settings
+):
+    settings.CHAT_ANSWER_CACHE_ENABLED = True
+    thread = chat_thread_factory.create(case=case_factory.create())
+    answered = []
+
+    with (
+        patch(
+            "poc.langchain.chat_agent.get_cached_answer", return_value="Cached answer."
+        ),
+        patch(
+            "poc.langchain.chat_agent.get_agent_with_history",
+            return_value=_FakeAgent(answered),
+        ),
+    ):
+        events = _stream(thread.id, "Who are the parties?")
+
+    assert '"Cached answer."' in events[1]
+    assert events[-1].startswith("event: done")
+    assert not answered
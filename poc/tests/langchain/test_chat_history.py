@@ -0,0 +1,122 @@
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from poc.langchain.chat_history import DjangoChatMessageHistory, history_over_budget
+from poc.models import ChatMessage
+
+
+def _create_conversation(thread, chat_message_factory, turns):
+    messages = []
+    for i in range(turns):
+        messages.append(
+            chat_message_factory.create(
+                thread=thread, role=ChatMessage.Role.USER, content=f"Question {i}"
+            )
+        )
+        messages.append(
+            chat_message_factory.create(
+                thread=thread,
+                role=ChatMessage.Role.AI,
+                content=f"Answer {i}. " + "Lorem ipsum dolor sit amet. " * 50,
+            )
+        )
+
+    return messages
+
+
+def test_replays_all_messages_within_budget(
+    cases, chat_thread_factory, chat_message_factory
+):
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    _create_conversation(thread, chat_message_factory, turns=2)
+
+    history = DjangoChatMessageHistory(thread_id=thread.id, token_budget=10000)
+    messages = history.messages
+
+    assert len(messages) == 4
+    assert isinstance(messages[0], HumanMessage)
+    assert messages[0].content == "Question 0"
+
+
+def test_replays_only_recent_messages_over_budget(
+    cases, chat_thread_factory, chat_message_factory
+):
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    _create_conversation(thread, chat_message_factory, turns=5)
+    chat_message_factory.create(
+        thread=thread, role=ChatMessage.Role.USER, content="Latest question"
+    )
+
+    history = DjangoChatMessageHistory(thread_id=thread.id, token_budget=500)
+    messages = history.messages
+
+    # each answer is ~350 tokens. only the last answer fits in the budget with the questions around it.
+    assert [type(message) for message in messages] == [
+        HumanMessage,
+        AIMessage,
+        HumanMessage,
+    ]
+    assert messages[0].content == "Question 4"
+    assert messages[-1].content == "Latest question"
+
+
+def test_fold_into_summary(cases, chat_thread_factory, chat_message_factory):
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    conversation = _create_conversation(thread, chat_message_factory, turns=5)
+
+    history = DjangoChatMessageHistory(thread_id=thread.id, token_budget=500)
+    with patch("poc.langchain.chat_history.summary_llm") as mock_summary_llm:
+        mock_summary_llm.invoke.return_value = AIMessage(
+            content="The lawyer asked five questions."
+        )
+        folded = history.fold_into_summary()
+
+    mock_invoke = mock_summary_llm.invoke
+    # the last question and answer fit in the budget. the rest are folded.
+    assert folded == 8
+    assert "Question 3" in mock_invoke.call_args.args[0]
+    assert "Question 4" not in mock_invoke.call_args.args[0]
+
+    thread.refresh_from_db()
+    assert thread.summary == "The lawyer asked five questions."
+    assert thread.summarized_until_id == conversation[7].id
+
+    messages = DjangoChatMessageHistory(
+        thread_id=thread.id, token_budget=10000
+    ).messages
+    assert isinstance(messages[0], SystemMessage)
+    assert "The lawyer asked five questions." in messages[0].content
+    # folded messages are not replayed, even if the budget allows
+    assert [message.content for message in messages[1:2]] == ["Question 4"]
+    assert len(messages) == 3
+
+
+def test_answer_over_budget_triggers_the_summary(
+    cases, chat_thread_factory, chat_message_factory
+):
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    _create_conversation(thread, chat_message_factory, turns=1)
+    answer = "Answer 1. " + "Lorem ipsum dolor sit amet. " * 50
+    sent = []
+
+    def _receiver(sender, thread_id, **kwargs):
+        sent.append(thread_id)
+
+    history_over_budget.connect(_receiver)
+    try:
+        for token_budget in (10000, 500):
+            question = chat_message_factory.create(
+                thread=thread, role=ChatMessage.Role.USER, content="Question 1"
+            )
+            history = DjangoChatMessageHistory(
+                thread_id=thread.id, token_budget=token_budget
+            )
+            # loaded by the turn
+            history.messages
+            history.persist_ai_message(answer, reply_to=question)
+    finally:
+        history_over_budget.disconnect(_receiver)
+
+    # the whole conversation fits in the first budget. the earlier answers do not fit in the second.
+    assert sent == [thread.id]
@@ -0,0 +1,135 @@
+import inspect
+import threading
+import time
+
+from langchain.agents import AgentExecutor
+from langchain_core.language_models.fake_chat_models import (
+    FakeMessagesListChatModel,
+)
+from langchain_core.messages import AIMessage
+from langchain_core.tools import BaseTool
+
+from poc.langchain.chat_agent import build_agent, build_prompt
+from poc.langchain.executor import (
+    ConcurrentAgentExecutor,
+    submit_to_tool_pool,
+    tool_pool,
+)
+
+
+class _FakeChatModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class _SlowTool(BaseTool):
+    name: str = "slow_tool"
+    description: str = "Sleeps for the given seconds."
+
+    def _run(self, seconds: float) -> str:
+        time.sleep(seconds)
+        return f"slept {seconds}s"
+
+
+def _run_step(tool_calls: list[dict], tool_timeouts: dict | None = None):
+    llm = _FakeChatModel(
+        responses=[
+            AIMessage(content="", tool_calls=tool_calls),
+            AIMessage(content="Final answer."),
+        ]
+    )
+    tools = [_SlowTool()]
+    executor = ConcurrentAgentExecutor(
+        agent=build_agent(llm, tools, build_prompt()),
+        tools=tools,
+        tool_timeouts=tool_timeouts or {},
+        return_intermediate_steps=True,
+    )
+
+    started_at = time.perf_counter()
+    result = executor.invoke({"input": "question", "thread_id": 1, "chat_history": []})
+    return result, time.perf_counter() - started_at
+
+
+def test_tool_calls_of_a_step_run_concurrently():
+    tool_calls = [
+        {"name": "slow_tool", "args": {"seconds": seconds}, "id": str(i)}
+        for i, seconds in enumerate([0.3, 0.2, 0.1])
+    ]
+
+    result, duration = _run_step(tool_calls)
+
+    assert result["output"] == "Final answer."
+    # observations are in the order of the tool calls
+    assert [observation for _, observation in result["intermediate_steps"]] == [
+        "slept 0.3s",
+        "slept 0.2s",
+        "slept 0.1s",
+    ]
+    # roughly the slowest tool call, instead of their sum (0.6s)
+    assert duration < 0.5
+
+
+def test_timed_out_tool_call_is_reported_to_the_agent():
+    tool_calls = [
+        {"name": "slow_tool", "args": {"seconds": 1}, "id": "1"},
+        {"name": "slow_tool", "args": {"seconds": 0}, "id": "2"},
+    ]
+
+    result, duration = _run_step(tool_calls, tool_timeouts={"slow_tool": 0.2})
+
+    timed_out, completed = [
+        observation for _, observation in result["intermediate_steps"]
+    ]
+    assert "timed out" in timed_out
+    assert completed == "slept 0s"
+    assert duration < 0.8
+
+
+def test_single_tool_call_times_out():
+    tool_calls = [{"name": "slow_tool", "args": {"seconds": 1}, "id": "1"}]
+
+    result, duration = _run_step(tool_calls, tool_timeouts={"slow_tool": 0.2})
+
+    [(_, observation)] = result["intermediate_steps"]
+    assert "timed out" in observation
+    assert result["output"] == "Final answer."
+    assert duration < 0.8
+
+
+def test_time_queued_in_the_tool_pool_does_not_count_against_the_timeout():
+    release = threading.Event()
+    # every worker of the pool is busy, e.g. with the tool calls of other turns
+    busy = [submit_to_tool_pool(release.wait, 5) for _ in range(tool_pool._max_workers)]
+    threading.Timer(0.3, release.set).start()
+    tool_calls = [{"name": "slow_tool", "args": {"seconds": 0.2}, "id": "1"}]
+
+    result, duration = _run_step(tool_calls, tool_timeouts={"slow_tool": 0.4})
+
+    [(_, observation)] = result["intermediate_steps"]
+    assert observation == "slept 0.2s"
+    assert duration > 0.5
+    assert all(future.result() for future in busy)
+
+
+def test_overridden_agent_executor_methods_are_unchanged():
+    # ConcurrentAgentExecutor overrides these private methods. see its docstring.
+    assert list(inspect.signature(AgentExecutor._perform_agent_action).parameters) == [
+        "self",
+        "name_to_tool_map",
+        "color_mapping",
+        "agent_action",
+        "run_manager",
+    ]
+    assert list(inspect.signature(AgentExecutor._iter_next_step).parameters) == [
+        "self",
+        "name_to_tool_map",
+        "color_mapping",
+        "inputs",
+        "intermediate_steps",
+        "run_manager",
+    ]
+    # the actions of a step are yielded, then performed one by one. see ConcurrentAgentExecutor._iter_next_step
+    source = inspect.getsource(AgentExecutor._iter_next_step)
+    assert "yield agent_action" in source
+    assert "yield self._perform_agent_action(" in source
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+
+from poc.langchain.tools.base import use_case
+from poc.langchain.tools.files import SemanticFileSearch
+from poc.langchain.tools.rerank import Candidate, rerank, split_snippets
+from poc.models import UploadedFileEmbedding
+
+
+def _candidate(text: str, distance: float = 0.2, title: str = "File: a.pdf"):
+    return Candidate(text=text, distance=distance, title=title, source=(title,))
+
+
+def test_split_snippets_keeps_paragraphs_together_while_they_fit():
+    text = "one two three\n\nfour five\n\n" + " ".join(["word"] * 7)
+
+    assert split_snippets(text, max_words=5) == [
+        "one two three four five",
+        "word word word word word",
+        "word word",
+    ]
+
+
+def test_rerank_prefers_snippets_matching_the_query():
+    candidates = [
+        _candidate("The monthly rent was revised in 2021."),
+        _candidate("The tenancy agreement was terminated on 5 March 2023."),
+        _candidate("Both parties met at the office."),
+    ]
+
+    snippets = rerank("When was the agreement terminated?", candidates, 2, 1000)
+
+    assert [snippet.text for snippet in snippets][0] == (
+        "The tenancy agreement was terminated on 5 March 2023."
+    )
+    assert len(snippets) == 2
+
+
+def test_rerank_keeps_the_snippets_within_the_token_budget():
+    candidates = [
+        _candidate(" ".join(["termination"] * 100)),
+        _candidate("termination notice"),
+    ]
+
+    snippets = rerank("termination", candidates, 5, token_budget=20)
+
+    # the long snippet does not fit. the shorter one does.
+    assert [snippet.text for snippet in snippets] == ["termination notice"]
+
+
+def test_semantic_file_search_returns_re_ranked_snippets(cases, uploaded_file_factory):
+    uploaded_files = [
+        uploaded_file_factory.create(
+            filename=filename,
+            file=f"poc/uploaded_files/{filename}",
+            case=cases["mahadevan_vs_gopalan"],
+        )
+        for filename in ["minutes.pdf", "receipts.pdf"]
+    ]
+    near = [1.0] + [0.0] * 1535
+    far = [0.0, 1.0] + [0.0] * 1534
+    UploadedFileEmbedding.objects.create(
+        uploaded_file=uploaded_files[0],
+        chunk_index=0,
+        chunk="Minutes of the meeting.\n\nThe agreement was terminated by the landlord.",
+        embedding=near,
+    )
+    UploadedFileEmbedding.objects.create(
+        uploaded_file=uploaded_files[1],
+        chunk_index=0,
+        chunk="Rent receipts for 2022.",
+        embedding=far,
+    )
+
+    with (
+        patch("poc.langchain.tools.files.create_query_embedding", return_value=near),
+        use_case(None),
+    ):
+        results = SemanticFileSearch()._run("Who terminated the agreement?", top_k=1)
+
+    assert results == [
+        {
+            "content": f"File: {uploaded_files[0].file.name}\nExcerpt:\n"
+            "Minutes of the meeting. The agreement was terminated by the landlord.",
+            "source": (
+                "Type: Uploaded File",
+                f"Filename: {uploaded_files[0].file.name}\n"
+                f"File path: {uploaded_files[0].file.path}\n",
+            ),
+        }
+    ]
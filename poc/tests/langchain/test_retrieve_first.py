@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+from langchain_core.language_models.fake_chat_models import (
+    FakeMessagesListChatModel,
+)
+from langchain_core.messages import AIMessage
+
+from poc.langchain.chat_agent import AnswerMode, send_message
+from poc.langchain.retrieve_first import FALLBACK_REPLY, pack_context
+from poc.utils import count_tokens
+
+
+class _FakeAgent:
+    def __init__(self):
+        self.invoked = False
+
+    def invoke(self, inputs, config=None):
+        self.invoked = True
+        return {"output": "Agent answer."}
+
+
+def _retrievals():
+    return [
+        ["Case Number: OS 1/2024"],
+        ["Content:\nfile one", "Content:\nfile two"],
+        ["Content:\nemail one"],
+    ]
+
+
+def test_pack_context_takes_the_top_results_of_each_retrieval_first():
+    context = pack_context(
+        [["case details"], ["file one", "file two"], ["email one", "email two"]],
+        token_budget=1000,
+    )
+
+    assert context.split("\n---\n") == [
+        "case details",
+        "file one",
+        "email one",
+        "file two",
+        "email two",
+    ]
+
+
+def test_pack_context_truncates_to_the_token_budget():
+    long_section = "rent " * 500
+
+    context = pack_context([["case details"], [long_section, "file two"]], 50)
+
+    assert count_tokens(context) <= 52
+    assert "file two" not in context
+
+
+def test_retrieve_first_answers_with_a_single_llm_call(cases, chat_thread_factory):
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    agent = _FakeAgent()
+    llm = FakeMessagesListChatModel(responses=[AIMessage(content="Single answer.")])
+
+    with (
+        patch("poc.langchain.retrieve_first.retrieve", return_value=_retrievals()),
+        patch("poc.langchain.retrieve_first.answer_llm", llm),
+        patch("poc.langchain.chat_agent.get_agent_with_history", return_value=agent),
+    ):
+        user_message, ai_message = send_message(
+            thread.id,
+            "Who are the parties?",
+            mode=AnswerMode.retrieve_first,
+            use_cache=False,
+        )
+
+    assert ai_message.content == "Single answer."
+    assert ai_message.reply_to_id == user_message.id
+    assert not agent.invoked
+
+
+def test_retrieve_first_falls_back_to_the_agent(cases, chat_thread_factory):
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    agent = _FakeAgent()
+    llm = FakeMessagesListChatModel(responses=[AIMessage(content=FALLBACK_REPLY)])
+
+    with (
+        patch("poc.langchain.retrieve_first.retrieve", return_value=_retrievals()),
+        patch("poc.langchain.retrieve_first.answer_llm", llm),
+        patch("poc.langchain.chat_agent.get_agent_with_history", return_value=agent),
+    ):
+        _, ai_message = send_message(
+            thread.id,
+            "What did the witness say?",
+            mode=AnswerMode.retrieve_first,
+            use_cache=False,
+        )
+
+    assert ai_message.content == "Agent answer."
+    assert agent.invoked
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.utils.timezone import now
+
+from core import metrics
+from poc.langchain.tools.base import tool_result_lru, use_case
+from poc.langchain.tools.emails import SearchBySubject
+from poc.utils import bump_case_data_version
+
+
+@pytest.fixture()
+def case_email(cases, uploaded_file_factory, parsed_email_factory):
+    case = cases["mahadevan_vs_gopalan"]
+    uploaded_file = uploaded_file_factory.create(
+        filename="notice.eml", file="/path/to/notice.eml", case=case
+    )
+    parsed_email = parsed_email_factory.create(
+        uploaded_file=uploaded_file,
+        sent_on=now(),
+        sender="mahadevan@example.com",
+        to_recipients="gopalan@example.com",
+        subject="Legal notice",
+        body="Legal notice for the unpaid rent.",
+        cleaned_body="Legal notice for the unpaid rent.",
+    )
+
+    # the test database reuses the IDs of earlier test runs. start from a fresh data version.
+    bump_case_data_version(case.id)
+    tool_result_lru.clear()
+    return parsed_email
+
+
+def test_repeated_tool_calls_are_served_from_the_cache(
+    case_email, django_assert_num_queries
+):
+    tool = SearchBySubject()
+
+    with use_case(case_email.uploaded_file.case_id):
+        results = tool.run({"subject_keywords": "legal notice"})
+        assert len(results) == 1
+
+        # same arguments with different case and spacing
+        with django_assert_num_queries(0):
+            assert tool.run({"subject_keywords": "  Legal  NOTICE"}) == results
+
+        # redis hit, e.g., from another process
+        tool_result_lru.clear()
+        with django_assert_num_queries(0):
+            assert tool.run({"subject_keywords": "legal notice"}) == results
+
+
+def test_data_changes_invalidate_the_cached_results(
+    case_email,
+    parsed_email_factory,
+    uploaded_file_factory,
+    django_capture_on_commit_callbacks,
+):
+    tool = SearchBySubject()
+    case = case_email.uploaded_file.case
+
+    with use_case(case.id):
+        assert len(tool.run({"subject_keywords": "legal notice"})) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        uploaded_file = uploaded_file_factory.create(
+            filename="reply.eml", file="/path/to/reply.eml", case=case
+        )
+        parsed_email_factory.create(
+            uploaded_file=uploaded_file,
+            sent_on=now(),
+            sender="gopalan@example.com",
+            to_recipients="mahadevan@example.com",
+            subject="Re: Legal notice",
+            body="Reply to the legal notice.",
+            cleaned_body="Reply to the legal notice.",
+        )
+
+    # the next turn reads the bumped data version
+    with use_case(case.id):
+        assert len(tool.run({"subject_keywords": "legal notice"})) == 2
+
+
+def test_tools_search_within_the_case(case_email, case_factory):
+    other_case = case_factory.create(title="Another case", case_number="OS 2/2024")
+    tool = SearchBySubject()
+
+    with use_case(other_case.id):
+        assert tool.run({"subject_keywords": "legal notice"}) == []
+
+    with use_case(case_email.uploaded_file.case_id):
+        assert len(tool.run({"subject_keywords": "legal notice"})) == 1
+
+
+def test_local_hits_are_counted_without_a_round_trip_to_redis(case_email):
+    tool = SearchBySubject()
+    metrics.reset_counters(["tool_cache.local_hits"])
+
+    with use_case(case_email.uploaded_file.case_id):
+        tool.run({"subject_keywords": "legal notice"})
+
+        with patch("core.metrics.cache") as metrics_cache:
+            tool.run({"subject_keywords": "legal notice"})
+        assert not metrics_cache.method_calls
+        assert metrics.get_counters(["tool_cache.local_hits"]) == {
+            "tool_cache.local_hits": 1
+        }
+
+        # a miss goes to redis, and takes the local hits along
+        tool.run({"subject_keywords": "rent"})
+
+    assert cache.get("metrics:tool_cache.local_hits") == 1
@@ -0,0 +1,55 @@
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+
+from poc.models import CachedAnswer
+
+
+class _FakeAgent:
+    def __init__(self):
+        self.answered = []
+
+    def invoke(self, inputs, config=None):
+        self.answered.append(inputs["input"])
+        return {"output": f"Answer to {inputs['input']}"}
+
+
+def test_both_modes_answer_every_question(
+    cases, chat_thread_factory, settings, tmp_path
+):
+    settings.CHAT_ANSWER_CACHE_ENABLED = True
+    thread = chat_thread_factory.create(case=cases["mahadevan_vs_gopalan"])
+    questions = ["Who are the parties?", "List the key dates."]
+    questions_file = tmp_path / "questions.txt"
+    questions_file.write_text("\n".join(questions))
+    agent = _FakeAgent()
+    # the question embeddings of the answer cache
+    openai_client = MagicMock()
+    openai_client.embeddings.create.return_value.data = [
+        MagicMock(embedding=[1.0] + [0.0] * 1535)
+    ]
+    openai_client.embeddings.create.return_value.usage.prompt_tokens = 8
+    stdout = StringIO()
+
+    with (
+        patch(
+            "poc.langchain.chat_agent.answer_with_retrieval",
+            return_value="Single answer.",
+        ) as answer_with_retrieval,
+        patch("poc.langchain.chat_agent.get_agent_with_history", return_value=agent),
+        patch("poc.utils.get_openai_client", return_value=openai_client),
+    ):
+        call_command(
+            "benchmark_answer_modes",
+            thread.id,
+            "--questions-file",
+            str(questions_file),
+            stdout=stdout,
+        )
+
+    # neither mode is answered from the answer cache
+    assert agent.answered == questions
+    assert [call.args[1] for call in answer_with_retrieval.call_args_list] == questions
+    assert not CachedAnswer.objects.exists()
+    assert stdout.getvalue().startswith("agent: ")
@@ -0,0 +1,40 @@
+from events.services import get_litigants_info
+from poc.case_context import get_case_context
+
+
+def test_case_context_is_built_with_one_prefetching_query_and_cached(
+    cases, django_assert_num_queries
+):
+    case = cases["mahadevan_vs_gopalan"]
+
+    # the case, and its litigants with their roles
+    with django_assert_num_queries(2):
+        case_context = get_case_context(case.id)
+
+    with django_assert_num_queries(0):
+        assert get_case_context(case.id) == case_context
+
+    assert [
+        (litigant.role, litigant.name, litigant.is_our_client)
+        for litigant in case_context.litigants
+    ] == [("Plaintiff", "S Mahadevan", True), ("Defendant", "K Gopalan", False)]
+    assert get_litigants_info(case_context).startswith(
+        "PLAINTIFFS:\n(Our Client)\nName: S Mahadevan\n"
+    )
+
+
+def test_case_context_is_rebuilt_when_a_litigant_changes(
+    cases, litigants, django_capture_on_commit_callbacks
+):
+    case = cases["mahadevan_vs_gopalan"]
+    get_case_context(case.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        litigants["gopalan"].phone = "+91-6012355668"
+        litigants["gopalan"].save()
+
+    assert get_case_context(case.id).litigants[1].phone == "+91-6012355668"
+
+
+def test_case_context_of_a_missing_case(db):
+    assert get_case_context(0) is None
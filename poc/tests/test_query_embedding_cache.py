@@ -0,0 +1,56 @@
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from poc.utils import create_query_embedding, normalize_query, query_embedding_lru
+
+
+def _mock_openai_client(embedding: list[float]) -> MagicMock:
+    client = MagicMock()
+    client.embeddings.create.return_value.data = [MagicMock(embedding=embedding)]
+    return client
+
+
+def test_normalize_query():
+    assert normalize_query("  When was the  Contract\nterminated? ") == (
+        "when was the contract terminated?"
+    )
+
+
+def test_query_embedding_is_cached_in_process_and_in_redis():
+    query = f"When was the contract terminated? {uuid4()}"
+    client = _mock_openai_client([0.1, 0.2, 0.3])
+
+    with patch("poc.utils.get_openai_client", return_value=client):
+        # miss. calls the API.
+        assert create_query_embedding(query) == [0.1, 0.2, 0.3]
+        # in-process hit. same query with different case and spacing.
+        assert create_query_embedding(f"  {query.upper()} ") == [0.1, 0.2, 0.3]
+
+        # redis hit, e.g., from another process
+        query_embedding_lru.clear()
+        assert create_query_embedding(query) == [0.1, 0.2, 0.3]
+
+    assert client.embeddings.create.call_count == 1
+
+
+def test_query_embedding_embeds_the_original_query():
+    query = f"  When was the Contract\nterminated? {uuid4()}"
+    client = _mock_openai_client([0.1, 0.2, 0.3])
+
+    with patch("poc.utils.get_openai_client", return_value=client):
+        create_query_embedding(query)
+
+    client.embeddings.create.assert_called_once_with(
+        input=query, model="text-embedding-3-small"
+    )
+
+
+def test_query_embedding_is_cached_per_model():
+    query = f"Payment schedule {uuid4()}"
+    client = _mock_openai_client([0.4, 0.5])
+
+    with patch("poc.utils.get_openai_client", return_value=client):
+        create_query_embedding(query, model="text-embedding-3-small")
+        create_query_embedding(query, model="text-embedding-3-large")
+
+    assert client.embeddings.create.call_count == 2
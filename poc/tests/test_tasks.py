@@ -0,0 +1,41 @@
+import uuid
+from unittest.mock import patch
+
+from poc.tasks import _get_redis, acquire_lock, answer_chat_thread, release_lock
+
+
+def test_lock_is_released_only_by_its_owner():
+    key = f"test_lock:{uuid.uuid4()}"
+
+    try:
+        assert acquire_lock(key, "first", timeout=60)
+        assert not acquire_lock(key, "second", timeout=60)
+        # "first" outlived the lock, and "second" took it over
+        _get_redis().delete(key)
+        assert acquire_lock(key, "second", timeout=60)
+
+        assert not release_lock(key, "first")
+        assert _get_redis().get(key) == b"second"
+        assert release_lock(key, "second")
+        assert _get_redis().get(key) is None
+    finally:
+        _get_redis().delete(key)
+
+
+def test_answer_chat_thread_keeps_the_lock_taken_over_by_another_worker():
+    thread_id = uuid.uuid4().int
+    lock_key = f"chat_thread_lock:{thread_id}"
+
+    def _expire_and_take_over(thread_id, stale_after):
+        _get_redis().set(lock_key, "other worker")
+        return []
+
+    try:
+        with patch(
+            "poc.tasks.answer_pending_messages", side_effect=_expire_and_take_over
+        ):
+            answer_chat_thread.apply(args=[thread_id])
+
+        assert _get_redis().get(lock_key) == b"other worker"
+    finally:
+        _get_redis().delete(lock_key)
@@ -1,9 +1,50 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
 from collections.abc import Generator
+from functools import cache
 
 import tiktoken
 from django.conf import settings
+from django.core.cache import cache as django_cache
 from openai import OpenAI
 
+from core import metrics
+from core.rate_limit import get_http_client
+from core.tracing import span
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# counters reported by the show_chat_stats command
+QUERY_EMBEDDING_COUNTERS = [
+    "query_embedding.local_hits",
+    "query_embedding.redis_hits",
+    "query_embedding.misses",
+    "query_embedding.api_ms",
+]
+
+
+@cache
+def get_encoding(model: str = "gpt-4o") -> tiktoken.Encoding:
+    """Returns the tiktoken encoding for the model. Loaded once per process."""
+    return tiktoken.encoding_for_model(model)
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Counts the number of tokens in the text.
+
+    Args:
+        text (str): The text to count tokens for.
+        model (str, optional): The model whose tokenizer is used. Defaults to "gpt-4o".
+
+    Returns:
+        int: The number of tokens.
+    """
+    return len(get_encoding(model).encode(text))
+
 
 def create_chunks_for_vector_embedding(text_content: str) -> list:
     """
@@ -17,7 +58,7 @@ def create_chunks_for_vector_embedding(text_content: str) -> list:
     """
     chunk_size = 8000
 
-    encoding = tiktoken.encoding_for_model("gpt-4o")
+    encoding = get_encoding("gpt-4o")
     tokens = encoding.encode(text_content)
 
     if len(tokens) <= chunk_size:
@@ -38,6 +79,16 @@ def create_chunks_for_vector_embedding(text_content: str) -> list:
     return chunks
 
 
+@cache
+def get_openai_client() -> OpenAI:
+    """Returns the OpenAI client. Created once per process, and reused for its connection pool."""
+    return OpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        http_client=get_http_client(),
+    )
+
+
 def create_vector_embedding(chunks: list) -> list[dict]:
     """
     Creates vector embeddings for the provided text chunks using OpenAI's API.
@@ -51,16 +102,136 @@ def create_vector_embedding(chunks: list) -> list[dict]:
     Returns:
         list: A list of dictionaries containing the text and its corresponding embedding.
     """
-    openai = OpenAI(api_key=settings.OPENAI_API_KEY)
+    openai = get_openai_client()
     embeddings = []
 
     for chunk in chunks:
-        response = openai.embeddings.create(input=chunk, model="text-embedding-3-small")
+        response = openai.embeddings.create(input=chunk, model=EMBEDDING_MODEL)
         embeddings.append({"text": chunk, "embedding": response.data[0].embedding})
 
     return embeddings
 
 
+class LRUCache:
+    """A thread-safe, size-bound, in-process cache. Evicts the least recently used key."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# first level of the query embedding cache. the second level is redis (the default cache).
+query_embedding_lru = LRUCache(maxsize=512)
+QUERY_EMBEDDING_CACHE_TIMEOUT = 7 * 24 * 60 * 60  # 7 days
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes the query text, so that trivially different queries share a cache entry."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def create_query_embedding(query: str, model: str = EMBEDDING_MODEL) -> list[float]:
+    """
+    Creates the vector embedding for a search query.
+    The embeddings are cached in-process, and in redis, by the normalized query text and model.
+
+    Args:
+        query (str): The search query.
+        model (str, optional): The embedding model. Defaults to "text-embedding-3-small".
+
+    Raises:
+        OpenAIError: If there is an error with the OpenAI API.
+
+    Returns:
+        list[float]: The embedding of the query.
+    """
+    normalized_query = normalize_query(query)
+    digest = hashlib.sha256(normalized_query.encode("utf-8")).hexdigest()
+    key = f"query_embedding:{model}:{digest}"
+
+    embedding = query_embedding_lru.get(key)
+    if embedding is not None:
+        metrics.incr("query_embedding.local_hits")
+        return embedding
+
+    embedding = django_cache.get(key)
+    if embedding is not None:
+        metrics.incr("query_embedding.redis_hits")
+        query_embedding_lru.set(key, embedding)
+        return embedding
+
+    started_at = time.perf_counter()
+    with span("embedding", model) as extra:
+        # the normalized text is only the cache key. the original query is embedded, as before caching.
+        response = get_openai_client().embeddings.create(input=query, model=model)
+        extra["input_tokens"] = response.usage.prompt_tokens
+    embedding = response.data[0].embedding
+    metrics.incr("query_embedding.misses")
+    metrics.incr(
+        "query_embedding.api_ms", round((time.perf_counter() - started_at) * 1000)
+    )
+
+    django_cache.set(key, embedding, timeout=QUERY_EMBEDDING_CACHE_TIMEOUT)
+    query_embedding_lru.set(key, embedding)
+    return embedding
+
+
+def _get_case_data_version_key(case_id: int) -> str:
+    return f"case_data_version:{case_id}"
+
+
+def get_case_data_version(case_id: int) -> int:
+    """
+    Returns the data version of the case. Used to key the caches derived from the case's data,
+    so that the entries cached before a change are never read. See bump_case_data_version.
+
+    Args:
+        case_id (int): The ID of the case.
+
+    Returns:
+        int: The data version of the case.
+    """
+    key = _get_case_data_version_key(case_id)
+    version = django_cache.get(key)
+    if version is None:
+        # ? Why a timestamp and not a counter?
+        # If redis evicts the key, a counter would restart from 0 and match the stale entries again.
+        django_cache.add(key, time.time_ns(), timeout=None)
+        version = django_cache.get(key)
+
+    return version
+
+
+def bump_case_data_version(case_id: int) -> None:
+    """
+    Bumps the data version of the case. Called when the case's files, emails, attachments or litigants change.
+
+    Args:
+        case_id (int): The ID of the case.
+    """
+    django_cache.set(_get_case_data_version_key(case_id), time.time_ns(), timeout=None)
+
+
 def extract_text_from_pdf(file_path: str) -> Generator[str, None, None]:
     """
     Extracts text from each page of a PDF file.